@@ -53,11 +53,13 @@ CONFIG_OPTIONS = {
     'background': 'k',        ## default background for GraphicsWidget
     'antialias': False,
     'editorCommand': None,  ## command used to invoke code editor from ConsoleWidgets
-    'useWeave': False,       ## Use weave to speed up some operations, if it is available
-    'weaveDebug': False,    ## Print full error message if weave compile fails
+    'useWeave': False,       ## *Deprecated*; scipy.weave is no longer used
+    'weaveDebug': False,    ## *Deprecated*
+    'rescaleBackend': None,  ## Name of the backend used by rescaleData (see util/rescale.py); None selects 'numpy'; 'numexpr' and 'numba' are opt-in
     'exitCleanup': True,    ## Attempt to work around some exit crash bugs in PyQt and PySide
     'enableExperimental': False, ## Enable experimental features (the curious can search for this key in the code)
     'crashWarning': False,  # If True, print warnings about situations that may result in a crash
+    'percentileError': 0.005,  ## Maximum rank error of percentiles estimated for auto-range with frac < 1 (0 means exact)
 } 
 
 
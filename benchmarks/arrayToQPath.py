@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark for functions.arrayToQPath.
+
+Compares the original implementation (big-endian record array allocated on
+every call) with the current one (native byte order, reusing a PathBuffer)
+for 1e4 to 1e7 points.
+
+Usage:  python -m pyqtgraph.benchmarks.arrayToQPath
+"""
+from __future__ import print_function
+import struct
+import numpy as np
+import pyqtgraph as pg
+from pyqtgraph.Qt import QtGui, QtCore
+from pyqtgraph import ptime
+
+
+def legacyArrayToQPath(x, y):
+    ## arrayToQPath as it was before the native byte order / buffer changes,
+    ## for connect='all'
+    path = QtGui.QPainterPath()
+    n = x.shape[0]
+    arr = np.empty(n+2, dtype=[('x', '>f8'), ('y', '>f8'), ('c', '>i4')])
+    byteview = arr.view(dtype=np.ubyte)
+    byteview[:12] = 0
+    byteview.data[12:20] = struct.pack('>ii', n, 0)
+    arr[1:-1]['x'] = x
+    arr[1:-1]['y'] = y
+    arr[1:-1]['c'] = 1
+    lastInd = 20*(n+1)
+    byteview.data[lastInd:lastInd+4] = struct.pack('>i', 0)
+    path.strn = byteview.data[12:lastInd+4]
+    try:
+        buf = QtCore.QByteArray.fromRawData(path.strn)
+    except TypeError:
+        buf = QtCore.QByteArray(bytes(path.strn))
+    ds = QtCore.QDataStream(buf)
+    ds >> path
+    return path
+
+
+def timeit(fn, repeat):
+    best = None
+    for i in range(repeat):
+        start = ptime.time()
+        fn()
+        dt = ptime.time() - start
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def run():
+    app = pg.mkQApp()
+    buffer = pg.PathBuffer()
+    print("%10s %12s %12s %8s" % ("points", "legacy (ms)", "new (ms)", "speedup"))
+    for n in [10**4, 10**5, 10**6, 10**7]:
+        x = np.arange(n, dtype=float)
+        y = np.random.normal(size=n)
+        repeat = max(3, 10**6 // n)
+        t1 = timeit(lambda: legacyArrayToQPath(x, y), repeat)
+        t2 = timeit(lambda: pg.arrayToQPath(x, y, buffer=buffer), repeat)
+        print("%10d %12.2f %12.2f %7.2fx" % (n, t1*1000, t2*1000, t1/t2))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark for drawing ScatterPlotItem symbols from the symbol atlas.
+
+Compares the original PyQt5/PySide method (one QPainter.drawPixmap call per
+point, with a pair of QRectF objects built for each) with a single
+QPainter.drawPixmapFragments call fed from a reusable PixmapFragmentBuffer,
+for 1e4 to 1e6 visible points.
+
+Usage:  python -m pyqtgraph.benchmarks.scatterFragments
+"""
+from __future__ import print_function
+from itertools import repeat
+import numpy as np
+import pyqtgraph as pg
+from pyqtgraph.Qt import QtGui, QtCore
+from pyqtgraph import ptime
+
+
+def legacyDraw(p, atlas, pts, width, src):
+    ## atlas drawing as it was done for PyQt5 / PySide before batching
+    w = width * 2
+    targetRects = list(map(QtCore.QRectF, pts[0], pts[1], w, w))
+    sourceRects = list(map(QtCore.QRectF, src[:,0], src[:,1], src[:,2], src[:,3]))
+    list(map(p.drawPixmap, targetRects, repeat(atlas), sourceRects))
+
+
+def batchedDraw(p, atlas, pts, width, src, buf):
+    frags = buf.get(len(width))
+    frags[:,0] = pts[0] + width
+    frags[:,1] = pts[1] + width
+    frags[:,2:6] = src
+    frags[:,6:] = (1, 1, 0, 1)
+    p.drawPixmapFragments(buf.fragments(), atlas)
+
+
+def timeit(fn, repeat):
+    best = None
+    for i in range(repeat):
+        start = ptime.time()
+        fn()
+        dt = ptime.time() - start
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def run():
+    app = pg.mkQApp()
+    img = QtGui.QImage(1000, 1000, QtGui.QImage.Format_ARGB32_Premultiplied)
+    img.fill(0)
+    buf = pg.PixmapFragmentBuffer()
+    print("%10s %12s %12s %8s" % ("points", "legacy (ms)", "batched (ms)", "speedup"))
+    brushes = [pg.mkBrush(c) for c in 'rgbcmy']
+    for n in [10**4, 10**5, 10**6]:
+        item = pg.ScatterPlotItem(x=np.zeros(n), y=np.zeros(n), size=np.random.randint(5, 10, n), 
+                                  brush=[brushes[i % 6] for i in range(n)])
+        atlas = item.fragmentAtlas.getAtlas()
+        pts = np.random.uniform(0, 990, size=(2, n))
+        width = item.spotData['width']
+        src = item.fragmentAtlas.coords[item.spotData['atlasIndex']]
+        repeat = max(3, 10**5 // n)
+        p = QtGui.QPainter(img)
+        try:
+            t1 = timeit(lambda: legacyDraw(p, atlas, pts, width, src), repeat)
+            t2 = timeit(lambda: batchedDraw(p, atlas, pts, width, src, buf), repeat)
+        finally:
+            p.end()
+        print("%10d %12.2f %12.2f %7.2fx" % (n, t1*1000, t2*1000, t1/t2))
+
+
+if __name__ == '__main__':
+    run()
@@ -28,13 +28,14 @@ SI_PREFIXES_ASCII = 'yzafpnum kMGTPEZY'
 
 
 from .Qt import QtGui, QtCore, USE_PYSIDE
-from . import getConfigOption, setConfigOptions
+from . import getConfigOption
 import numpy as np
 import decimal, re
 import ctypes
 import sys, struct
 
 from . import debug
+from .util import rescale
 
 def siScale(x, minVal=1e-25, allowUnicode=True):
     """
@@ -779,56 +780,19 @@ def rescaleData(data, scale, offset, dtype=None):
     
         data => (data-offset) * scale
         
-    Uses scipy.weave (if available) to improve performance.
+    The computation is done by one of the backends in :mod:`pyqtgraph.util.rescale`,
+    processing the data without creating a full-size float64 copy. The numpy backend
+    is used by default; the 'rescaleBackend' config option selects 'numexpr' or 
+    'numba' instead when those packages are installed.
     """
     if dtype is None:
         dtype = data.dtype
     else:
         dtype = np.dtype(dtype)
     
-    try:
-        if not getConfigOption('useWeave'):
-            raise Exception('Weave is disabled; falling back to slower version.')
-        try:
-            import scipy.weave
-        except ImportError:
-            raise Exception('scipy.weave is not importable; falling back to slower version.')
-        
-        ## require native dtype when using weave
-        if not data.dtype.isnative:
-            data = data.astype(data.dtype.newbyteorder('='))
-        if not dtype.isnative:
-            weaveDtype = dtype.newbyteorder('=')
-        else:
-            weaveDtype = dtype
-        
-        newData = np.empty((data.size,), dtype=weaveDtype)
-        flat = np.ascontiguousarray(data).reshape(data.size)
-        size = data.size
-        
-        code = """
-        double sc = (double)scale;
-        double off = (double)offset;
-        for( int i=0; i<size; i++ ) {
-            newData[i] = ((double)flat[i] - off) * sc;
-        }
-        """
-        scipy.weave.inline(code, ['flat', 'newData', 'size', 'offset', 'scale'], compiler='gcc')
-        if dtype != weaveDtype:
-            newData = newData.astype(dtype)
-        data = newData.reshape(data.shape)
-    except:
-        if getConfigOption('useWeave'):
-            if getConfigOption('weaveDebug'):
-                debug.printExc("Error; disabling weave.")
-            setConfigOptions(useWeave=False)
-        
-        #p = np.poly1d([scale, -offset*scale])
-        #data = p(data).astype(dtype)
-        d2 = data-offset
-        d2 *= scale
-        data = d2.astype(dtype)
-    return data
+    backend = getConfigOption('rescaleBackend') or rescale.defaultBackend
+    rescaleFunc = rescale.getBackend(backend)
+    return rescaleFunc(np.asarray(data), scale, offset, dtype)
     
 def applyLookupTable(data, lut):
     """
@@ -848,7 +812,7 @@ def makeRGBA(*args, **kwds):
     kwds['useRGBA'] = True
     return makeARGB(*args, **kwds)
 
-def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False): 
+def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False, out=None): 
     """ 
     Convert an array of values into an ARGB array suitable for building QImages, OpenGL textures, etc.
     
@@ -889,7 +853,15 @@ def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False):
                    The default is False, which returns in ARGB order for use with QImage 
                    (Note that 'ARGB' is a term used by the Qt documentation; the _actual_ order 
                    is BGRA).
+    out            Optional C-contiguous ubyte array of shape data.shape[:2]+(4,) in which 
+                   to store the result. Reusing the same array for every frame avoids 
+                   allocating a new image.
     ============== ==================================================================================
+    
+    Single-channel 8- and 16-bit integer data is converted in a single pass: the levels and 
+    lookup table are first combined into one ARGB table covering every possible input value. 
+    Single-channel float data is rescaled in small float32 blocks before the lookup, so no
+    full-size temporary arrays are created in either case.
     """
     profile = debug.Profiler()
     
@@ -910,6 +882,12 @@ def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False):
         else:
             print(levels)
             raise Exception("levels argument must be 1D or 2D.")
+            
+    if out is not None:
+        if out.shape != data.shape[:2]+(4,) or out.dtype != np.ubyte or not out.flags['C_CONTIGUOUS']:
+            raise Exception("out must be a C-contiguous ubyte array with shape %s" % (data.shape[:2]+(4,),))
+    else:
+        out = np.empty(data.shape[:2]+(4,), dtype=np.ubyte)
 
     profile()
 
@@ -919,6 +897,46 @@ def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False):
         else:
             scale = 255.
 
+    ## Use a combined ARGB lookup table for single-channel data if possible
+    fused = (data.ndim == 2 and data.dtype.isnative and (levels is None or levels.ndim == 1) and
+             (lut is None or (lut.dtype == np.ubyte and lut.ndim <= 2)))
+    if fused and data.dtype.kind in 'ui' and data.dtype.itemsize <= 2:
+        ## table entry i holds the color of the input value whose bit pattern is i
+        unsigned = np.dtype('u%d' % data.dtype.itemsize)
+        values = np.arange(2**(8*data.dtype.itemsize), dtype=unsigned).view(data.dtype)
+        table, alpha = _makeARGBTable(values, lut, levels, scale, useRGBA)
+        profile()
+        _lookupARGB(data.view(unsigned), table, out)
+        profile()
+        return out, alpha
+    
+    if fused and data.dtype.kind == 'f':
+        nColors = len(lut) if lut is not None else 256
+        table, alpha = _makeARGBTable(np.arange(nColors), lut, None, scale, useRGBA)
+        profile()
+        if levels is None:
+            offset, factor = 0, 1
+        else:
+            minVal, maxVal = levels
+            if minVal == maxVal:
+                maxVal += 1e-16
+            offset = minVal
+            factor = 1 if maxVal == minVal else scale / (maxVal - minVal)
+        _lookupARGB(data, table, out, offset, factor, clipInf=lut is None)
+        profile()
+        return out, alpha
+
+    data = _applyLevelsAndLUT(data, lut, levels, scale)
+
+    profile()
+
+    alpha = _copyToARGB(data, out, useRGBA)
+        
+    profile()
+    return out, alpha
+
+
+def _applyLevelsAndLUT(data, lut, levels, scale):
     ## Apply levels if given
     if levels is not None:
         
@@ -942,22 +960,17 @@ def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False):
             else:
                 data = rescaleData(data, scale/(maxVal-minVal), minVal, dtype=int)
 
-    profile()
-
     ## apply LUT if given
     if lut is not None:
         data = applyLookupTable(data, lut)
     else:
         if data.dtype is not np.ubyte:
             data = np.clip(data, 0, 255).astype(np.ubyte)
+    return data
 
-    profile()
-
-    ## copy data into ARGB ordered array
-    imgData = np.empty(data.shape[:2]+(4,), dtype=np.ubyte)
-
-    profile()
 
+def _copyToARGB(data, imgData, useRGBA):
+    ## copy data into ARGB ordered array; return True if data has an alpha channel
     if useRGBA:
         order = [0,1,2,3] ## array comes out RGBA
     else:
@@ -976,19 +989,54 @@ def makeARGB(data, lut=None, levels=None, scale=None, useRGBA=False):
         for i in range(0, data.shape[2]):
             imgData[..., i] = data[..., order[i]] 
         
-    profile()
-        
     if data.ndim == 2 or data.shape[2] == 3:
-        alpha = False
         imgData[..., 3] = 255
+        return False
     else:
-        alpha = True
+        return True
+
+
+def _lookupARGB(data, table, out, offset=None, factor=None, clipInf=False):
+    ## Fill out with table[data] for a 2D index array, one block of rows at a time.
+    ## If offset is given, data is a float array that is first rescaled and clipped 
+    ## in float32 like rescaleData(data, factor, offset). NaN values get the first
+    ## color; so do infinite values unless clipInf is True, in which case they are
+    ## clipped like other out-of-range values.
+    ## Indexing with a small native integer array is much faster than np.take or 
+    ## indexing with the full image, and no full-size temporary array is needed.
+    rows = max(1, 2**15 // max(1, data.shape[1]))
+    index = np.empty((rows, data.shape[1]), dtype=np.intp)
+    if offset is not None:
+        scaled = np.empty((rows, data.shape[1]), dtype=np.float32)
+    out = out.view(np.uint32)[..., 0]
+    for start in range(0, data.shape[0], rows):
+        block = data[start:start+rows]
+        n = len(block)
+        if offset is None:
+            index[:n] = block
+        else:
+            sc = scaled[:n]
+            np.subtract(block, offset, out=sc, casting='unsafe')
+            sc *= factor
+            if clipInf:
+                sc[np.isnan(block)] = 0
+            else:
+                sc[~np.isfinite(block)] = 0  ## as in applyLookupTable
+            np.clip(sc, 0, len(table) - 1, out=sc)
+            index[:n] = sc
+        out[start:start+n] = table[index[:n]]
         
-    profile()
-    return imgData, alpha
 
+def _makeARGBTable(values, lut, levels, scale, useRGBA):
+    ## Return the ARGB colors of a 1D array of input values packed as uint32, 
+    ## computed exactly as makeARGB would compute them for an image.
+    colors = _applyLevelsAndLUT(values[:, np.newaxis], lut, levels, scale)
+    table = np.empty((len(values), 1, 4), dtype=np.ubyte)
+    alpha = _copyToARGB(colors, table, useRGBA)
+    return table.view(np.uint32).ravel(), alpha
 
-def makeQImage(imgData, alpha=None, copy=True, transpose=True):
+
+def makeQImage(imgData, alpha=None, copy=True, transpose=True, out=None):
     """
     Turn an ARGB array into QImage.
     By default, the data is copied; changes to the array will not
@@ -996,6 +1044,11 @@ def makeQImage(imgData, alpha=None, copy=True, transpose=True):
     pointing to the array which shares its data to prevent python
     freeing that memory while the image is in use.
     
+    To display a sequence of frames without allocating a new image each time,
+    either pass a QImage from a previous call as *out*, or keep one ARGB array 
+    (see the *out* argument of :func:`makeARGB <pyqtgraph.makeARGB>`) and 
+    wrap it with copy=False.
+    
     ============== ===================================================================
     **Arguments:**
     imgData        Array of data to convert. Must have shape (width, height, 3 or 4) 
@@ -1012,6 +1065,9 @@ def makeQImage(imgData, alpha=None, copy=True, transpose=True):
                    creating the image. Note that Qt expects the axes to be in 
                    (height, width) order whereas pyqtgraph usually prefers the 
                    opposite.
+    out            Optional QImage of the same size and format (ARGB32 if *alpha*,
+                   otherwise RGB32) as the result. The data is copied into this
+                   image, which is returned, instead of into a new one.
     ============== ===================================================================    
     """
     ## create QImage from buffer
@@ -1021,6 +1077,23 @@ def makeQImage(imgData, alpha=None, copy=True, transpose=True):
     if alpha is None:
         alpha = (imgData.shape[2] == 4)
         
+    if alpha:
+        imgFormat = QtGui.QImage.Format_ARGB32
+    else:
+        imgFormat = QtGui.QImage.Format_RGB32
+        
+    if out is not None:
+        if transpose:
+            imgData = imgData.transpose((1, 0, 2))
+        h, w = imgData.shape[:2]
+        if out.width() != w or out.height() != h or out.format() != imgFormat:
+            raise Exception("out must be a QImage of size %dx%d with format %d" % (w, h, imgFormat))
+        arr = imageToArray(out, transpose=False)
+        arr[..., :imgData.shape[2]] = imgData
+        if imgData.shape[2] == 3:
+            arr[..., 3] = 255
+        return out
+        
     copied = False
     if imgData.shape[2] == 3:  ## need to make alpha channel (even if alpha==False; QImage requires 32 bpp)
         if copy is True:
@@ -1032,11 +1105,6 @@ def makeQImage(imgData, alpha=None, copy=True, transpose=True):
         else:
             raise Exception('Array has only 3 channels; cannot make QImage without copying.')
     
-    if alpha:
-        imgFormat = QtGui.QImage.Format_ARGB32
-    else:
-        imgFormat = QtGui.QImage.Format_RGB32
-        
     if transpose:
         imgData = imgData.transpose((1, 0, 2))  ## QImage expects the row/column order to be opposite
 
@@ -1107,9 +1175,8 @@ def imageToArray(img, copy=False, transpose=True):
             # If this works on all platforms, then there is no need to use np.asarray..
             arr = np.frombuffer(ptr, np.ubyte, img.byteCount())
     
-    if fmt == img.Format_RGB32:
-        arr = arr.reshape(img.height(), img.width(), 3)
-    elif fmt == img.Format_ARGB32 or fmt == img.Format_ARGB32_Premultiplied:
+    if fmt in (img.Format_RGB32, img.Format_ARGB32, img.Format_ARGB32_Premultiplied):
+        ## all three formats use 4 bytes per pixel
         arr = arr.reshape(img.height(), img.width(), 4)
     
     if copy:
@@ -1248,12 +1315,154 @@ def downsample(data, n, axis=0, xvals='subsample'):
         return MetaArray(d2, info=info)
 
 
-def arrayToQPath(x, y, connect='all'):
+def downsampleM4(x, y, ds):
+    """
+    Downsample a curve by keeping, for each bin of *ds* consecutive samples,
+    the first, minimum, maximum and last sample (in their original order).
+    
+    Bins are groups of samples, not pixel columns, so when each bin spans 
+    about one pixel column the line drawn through the returned points 
+    approximates the line drawn through all of the samples; it is identical
+    only where bins fall within single pixel columns. Returns the 
+    downsampled (x, y) arrays.
+    """
+    n = len(y)
+    if ds <= 1 or n == 0:
+        return x, y
+    nb = n // ds
+    y2 = y[:nb*ds].reshape(nb, ds)
+    imin = y2.argmin(axis=1)
+    imax = y2.argmax(axis=1)
+    idx = np.empty((nb, 4), dtype=np.intp)
+    idx[:,0] = 0
+    idx[:,1] = np.minimum(imin, imax)
+    idx[:,2] = np.maximum(imin, imax)
+    idx[:,3] = ds-1
+    idx += (np.arange(nb) * ds)[:,np.newaxis]
+    idx = idx.reshape(nb*4)
+    if nb * ds < n:
+        ## partial bin at the end
+        start = nb * ds
+        tail = y[start:]
+        i1 = start + tail.argmin()
+        i2 = start + tail.argmax()
+        idx = np.concatenate([idx, [start, min(i1, i2), max(i1, i2), n-1]])
+    return x[idx], y[idx]
+
+
+def downsampleLTTB(x, y, ds):
+    """
+    Downsample a curve to about len(y)/*ds* points using the
+    Largest-Triangle-Three-Buckets method.
+    
+    The first and last samples are kept. The remaining samples are divided
+    into buckets of *ds* samples, and from each bucket the sample forming the
+    largest triangle with the point selected from the previous bucket and
+    the average of the next bucket is kept. Because the classic algorithm
+    is sequential, this implementation selects all buckets at once in two
+    passes: the first pass uses the average of the previous bucket as the
+    anchor, the second uses the point selected from the previous bucket in
+    the first pass. Returns the downsampled (x, y) arrays.
+    """
+    n = len(y)
+    nb = (n - 2) // ds if ds > 1 else 0
+    if nb < 1:
+        return x, y
+    ## bucket i covers samples [starts[i], stops[i]); the last bucket also
+    ## takes the remainder
+    starts = 1 + np.arange(nb) * ds
+    stops = np.append(starts[1:], n-1)
+    counts = stops - starts
+    bucket = np.repeat(np.arange(nb), counts)
+    xm = x[1:n-1].astype(float)
+    ym = y[1:n-1].astype(float)
+    ## bucket averages, ignoring non-finite samples
+    finite = np.isfinite(xm) & np.isfinite(ym)
+    nFinite = np.maximum(np.add.reduceat(finite.astype(int), starts-1), 1)
+    meanx = np.add.reduceat(np.where(finite, xm, 0), starts-1) / nFinite
+    meany = np.add.reduceat(np.where(finite, ym, 0), starts-1) / nFinite
+    ## third vertex: average of the next bucket, or the last sample
+    cx = np.append(meanx[1:], x[-1])[bucket]
+    cy = np.append(meany[1:], y[-1])[bucket]
+    
+    def select(ax, ay):
+        ## index (into x, y) of the largest triangle in each bucket
+        ax = ax[bucket]
+        ay = ay[bucket]
+        area = np.abs((ax - cx) * (ym - ay) - (ax - xm) * (cy - ay))
+        area[~np.isfinite(area)] = -1
+        best = np.maximum.reduceat(area, starts-1)
+        hits = np.flatnonzero(area == best[bucket])
+        first = np.unique(bucket[hits], return_index=True)[1]
+        return hits[first] + 1
+    
+    sel = select(np.append(x[0], meanx[:-1]), np.append(y[0], meany[:-1]))
+    sel = select(np.append(x[0], x[sel[:-1]]), np.append(y[0], y[sel[:-1]]))
+    idx = np.concatenate([[0], sel, [n-1]])
+    return x[idx], y[idx]
+
+
+def percentileSample(n, error=None, confidence=0.99):
+    """
+    Return sorted indexes of a random sample of *n* values that is large
+    enough to estimate any percentile of the values to within *error* (as a
+    fraction of rank, e.g. 0.005 = half a percentile) with the given
+    *confidence*, or None if the sample would not be smaller than *n*.
+    
+    The sample size follows from the Dvoretzky-Kiefer-Wolfowitz inequality
+    and does not depend on *n*, so percentiles of very large arrays can be
+    estimated in constant time. The sample is drawn with a fixed seed so that
+    repeated calls give the same result. If *error* is None, the
+    'percentileError' config option is used; an error of 0 disables sampling.
+    """
+    if error is None:
+        error = getConfigOption('percentileError')
+    if error <= 0:
+        return None
+    size = int(np.ceil(np.log(2. / (1. - confidence)) / (2. * error**2)))
+    if size >= n:
+        return None
+    idx = np.random.RandomState(0).randint(0, n, size)
+    idx.sort()
+    return idx
+    
+
+## Record layout used to stream vertices into a QPainterPath (see arrayToQPath).
+## Values are written in native byte order and the QDataStream is told which
+## order to read, so no byte swapping is needed on little-endian machines.
+_pathByteOrder = '<' if sys.byteorder == 'little' else '>'
+_pathDtype = np.dtype([('x', _pathByteOrder+'f8'), ('y', _pathByteOrder+'f8'), ('c', _pathByteOrder+'i4')])
+
+
+class PathBuffer(object):
+    """
+    Reusable scratch memory for :func:`arrayToQPath`.
+    
+    Holding a PathBuffer across calls avoids allocating a new vertex array
+    each time a path is generated. The buffer grows geometrically and is
+    never shrunk.
+    """
+    def __init__(self):
+        self.arr = None
+        
+    def get(self, n):
+        """Return a record array with room for *n* vertices plus header and footer."""
+        if self.arr is None or len(self.arr) < n+2:
+            size = n+2 if self.arr is None else max(n+2, 2*len(self.arr))
+            self.arr = np.empty(size, dtype=_pathDtype)
+        return self.arr[:n+2]
+
+
+def arrayToQPath(x, y, connect='all', buffer=None):
     """Convert an array of x,y coordinats to QPainterPath as efficiently as possible.
     The *connect* argument may be 'all', indicating that each point should be
     connected to the next; 'pairs', indicating that each pair of points
-    should be connected, or an array of int32 values (0 or 1) indicating
+    should be connected, 'finite', indicating that only points with finite
+    coordinates are connected, or an array of int32 values (0 or 1) indicating
     connections.
+    
+    If a :class:`PathBuffer` is given as *buffer*, its memory is reused for the
+    intermediate vertex array instead of allocating a new one.
     """
 
     ## Create all vertices in path. The method used below creates a binary format so that all
@@ -1286,46 +1495,48 @@ def arrayToQPath(x, y, connect='all'):
     ##    ...
     ##    0(i4)
     ##
-    ## All values are big endian--pack using struct.pack('>d') or struct.pack('>i')
+    ## All values are in native byte order; the data stream is set to match.
 
     path = QtGui.QPainterPath()
 
     #profiler = debug.Profiler()
     n = x.shape[0]
     # create empty array, pad with extra space on either end
-    arr = np.empty(n+2, dtype=[('x', '>f8'), ('y', '>f8'), ('c', '>i4')])
+    if buffer is None:
+        arr = np.empty(n+2, dtype=_pathDtype)
+    else:
+        arr = buffer.get(n)
     # write first two integers
     #profiler('allocate empty')
     byteview = arr.view(dtype=np.ubyte)
     byteview[:12] = 0
-    byteview.data[12:20] = struct.pack('>ii', n, 0)
+    byteview.data[12:20] = struct.pack(_pathByteOrder+'ii', n, 0)
     #profiler('pack header')
     # Fill array with vertex values
     arr[1:-1]['x'] = x
     arr[1:-1]['y'] = y
 
     # decide which points are connected by lines
-    if connect == 'pairs':
-        connect = np.empty((n // 2, 2), dtype=np.int32)
-        if connect.size != n:
-            raise Exception("x,y array lengths must be multiple of 2 to use connect='pairs'")
-        connect[:,0] = 1
-        connect[:,1] = 0
-        connect = connect.flatten()
-    if connect == 'finite':
-        connect = np.isfinite(x) & np.isfinite(y)
+    if isinstance(connect, np.ndarray):
         arr[1:-1]['c'] = connect
-    if connect == 'all':
+    elif connect == 'pairs':
+        if n % 2 != 0:
+            raise Exception("x,y array lengths must be multiple of 2 to use connect='pairs'")
+        ## write the pattern in place rather than building a connect array
+        c = arr[1:-1]['c']
+        c[0::2] = 1
+        c[1::2] = 0
+    elif connect == 'finite':
+        arr[1:-1]['c'] = np.isfinite(x) & np.isfinite(y)
+    elif connect == 'all':
         arr[1:-1]['c'] = 1
-    elif isinstance(connect, np.ndarray):
-        arr[1:-1]['c'] = connect
     else:
-        raise Exception('connect argument must be "all", "pairs", or array')
+        raise Exception('connect argument must be "all", "pairs", "finite", or array')
 
     #profiler('fill array')
     # write last 0
     lastInd = 20*(n+1)
-    byteview.data[lastInd:lastInd+4] = struct.pack('>i', 0)
+    byteview.data[lastInd:lastInd+4] = struct.pack(_pathByteOrder+'i', 0)
     #profiler('footer')
     # create datastream object and stream into path
 
@@ -1339,12 +1550,104 @@ def arrayToQPath(x, y, connect='all'):
         buf = QtCore.QByteArray(bytes(path.strn))
     #profiler('create buffer')
     ds = QtCore.QDataStream(buf)
+    if _pathByteOrder == '<':
+        ds.setByteOrder(ds.LittleEndian)
 
     ds >> path
     #profiler('load')
 
     return path
 
+
+def arrayToQPolygonF(x, y):
+    """Convert arrays of x,y coordinates to a QPolygonF, for use with
+    QPainter.drawPolyline(). Drawing a polyline avoids the overhead of
+    building and stroking a QPainterPath, but cannot represent gaps; to draw
+    disconnected segments, create one polygon per segment.
+    
+    With PyQt the coordinates are copied directly into the polygon's memory;
+    other bindings fall back to constructing the points one at a time.
+    """
+    n = x.shape[0]
+    if USE_PYSIDE:
+        return QtGui.QPolygonF([QtCore.QPointF(x[i], y[i]) for i in range(n)])
+    poly = QtGui.QPolygonF(n)
+    if n == 0:
+        return poly
+    ptr = poly.data()
+    ptr.setsize(n * 16)  ## QPointF is two doubles
+    arr = np.frombuffer(ptr, dtype=np.float64).reshape(n, 2)
+    arr[:,0] = x
+    arr[:,1] = y
+    return poly
+
+
+class PixmapFragmentBuffer(object):
+    """
+    Reusable array of QPainter.PixmapFragment structures whose fields are
+    filled from numpy arrays, for use with QPainter.drawPixmapFragments().
+    This allows any number of pixmap fragments (for example, the symbols of a
+    scatter plot drawn from a pre-rendered atlas) to be drawn with a single
+    call and without creating Python objects for each fragment.
+    
+    Example::
+    
+        buf = PixmapFragmentBuffer()
+        arr = buf.get(len(x))
+        arr[:, 0] = x                # fragment center in target coordinates
+        arr[:, 1] = y
+        arr[:, 2:6] = sourceRects    # (left, top, width, height) within pixmap
+        arr[:, 6:] = (1, 1, 0, 1)    # scaleX, scaleY, rotation, opacity
+        painter.drawPixmapFragments(buf.fragments(), pixmap)
+    
+    The buffer grows geometrically and is never shrunk.
+    """
+    ## Fields of QPainter::PixmapFragment, all qreal
+    fields = ['x', 'y', 'sourceLeft', 'sourceTop', 'width', 'height', 'scaleX', 'scaleY', 'rotation', 'opacity']
+    
+    def __init__(self):
+        self.arr = None     # (capacity, 10) float64 view of the fragment memory
+        self._frags = None  # fragment sequence sharing memory with self.arr
+        self._size = 0
+        
+    def get(self, n):
+        """Return an (n, 10) float64 array whose rows are the fields of the 
+        first *n* fragments (see *fields*). The contents are undefined until 
+        written."""
+        if self.arr is None or len(self.arr) < n:
+            size = n if self.arr is None else max(n, 2*len(self.arr))
+            self._allocate(max(size, 1))
+        self._size = n
+        return self.arr[:n]
+    
+    def fragments(self):
+        """Return the first *n* fragments (as given to the last call to get()) 
+        in a form accepted by QPainter.drawPixmapFragments()."""
+        return self._frags[:self._size]
+    
+    def _allocate(self, size):
+        Fragment = QtGui.QPainter.PixmapFragment
+        if USE_PYSIDE:
+            from PySide import shiboken
+            wrap = shiboken.wrapInstance
+        else:
+            import sip
+            wrap = sip.wrapinstance
+            if hasattr(sip, 'array'):
+                ## sip.array holds the structures contiguously and can be 
+                ## passed directly to drawPixmapFragments
+                frags = sip.array(Fragment, size)
+                ptr = sip.voidptr(frags, size * len(self.fields) * 8)
+                self.arr = np.frombuffer(ptr, dtype=np.float64).reshape(size, len(self.fields))
+                self._frags = frags
+                return
+        ## otherwise wrap each structure in numpy-owned memory; the wrappers
+        ## are created only when the buffer grows
+        self.arr = np.zeros((size, len(self.fields)), dtype=np.float64)
+        addr = self.arr.ctypes.data
+        stride = self.arr.strides[0]
+        self._frags = [wrap(addr + i*stride, Fragment) for i in range(size)]
+
 #def isosurface(data, level):
     #"""
     #Generate isosurface from volumetric data using marching tetrahedra algorithm.
@@ -7,6 +7,7 @@ from .. import functions as fn
 from .. import debug as debug
 from .GraphicsObject import GraphicsObject
 from ..Point import Point
+from ..util.lru_cache import LRUCache
 
 __all__ = ['ImageItem']
 
@@ -32,6 +33,8 @@ class ImageItem(GraphicsObject):
     sigImageChanged = QtCore.Signal()
     sigRemoveRequested = QtCore.Signal(object)  # self; emitted when 'remove' is selected from context menu
     
+    tileCacheSize = 128  ## maximum number of rendered tiles kept in tiled mode
+    
     def __init__(self, image=None, **kargs):
         """
         See :func:`setImage <pyqtgraph.ImageItem.setImage>` for all allowed initialization arguments.
@@ -40,12 +43,20 @@ class ImageItem(GraphicsObject):
         self.menu = None
         self.image = None   ## original image data
         self.qimage = None  ## rendered image for display
+        self._renderBuffer = None  ## ARGB array wrapped by self.qimage; reused while its shape is unchanged
+        self._pyramid = None  ## [image, image downsampled 2x, 4x, ...]; levels are computed on first use
+        self._pyramidThread = None  ## _PyramidThread computing levels when backgroundDownsample is set
+        self._lastDownsample = None  ## (level, xds, yds) used to render self.qimage
+        self._tiles = LRUCache(self.tileCacheSize, self.tileCacheSize // 2)  ## rendered tiles (QImage)
         
         self.paintMode = None
         
         self.levels = None  ## [min, max] or [[redMin, redMax], ...]
         self.lut = None
         self.autoDownsample = False
+        self.downsampleMode = 'mean'
+        self.backgroundDownsample = False
+        self.tileSize = None
         
         self.drawKernel = None
         self.border = None
@@ -121,7 +132,8 @@ class ImageItem(GraphicsObject):
         """
         self.levels = levels
         if update:
-            self.updateImage()
+            self.qimage = None
+            self.update()
         
     def getLevels(self):
         return self.levels
@@ -139,7 +151,8 @@ class ImageItem(GraphicsObject):
         """
         self.lut = lut
         if update:
-            self.updateImage()
+            self.qimage = None
+            self.update()
 
     def setAutoDownsample(self, ads):
         """
@@ -151,6 +164,54 @@ class ImageItem(GraphicsObject):
         self.qimage = None
         self.update()
 
+    def setTileSize(self, size):
+        """
+        Set the tile size used for tiled rendering, or None (the default) to
+        render the whole image at once.
+        
+        In tiled mode the image is split into square tiles of *size* pixels. Only
+        the tiles that intersect the visible region of the ViewBox are rendered,
+        taken from a copy of the image that is downsampled by the largest power of 
+        two that does not drop below the screen resolution. Rendered tiles are 
+        cached, so panning and zooming cost time in proportion to the screen size 
+        rather than the image size. This is intended for very large images.
+        """
+        if size is not None:
+            size = int(size)
+            if size < 1:
+                raise Exception("Tile size must be a positive integer (got %s)" % size)
+        self.tileSize = size
+        self._tiles.clear()
+        self.update()
+
+    def setDownsampleMode(self, mode=None, background=None):
+        """
+        Set how downsampled copies of the image are computed for autoDownsample
+        and tiled rendering. These copies form a pyramid of levels, each half the 
+        size of the previous one; a level is computed the first time it is needed 
+        after the image is set, and reused until the image changes.
+        
+        ==============  ===================================================================
+        **Arguments:**
+        mode            'mean' (default) averages each block of pixels; 'max' takes the
+                        maximum, which keeps small bright features visible.
+        background      (bool) If True, the levels are computed in a background thread.
+                        Until they are ready, the image is drawn from the nearest finer
+                        level that is available. Default is False.
+        ==============  ===================================================================
+        
+        Arguments that are None are left unchanged.
+        """
+        if mode is not None:
+            if mode not in ('mean', 'max'):
+                raise Exception("Downsample mode must be 'mean' or 'max' (got %r)" % mode)
+            self.downsampleMode = mode
+        if background is not None:
+            self.backgroundDownsample = bool(background)
+        self._clearPyramid()
+        self.qimage = None
+        self.update()
+
     def setOpts(self, update=True, **kargs):
         
         if 'lut' in kargs:
@@ -170,6 +231,10 @@ class ImageItem(GraphicsObject):
             self.menu = None
         if 'autoDownsample' in kargs:
             self.setAutoDownsample(kargs['autoDownsample'])
+        if 'tileSize' in kargs:
+            self.setTileSize(kargs['tileSize'])
+        if 'downsampleMode' in kargs or 'backgroundDownsample' in kargs:
+            self.setDownsampleMode(kargs.get('downsampleMode'), kargs.get('backgroundDownsample'))
         if update:
             self.update()
 
@@ -181,6 +246,7 @@ class ImageItem(GraphicsObject):
 
     def clear(self):
         self.image = None
+        self._clearPyramid()
         self.prepareGeometryChange()
         self.informViewBoundsChanged()
         self.update()
@@ -211,6 +277,12 @@ class ImageItem(GraphicsObject):
         autoDownsample     (bool) If True, the image is automatically downsampled to match the
                            screen resolution. This improves performance for large images and 
                            reduces aliasing.
+        tileSize           (int or None) If given, the image is rendered in tiles of this size,
+                           and only the visible tiles are rendered. 
+                           See :func:`setTileSize <pyqtgraph.ImageItem.setTileSize>`.
+        downsampleMode     'mean' or 'max'. The *backgroundDownsample* (bool) argument is also
+                           accepted; see 
+                           :func:`setDownsampleMode <pyqtgraph.ImageItem.setDownsampleMode>`.
         =================  =========================================================================
         """
         profile = debug.Profiler()
@@ -253,7 +325,10 @@ class ImageItem(GraphicsObject):
 
         profile()
 
+        ## image data may have changed (possibly in place), so downsampled copies 
+        ## and rendered tiles are invalid
         self.qimage = None
+        self._clearPyramid()
         self.update()
 
         profile()
@@ -285,26 +360,133 @@ class ImageItem(GraphicsObject):
             lut = self.lut
 
         if self.autoDownsample:
-            # reduce dimensions of image based on screen resolution
-            o = self.mapToDevice(QtCore.QPointF(0,0))
-            x = self.mapToDevice(QtCore.QPointF(1,0))
-            y = self.mapToDevice(QtCore.QPointF(0,1))
-            w = Point(x-o).length()
-            h = Point(y-o).length()
-            xds = max(1, int(1/w))
-            yds = max(1, int(1/h))
-            image = fn.downsample(self.image, xds, axis=0)
-            image = fn.downsample(image, yds, axis=1)
+            # reduce dimensions of image based on screen resolution: start from the 
+            # nearest pyramid level and downsample it by the remaining factors
+            xds, yds = self._screenDownsample()
+            image, level = self._pyramidLevel(self._downsampleLevel(xds, yds))
+            self._lastDownsample = (level, xds, yds)
+            image = _downsample(image, xds >> level, 0, self.downsampleMode)
+            image = _downsample(image, yds >> level, 1, self.downsampleMode)
         else:
             image = self.image
         
-        argb, alpha = fn.makeARGB(image.transpose((1, 0, 2)[:image.ndim]), lut=lut, levels=self.levels)
-        self.qimage = fn.makeQImage(argb, alpha, transpose=False)
+        ## Render into the same ARGB buffer as the last frame if possible; the new 
+        ## QImage shares its memory, so no image-sized arrays are allocated.
+        shape = (image.shape[1], image.shape[0], 4)
+        if self._renderBuffer is None or self._renderBuffer.shape != shape:
+            self._renderBuffer = np.empty(shape, dtype=np.ubyte)
+        argb, alpha = fn.makeARGB(image.transpose((1, 0, 2)[:image.ndim]), lut=lut, levels=self.levels, out=self._renderBuffer)
+        self.qimage = fn.makeQImage(argb, alpha, copy=False, transpose=False)
+
+    def _screenDownsample(self):
+        ## Return the number of image pixels per screen pixel along x and y
+        ## (at least 1), or (1, 1) if the item is not displayed.
+        o = self.mapToDevice(QtCore.QPointF(0,0))
+        x = self.mapToDevice(QtCore.QPointF(1,0))
+        y = self.mapToDevice(QtCore.QPointF(0,1))
+        if o is None or x is None or y is None:
+            return 1, 1
+        w = Point(x-o).length()
+        h = Point(y-o).length()
+        xds = max(1, int(1/w)) if w > 0 else 1
+        yds = max(1, int(1/h)) if h > 0 else 1
+        return xds, yds
+
+    def _downsampleLevel(self, xds, yds):
+        ## Return the coarsest pyramid level that does not drop below the
+        ## screen resolution along either axis
+        level = int(np.log2(min(xds, yds)))
+        return min(level, int(np.log2(min(self.image.shape[:2]))))
+
+    def _pyramidLevel(self, level):
+        ## Return (data, level): the image downsampled by 2**level along x and y.
+        ## While levels are computed in the background, the finest available
+        ## level may be returned instead.
+        if self._pyramid is None:
+            self._pyramid = [self.image]
+        if len(self._pyramid) <= level:
+            if self.backgroundDownsample:
+                if self._pyramidThread is None:
+                    self._pyramidThread = _PyramidThread(self._pyramid, self.downsampleMode)
+                    self._pyramidThread.sigFinished.connect(self._pyramidReady)
+                    self._pyramidThread.start()
+                level = len(self._pyramid) - 1
+            else:
+                while len(self._pyramid) <= level:
+                    self._pyramid.append(_halve(self._pyramid[-1], self.downsampleMode))
+        return self._pyramid[level], level
+
+    def _pyramidReady(self, thread):
+        ## Redraw from the newly computed levels (ignoring threads that were 
+        ## aborted or replaced since they finished)
+        if thread is not self._pyramidThread or thread.aborted:
+            return
+        self.qimage = None
+        self.update()
+
+    def _clearPyramid(self):
+        ## Discard downsampled levels and rendered tiles
+        if self._pyramidThread is not None:
+            self._pyramidThread.aborted = True
+            self._pyramidThread.wait()
+            self._pyramidThread = None
+        self._pyramid = None
+        self._tiles.clear()
+
+    def _paintTiles(self, p):
+        ## Draw the visible tiles of the image at the coarsest pyramid level that
+        ## still has (about) one image pixel per screen pixel.
+        if isinstance(self.lut, collections.Callable):
+            lut = self.lut(self.image)
+        else:
+            lut = self.lut
+        
+        ## the cache key covers everything that affects a rendered tile
+        levelsKey = None if self.levels is None else tuple(np.asarray(self.levels, dtype=float).ravel())
+        lutKey = None if lut is None else (np.shape(lut), np.asarray(lut).tobytes())
+        
+        xds, yds = self._screenDownsample()
+        image, level = self._pyramidLevel(self._downsampleLevel(xds, yds))
+        sx = self.image.shape[0] / image.shape[0]
+        sy = self.image.shape[1] / image.shape[1]
+        
+        bounds = self.boundingRect()
+        rect = self.viewRect()
+        rect = bounds if rect is None else rect.intersected(bounds)
+        if rect.isEmpty():
+            return
+        
+        ts = self.tileSize
+        nx = int(np.ceil(image.shape[0] / ts))
+        ny = int(np.ceil(image.shape[1] / ts))
+        x0 = max(0, int(rect.left() / (sx * ts)))
+        x1 = min(nx, int(np.ceil(rect.right() / (sx * ts))))
+        y0 = max(0, int(rect.top() / (sy * ts)))
+        y1 = min(ny, int(np.ceil(rect.bottom() / (sy * ts))))
+        for tx in range(x0, x1):
+            for ty in range(y0, y1):
+                key = (level, tx, ty, levelsKey, lutKey)
+                qimage = self._tiles.get(key)
+                if qimage is None:
+                    tile = image[tx*ts:(tx+1)*ts, ty*ts:(ty+1)*ts]
+                    argb, alpha = fn.makeARGB(tile.transpose((1, 0, 2)[:tile.ndim]), lut=lut, levels=self.levels)
+                    qimage = fn.makeQImage(argb, alpha, copy=False, transpose=False)
+                    self._tiles[key] = qimage
+                p.drawImage(QtCore.QRectF(tx*ts*sx, ty*ts*sy, qimage.width()*sx, qimage.height()*sy), qimage)
 
     def paint(self, p, *args):
         profile = debug.Profiler()
         if self.image is None:
             return
+        if self.tileSize is not None and self.image.size > 0:
+            if self.paintMode is not None:
+                p.setCompositionMode(self.paintMode)
+            self._paintTiles(p)
+            profile('paint tiles')
+            if self.border is not None:
+                p.setPen(self.border)
+                p.drawRect(self.boundingRect())
+            return
         if self.qimage is None:
             self.render()
             if self.qimage is None:
@@ -396,9 +578,13 @@ class ImageItem(GraphicsObject):
         return br.width()/self.width(), br.height()/self.height()
     
     def viewTransformChanged(self):
-        if self.autoDownsample:
-            self.qimage = None
-            self.update()
+        if self.autoDownsample and self.image is not None and self.image.size > 0:
+            ## re-render only if a different amount of downsampling is needed
+            xds, yds = self._screenDownsample()
+            level = self._downsampleLevel(xds, yds)
+            if self._lastDownsample != (level, xds, yds):
+                self.qimage = None
+                self.update()
 
     #def mousePressEvent(self, ev):
         #if self.drawKernel is not None and ev.button() == QtCore.Qt.LeftButton:
@@ -526,3 +712,73 @@ class ImageItem(GraphicsObject):
     def emitRemoveRequested(self):
         self.removeTimer.timeout.disconnect(self.emitRemoveRequested)
         self.sigRemoveRequested.emit(self)
+
+
+class _PyramidThread(QtCore.QThread):
+    ## Computes the missing levels of an image pyramid, appending them to *pyramid*.
+    ## sigFinished(self) is emitted when all levels are done, unless aborted.
+    sigFinished = QtCore.Signal(object)
+    
+    def __init__(self, pyramid, mode):
+        QtCore.QThread.__init__(self)
+        self.pyramid = pyramid
+        self.mode = mode
+        self.aborted = False
+
+    def run(self):
+        abort = lambda: self.aborted
+        while min(self.pyramid[-1].shape[:2]) >= 2:
+            level = _halve(self.pyramid[-1], self.mode, abort)
+            if level is None:
+                return
+            self.pyramid.append(level)
+        if not self.aborted:
+            self.sigFinished.emit(self)
+
+
+def _halve(data, mode='mean', abort=None):
+    ## Downsample *data* by 2 along its first two axes, combining 2x2 blocks by
+    ## their mean or max and keeping the dtype. Works on blocks of rows to limit
+    ## temporary memory; returns None if *abort*() becomes True between blocks.
+    nx, ny = data.shape[0] // 2, data.shape[1] // 2
+    out = np.empty((nx, ny) + data.shape[2:], dtype=data.dtype)
+    if out.size == 0:
+        return out
+    ## float32 sums of four integers of up to 16 bits are exact
+    if data.dtype.kind in 'fc':
+        wdt = np.result_type(data.dtype, np.float32)
+    elif data.dtype.itemsize <= 2:
+        wdt = np.float32
+    else:
+        wdt = np.float64
+    rows = max(1, 2**18 // out[0].size)
+    for i in range(0, nx, rows):
+        if abort is not None and abort():
+            return None
+        j = min(i + rows, nx)
+        quads = [data[2*i+dx:2*j:2, dy:2*ny:2] for dx in (0, 1) for dy in (0, 1)]
+        if mode == 'max':
+            block = out[i:j]
+            np.maximum(quads[0], quads[1], out=block)
+            np.maximum(block, quads[2], out=block)
+            np.maximum(block, quads[3], out=block)
+        else:
+            block = quads[0].astype(wdt)
+            for q in quads[1:]:
+                block += q
+            block *= 0.25
+            out[i:j] = block
+    return out
+
+
+def _downsample(data, n, axis, mode='mean'):
+    ## Downsample *data* by an integer factor *n* along *axis*
+    if n <= 1:
+        return data
+    if mode == 'mean':
+        return fn.downsample(data, n, axis=axis)
+    nPts = data.shape[axis] // n
+    sl = [slice(None)] * data.ndim
+    sl[axis] = slice(0, nPts*n)
+    shape = data.shape[:axis] + (nPts, n) + data.shape[axis+1:]
+    return data[tuple(sl)].reshape(shape).max(axis=axis+1)
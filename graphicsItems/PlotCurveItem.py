@@ -12,6 +12,8 @@ from ..Point import Point
 import struct, sys
 from .. import getConfigOption
 from .. import debug
+from ..util.ring_buffer import RingBuffer
+from ..util.minmax_pyramid import MinMaxPyramid
 
 __all__ = ['PlotCurveItem']
 class PlotCurveItem(GraphicsObject):
@@ -38,6 +40,16 @@ class PlotCurveItem(GraphicsObject):
     sigPlotChanged = QtCore.Signal(object)
     sigClicked = QtCore.Signal(object)
     
+    ## number of samples per sub-path when drawing in chunks
+    pathChunkSize = 10000
+    ## if False, lines are drawn as a single QPainterPath instead of in chunks
+    ## (polyline mode then draws the whole curve as one chunk)
+    pathChunking = True
+    ## data sets at least this large answer dataBounds() from block min/max tables
+    boundsIndexMinSize = 65536
+    ## block size used to classify samples against an orthoRange
+    boundsBlockSize = 4096
+    
     def __init__(self, *args, **kargs):
         """
         Forwards all arguments to :func:`setData <pyqtgraph.PlotCurveItem.setData>`.
@@ -68,6 +80,8 @@ class PlotCurveItem(GraphicsObject):
             'antialias': getConfigOption('antialias'),
             'connect': 'all',
             'mouseWidth': 8, # width of shape responding to mouse click
+            'bufferSize': None,
+            'polyline': False,
         }
         self.setClickable(kargs.get('clickable', False))
         self.setData(*args, **kargs)
@@ -115,25 +129,173 @@ class PlotCurveItem(GraphicsObject):
             d = y
             d2 = x
 
-        ## If an orthogonal range is specified, mask the data now
+        ## Use the cached finite mask so that non-finite values are only
+        ## located once per setData (not available in step mode, where x and y
+        ## differ in length).
+        finite = None
+        allFinite = False
+        if not self.opts['stepMode']:
+            allFinite, finite = self._finite()
+            
+        ## Large, finite data sets are answered from block min/max tables
+        if frac >= 1.0 and allFinite and len(x) >= self.boundsIndexMinSize:
+            b = self._indexedBounds(ax, orthoRange)
+            if b is None:
+                return (None, None)
+            b = self._padBounds(ax, b)
+            self._boundsCache[ax] = [(frac, orthoRange), b]
+            return b
+            
+        ## If an orthogonal range is specified, select the data in it now
         if orthoRange is not None:
-            mask = (d2 >= orthoRange[0]) * (d2 <= orthoRange[1])
-            d = d[mask]
-            #d2 = d2[mask]
+            if ax == 1 and finite is not None and self._isXMonotonic():
+                ## x is sorted; the selection is a contiguous range
+                i0 = np.searchsorted(d2, orthoRange[0], side='left')
+                i1 = np.searchsorted(d2, orthoRange[1], side='right')
+                d = d[i0:i1][finite[i0:i1]]
+            else:
+                mask = (d2 >= orthoRange[0]) * (d2 <= orthoRange[1])
+                if finite is not None:
+                    mask &= finite
+                d = d[mask]
+                #d2 = d2[mask]
+            if finite is not None:
+                allFinite = True
+        elif finite is not None:
+            d = d[finite]
+            allFinite = True
+            
+        ## Percentiles are estimated from a fixed-size random sample of the selected data
+        if frac < 1.0:
+            idx = fn.percentileSample(len(d))
+            if idx is not None:
+                d = d[idx]
             
         if len(d) == 0:
             return (None, None)
 
         ## Get min/max (or percentiles) of the requested data range
         if frac >= 1.0:
-            b = (np.nanmin(d), np.nanmax(d))
+            if allFinite:
+                b = (d.min(), d.max())
+            else:
+                b = (np.nanmin(d), np.nanmax(d))
         elif frac <= 0.0:
             raise Exception("Value for parameter 'frac' must be > 0. (got %s)" % str(frac))
         else:
-            mask = np.isfinite(d)
-            d = d[mask]
+            if not allFinite:
+                mask = np.isfinite(d)
+                d = d[mask]
             b = np.percentile(d, [50 * (1 - frac), 50 * (1 + frac)])
 
+        b = self._padBounds(ax, b)
+        self._boundsCache[ax] = [(frac, orthoRange), b]
+        return b
+
+    def _boundsPyramid(self, ax):
+        ## block min/max table for x (ax=0) or y (ax=1), built on first use
+        ## and extended by appendData
+        pyr = self._boundsPyramids[ax]
+        if pyr is None:
+            pyr = MinMaxPyramid(self.getData()[ax], factor=16, offset=self._dataOffset())
+            self._boundsPyramids[ax] = pyr
+        return pyr
+    
+    def _isXMonotonic(self):
+        if self._xMonotonic is None:
+            x = self.xData
+            self._xMonotonic = len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+        return self._xMonotonic
+        
+    def _indexedBounds(self, ax, orthoRange):
+        """
+        Return the (min, max) of the data along *ax*, optionally limited to
+        samples whose orthogonal coordinate lies within *orthoRange*. All
+        data must be finite.
+        
+        Without an orthoRange, or for y with sorted x, the result is read
+        from the min/max pyramid in O(log n). Otherwise blocks of
+        *boundsBlockSize* samples are classified using the block min/max of
+        the orthogonal coordinate: blocks entirely inside the range
+        contribute their block min/max, blocks entirely outside are skipped,
+        and only samples in partially overlapping blocks are examined.
+        """
+        x, y = self.getData()
+        d, d2 = (x, y) if ax == 0 else (y, x)
+        pyr = self._boundsPyramid(ax)
+        if orthoRange is None:
+            return pyr.rangeMinMax(d, 0, len(d))
+        lo, hi = orthoRange
+        if ax == 1 and self._isXMonotonic():
+            i0 = np.searchsorted(x, lo, side='left')
+            i1 = np.searchsorted(x, hi, side='right')
+            return pyr.rangeMinMax(d, i0, i1)
+        
+        pyr2 = self._boundsPyramid(1-ax)
+        lev = 0
+        while lev+1 < pyr.nLevels() and pyr.blockSize(lev+1) <= self.boundsBlockSize:
+            lev += 1
+        bs = pyr.blockSize(lev)
+        first = pyr.firstBlock(lev)
+        mn, mx = pyr.level(lev)
+        mn2, mx2 = pyr2.level(lev)
+        inside = (mn2 >= lo) & (mx2 <= hi)
+        partial = ~inside & (mx2 >= lo) & (mn2 <= hi)
+        
+        mins = []
+        maxs = []
+        if inside.any():
+            mins.append(mn[inside].min())
+            maxs.append(mx[inside].max())
+        ## samples in partially overlapping blocks, and samples before the
+        ## first / after the last complete block
+        off = self._dataOffset()
+        i0 = first * bs - off
+        i1 = i0 + len(mn) * bs
+        segs = [(d[:i0], d2[:i0]), (d[i1:], d2[i1:])]
+        if partial.any():
+            segs.append((d[i0:i1].reshape(len(mn), bs)[partial], d2[i0:i1].reshape(len(mn), bs)[partial]))
+        for sd, sd2 in segs:
+            sd = sd[(sd2 >= lo) & (sd2 <= hi)]
+            if sd.size > 0:
+                mins.append(sd.min())
+                maxs.append(sd.max())
+        if len(mins) == 0:
+            return None
+        return min(mins), max(maxs)
+    
+    def _finite(self):
+        """
+        Return (allFinite, mask) where *mask* is the cached boolean array
+        np.isfinite(x) & np.isfinite(y), or None if all values are finite.
+        The mask is computed once per setData and extended by appendData.
+        """
+        if self._allFinite is None:
+            x, y = self.getData()
+            mask = np.isfinite(x) & np.isfinite(y)
+            self._allFinite = bool(mask.all())
+            self._finiteMask = None if self._allFinite else mask
+        return self._allFinite, self._finiteMask
+    
+    def _finiteSegment(self, x, y, i0, i1):
+        """
+        Return (x, y, connect) for samples [i0, i1) of *x*, *y* suitable for
+        arrayToQPath, such that only consecutive finite samples are joined.
+        Non-finite samples are dropped, since Qt refuses to draw paths
+        containing NaN; the sample before each gap ends its subpath.
+        """
+        allFinite, mask = self._finite()
+        xc = x[i0:i1]
+        yc = y[i0:i1]
+        if allFinite:
+            return xc, yc, 'all'
+        m = mask[i0:i1]
+        ## connect[i] joins vertex i to vertex i+1
+        c = np.zeros(len(m), dtype=np.int32)
+        np.logical_and(m[:-1], m[1:], out=c[:-1], casting='unsafe')
+        return xc[m], yc[m], c[m]
+        
+    def _padBounds(self, ax, b):
         ## adjust for fill level
         if ax == 1 and self.opts['fillLevel'] is not None:
             b = (min(b[0], self.opts['fillLevel']), max(b[1], self.opts['fillLevel']))
@@ -145,8 +307,6 @@ class PlotCurveItem(GraphicsObject):
             b = (b[0] - pen.widthF()*0.7072, b[1] + pen.widthF()*0.7072)
         if spen is not None and not spen.isCosmetic() and spen.style() != QtCore.Qt.NoPen:
             b = (b[0] - spen.widthF()*0.7072, b[1] + spen.widthF()*0.7072)
-            
-        self._boundsCache[ax] = [(frac, orthoRange), b]
         return b
             
     def pixelPadding(self):
@@ -288,6 +448,15 @@ class PlotCurveItem(GraphicsObject):
                         to be drawn. "finite" causes segments to be omitted if
                         they are attached to nan or inf values. For any other
                         connectivity, specify an array of boolean values.
+        bufferSize      (int or None) Maximum number of samples kept by
+                        :func:`appendData <pyqtgraph.PlotCurveItem.appendData>`.
+                        When more samples are appended, the oldest are
+                        discarded.
+        polyline        (bool) If True, curves with connect="all" or "finite"
+                        and no fill are drawn with QPainter.drawPolyline
+                        instead of through a QPainterPath, which is
+                        considerably faster for large numbers of points.
+                        Default is False.
         ==============  ========================================================
         
         If non-keyword arguments are used, they will be interpreted as
@@ -331,6 +500,10 @@ class PlotCurveItem(GraphicsObject):
         self.informViewBoundsChanged()
         self.yData = kargs['y'].view(np.ndarray)
         self.xData = kargs['x'].view(np.ndarray)
+        self._xBuffer = self._yBuffer = None
+        self._finiteMask = self._allFinite = self._maskBuffer = None
+        self._boundsPyramids = [None, None]
+        self._xMonotonic = None
         
         profiler('copy')
         
@@ -347,12 +520,14 @@ class PlotCurveItem(GraphicsObject):
         self.path = None
         self.fillPath = None
         self._mouseShape = None
+        self._pathChunks = []
         #self.xDisp = self.yDisp = None
         
         if 'name' in kargs:
             self.opts['name'] = kargs['name']
         if 'connect' in kargs:
             self.opts['connect'] = kargs['connect']
+            self._pathChunks = []
         if 'pen' in kargs:
             self.setPen(kargs['pen'])
         if 'shadowPen' in kargs:
@@ -363,6 +538,11 @@ class PlotCurveItem(GraphicsObject):
             self.setBrush(kargs['brush'])
         if 'antialias' in kargs:
             self.opts['antialias'] = kargs['antialias']
+        if 'bufferSize' in kargs:
+            self.opts['bufferSize'] = kargs['bufferSize']
+        if 'polyline' in kargs:
+            self.opts['polyline'] = kargs['polyline']
+            self._pathChunks = []
         
         
         profiler('set')
@@ -371,6 +551,230 @@ class PlotCurveItem(GraphicsObject):
         self.sigPlotChanged.emit(self)
         profiler('emit')
         
+    def appendData(self, *args, **kargs):
+        """
+        Append samples to the curve without copying the existing data.
+
+        Accepts appendData(y), appendData(x, y), or the keyword arguments *x*
+        and *y*. If *x* is omitted, the new samples continue the sample index
+        of the existing data. The data is kept in a
+        :class:`RingBuffer <pyqtgraph.util.ring_buffer.RingBuffer>`; if the
+        *bufferSize* option is set, the oldest samples are discarded once the
+        buffer is full. Cached data bounds are extended rather than recomputed
+        as long as no samples are discarded.
+        """
+        y = kargs.get('y', None)
+        x = kargs.get('x', None)
+        if len(args) == 1:
+            y = args[0]
+        elif len(args) == 2:
+            x, y = args
+        if y is None:
+            return
+        if self.opts['stepMode']:
+            raise Exception("appendData is not supported when stepMode=True.")
+        y = np.asarray(y).view(np.ndarray)
+        if y.ndim == 0:
+            y = y.reshape(1)
+        if x is None:
+            end = 0
+            if self._xBuffer is not None:
+                end = self._xBuffer.start + len(self._xBuffer)
+            elif self.xData is not None:
+                end = len(self.xData)
+            x = np.arange(end, end + len(y))
+        x = np.asarray(x).view(np.ndarray)
+        if x.ndim == 0:
+            x = x.reshape(1)
+        if x.shape != y.shape:
+            raise Exception("X and Y arrays must be the same shape--got %s and %s." % (x.shape, y.shape))
+        
+        if self._xBuffer is None:
+            size = self.opts['bufferSize']
+            xOld = self.xData if self.xData is not None else np.empty(0)
+            yOld = self.yData if self.yData is not None else np.empty(0)
+            self._xBuffer = RingBuffer(size, dtype=np.promote_types(xOld.dtype, x.dtype), data=xOld)
+            self._yBuffer = RingBuffer(size, dtype=np.promote_types(yOld.dtype, y.dtype), data=yOld)
+        
+        ## extend the cached finite mask
+        newMask = np.isfinite(x) & np.isfinite(y)
+        newFinite = bool(newMask.all())
+        if self._allFinite is not None and not (self._allFinite and newFinite):
+            if self._maskBuffer is None:
+                oldMask = self._finiteMask
+                if oldMask is None:
+                    oldMask = np.ones(len(self.xData), dtype=bool)
+                self._maskBuffer = RingBuffer(self.opts['bufferSize'], dtype=bool, data=oldMask)
+            self._maskBuffer.push(newMask)
+            self._finiteMask = self._maskBuffer.data()
+            self._allFinite = False
+        
+        if self._xMonotonic and len(x) > 0 and len(self.xData) > 0:
+            ## read the last sample before the buffer is overwritten
+            self._xMonotonic = bool(x[0] >= self.xData[-1] and np.all(x[1:] >= x[:-1]))
+        self._xBuffer.push(x)
+        dropped = self._yBuffer.push(y)
+        self.xData = self._xBuffer.data()
+        self.yData = self._yBuffer.data()
+        
+        ## extend the block min/max tables; they are only used for finite data
+        if self._allFinite:
+            for ax, d in enumerate((self.xData, self.yData)):
+                if self._boundsPyramids[ax] is not None:
+                    self._boundsPyramids[ax].update(d, self._dataOffset())
+        else:
+            self._boundsPyramids = [None, None]
+        
+        ## extend cached full-range bounds instead of discarding them
+        for ax, d in enumerate((x, y)):
+            cache = self._boundsCache[ax]
+            if not newFinite:
+                d = d[newMask]
+            if dropped == 0 and cache is not None and cache[0] == (1.0, None):
+                if len(d) > 0:
+                    b = self._padBounds(ax, (d.min(), d.max()))
+                    cache[1] = (min(cache[1][0], b[0]), max(cache[1][1], b[1]))
+            else:
+                self._boundsCache[ax] = None
+        self._boundingRect = None
+        
+        self.prepareGeometryChange()
+        self.informViewBoundsChanged()
+        self.path = None
+        self.fillPath = None
+        self._mouseShape = None
+        self.update()
+        self.sigPlotChanged.emit(self)
+        
+    def _dataOffset(self):
+        ## absolute sample index of xData[0]; nonzero once appendData has discarded samples
+        if self._xBuffer is None:
+            return 0
+        return self._xBuffer.start
+    
+    def _drawInChunks(self):
+        ## chunked drawing is used for plain line plots; fills and step mode
+        ## need a single connected path.
+        if not self.pathChunking and not self._usePolyline():
+            return False
+        return not self.opts['stepMode'] and (self.opts['brush'] is None or self.opts['fillLevel'] is None)
+    
+    def _updatePathChunks(self):
+        """
+        Bring the list of sub-paths up to date with the current data.
+        
+        The data is split into chunks of *pathChunkSize* samples, aligned to
+        absolute sample indexes. Chunks whose sample range is unchanged are
+        kept across calls to appendData; only the last (partial) chunk,
+        chunks covering new samples, and a chunk whose leading samples have
+        been discarded are regenerated. Each chunk begins with the last sample of the
+        previous chunk so that the line is continuous.
+        """
+        x, y = self.getData()
+        offset = self._dataOffset()
+        end = offset + len(x)
+        size = self.pathChunkSize if self.pathChunking else max(end, 1)
+        ## reuse chunks whose sample range is unchanged
+        cached = dict(((c[0], c[1]), c) for c in self._pathChunks)
+        
+        connect = self.opts['connect']
+        if not isinstance(connect, np.ndarray) and connect == 'pairs':
+            if len(x) % 2 != 0:
+                raise Exception("x,y array lengths must be multiple of 2 to use connect='pairs'")
+            ## samples are paired relative to xData[0], so cached chunks pair
+            ## the wrong samples once an odd number of samples has been discarded
+            if (offset - self._pathChunkOffset) % 2 != 0:
+                cached = {}
+        polyline = self._usePolyline()
+        
+        chunks = []
+        start = offset
+        while start < end:
+            stop = min(end, (start // size + 1) * size)
+            if (start, stop) in cached:
+                chunks.append(cached[(start, stop)])
+                start = stop
+                continue
+            i0 = start - offset
+            i1 = stop - offset
+            if i0 > 0:
+                ## overlap one sample with the previous chunk
+                i0 -= 1
+            xc = x[i0:i1]
+            yc = y[i0:i1]
+            if polyline:
+                shapes = self._polylines(xc, yc, connect, i0, i1)
+            elif not isinstance(connect, np.ndarray) and connect == 'finite':
+                shapes = [fn.arrayToQPath(*self._finiteSegment(x, y, i0, i1), buffer=self._pathBuffer)]
+            else:
+                ## the stream format always starts a path with a move; connect[i]
+                ## determines whether vertex i is joined to vertex i+1.
+                if isinstance(connect, np.ndarray):
+                    c = connect[i0:i1]
+                elif connect == 'pairs':
+                    ## same connectivity as arrayToQPath(..., connect='pairs'), but
+                    ## valid for chunks of odd length
+                    c = ((np.arange(i0, i1) % 2) == 0).astype(np.int32)
+                else:
+                    c = connect
+                shapes = [fn.arrayToQPath(xc, yc, connect=c, buffer=self._pathBuffer)]
+            
+            mask = np.isfinite(xc) & np.isfinite(yc)
+            if mask.all():
+                rect = (xc.min(), yc.min(), xc.max(), yc.max())
+            elif mask.any():
+                rect = (xc[mask].min(), yc[mask].min(), xc[mask].max(), yc[mask].max())
+            else:
+                rect = None
+            chunks.append([start, stop, shapes, rect])
+            start = stop
+        self._pathChunks = chunks
+        self._pathChunkOffset = offset
+        return chunks
+    
+    def _usePolyline(self):
+        connect = self.opts['connect']
+        return self.opts['polyline'] and not isinstance(connect, np.ndarray) and connect in ('all', 'finite')
+    
+    def _polylines(self, x, y, connect, i0, i1):
+        ## return a list of QPolygonF, one for each run of connected samples
+        ## in x, y (which are samples [i0, i1) of the data)
+        allFinite = True
+        if connect == 'finite':
+            allFinite, mask = self._finite()
+        if allFinite:
+            return [fn.arrayToQPolygonF(x, y)]
+        ## indexes where runs of finite values start and stop
+        edges = np.diff(np.concatenate([[0], mask[i0:i1].view(np.int8), [0]]))
+        starts = np.argwhere(edges == 1)[:,0]
+        stops = np.argwhere(edges == -1)[:,0]
+        return [fn.arrayToQPolygonF(x[a:b], y[a:b]) for a, b in zip(starts, stops) if b - a > 1]
+    
+    def _visibleChunks(self):
+        ## return the sub-paths whose bounds intersect the visible area
+        chunks = self._updatePathChunks()
+        if len(chunks) == 1:
+            return chunks[0][2]
+        vr = self.viewRect()
+        if vr is None:
+            return [shape for c in chunks for shape in c[2]]
+        ## expand visible area by the widest of the pen and shadow pen: cosmetic
+        ## widths (as in pixelPadding) are in pixels, others in data units
+        px, py = self.pixelVectors()
+        pxPad = max(self.pixelPadding(), 0.7072)
+        dx = 0 if px is None else px.length() * pxPad
+        dy = 0 if py is None else py.length() * pxPad
+        for pen in (self.opts['pen'], self.opts['shadowPen']):
+            if pen is not None and not pen.isCosmetic() and pen.style() != QtCore.Qt.NoPen:
+                dx = max(dx, pen.widthF() * 0.7072)
+                dy = max(dy, pen.widthF() * 0.7072)
+        left, right = vr.left() - dx, vr.right() + dx
+        top, bottom = vr.top() - dy, vr.bottom() + dy
+        ## QRectF.intersects() is false for zero-width rectangles, so compare directly
+        return [shape for c in chunks if c[3] is not None and 
+                c[3][0] <= right and c[3][2] >= left and c[3][1] <= bottom and c[3][3] >= top
+                for shape in c[2]]
+        
     def generatePath(self, x, y):
         if self.opts['stepMode']:
             ## each value in the x/y arrays generates 2 points.
@@ -390,7 +794,10 @@ class PlotCurveItem(GraphicsObject):
                 y[0] = self.opts['fillLevel']
                 y[-1] = self.opts['fillLevel']
         
-        path = fn.arrayToQPath(x, y, connect=self.opts['connect'])
+        connect = self.opts['connect']
+        if not self.opts['stepMode'] and not isinstance(connect, np.ndarray) and connect == 'finite':
+            x, y, connect = self._finiteSegment(x, y, 0, len(x))
+        path = fn.arrayToQPath(x, y, connect=connect, buffer=self._pathBuffer)
         
         return path
 
@@ -419,7 +826,12 @@ class PlotCurveItem(GraphicsObject):
         
         x = None
         y = None
-        path = self.getPath()
+        if self._drawInChunks() and self._exportOpts is False:
+            ## draw only the sub-paths (or polylines) that are in view; the
+            ## full path is still generated on demand for the mouse shape.
+            paths = None
+        else:
+            paths = [self.getPath()]
         
         profiler('generate path')
         
@@ -448,6 +860,9 @@ class PlotCurveItem(GraphicsObject):
             
         sp = fn.mkPen(self.opts['shadowPen'])
         cp = fn.mkPen(self.opts['pen'])
+        if paths is None:
+            paths = self._visibleChunks()
+            profiler('update path chunks')
  
         ## Copy pens and apply alpha adjustment
         #sp = QtGui.QPen(self.opts['shadowPen'])
@@ -462,11 +877,15 @@ class PlotCurveItem(GraphicsObject):
             
             
             
-        if sp is not None and sp.style() != QtCore.Qt.NoPen:
-            p.setPen(sp)
-            p.drawPath(path)
-        p.setPen(cp)
-        p.drawPath(path)
+        for pen in (sp, cp):
+            if pen is None or pen.style() == QtCore.Qt.NoPen:
+                continue
+            p.setPen(pen)
+            for path in paths:
+                if isinstance(path, QtGui.QPolygonF):
+                    p.drawPolyline(path)
+                else:
+                    p.drawPath(path)
         profiler('drawPath')
         
         #print "Render hints:", int(p.renderHints())
@@ -543,6 +962,16 @@ class PlotCurveItem(GraphicsObject):
         self._mouseShape = None
         self._mouseBounds = None
         self._boundsCache = [None, None]
+        self._xBuffer = None  ## RingBuffers used by appendData
+        self._yBuffer = None
+        self._pathChunks = []  ## [start, stop, path, rect] sub-paths, see _updatePathChunks
+        self._pathChunkOffset = 0  ## data offset when _pathChunks was built
+        self._pathBuffer = fn.PathBuffer()  ## scratch memory reused by arrayToQPath
+        self._finiteMask = None  ## cached np.isfinite(x) & np.isfinite(y); see _finite()
+        self._allFinite = None
+        self._maskBuffer = None
+        self._boundsPyramids = [None, None]  ## see _boundsPyramid()
+        self._xMonotonic = None
         #del self.xData, self.yData, self.xDisp, self.yDisp, self.path
 
     def mouseShape(self):
@@ -7,6 +7,8 @@ import numpy as np
 from .. import functions as fn
 from .. import debug as debug
 from .. import getConfigOption
+from ..util.minmax_pyramid import MinMaxPyramid
+from ..util.ring_buffer import RingBuffer
 
 class PlotDataItem(GraphicsObject):
     """
@@ -94,28 +96,48 @@ class PlotDataItem(GraphicsObject):
         
         **Optimization keyword arguments:**
         
-            ================ =====================================================================
-            antialias        (bool) By default, antialiasing is disabled to improve performance.
-                             Note that in some cases (in particluar, when pxMode=True), points 
-                             will be rendered antialiased even if this is set to False.
-            decimate         deprecated.
-            downsample       (int) Reduce the number of samples displayed by this value
-            downsampleMethod 'subsample': Downsample by taking the first of N samples. 
-                             This method is fastest and least accurate.
-                             'mean': Downsample by taking the mean of N samples.
-                             'peak': Downsample by drawing a saw wave that follows the min 
-                             and max of the original data. This method produces the best 
-                             visual representation of the data but is slower.
-            autoDownsample   (bool) If True, resample the data before plotting to avoid plotting
-                             multiple line segments per pixel. This can improve performance when
-                             viewing very high-density data, but increases the initial overhead 
-                             and memory usage.
-            clipToView       (bool) If True, only plot data that is visible within the X range of
-                             the containing ViewBox. This can improve performance when plotting
-                             very large data sets where only a fraction of the data is visible
-                             at any time.
-            identical        *deprecated*
-            ================ =====================================================================
+            ================= =====================================================================
+            antialias         (bool) By default, antialiasing is disabled to improve performance.
+                              Note that in some cases (in particluar, when pxMode=True), points 
+                              will be rendered antialiased even if this is set to False.
+            decimate          deprecated.
+            downsample        (int) Reduce the number of samples displayed by this value
+            downsampleMethod  'subsample': Downsample by taking the first of N samples. 
+                              This method is fastest and least accurate.
+                              'mean': Downsample by taking the mean of N samples.
+                              'peak': Downsample by drawing a saw wave that follows the min 
+                              and max of the original data. This method produces the best 
+                              visual representation of the data but is slower.
+                              'm4': Keep the first, min, max and last of every N samples.
+                              With autoDownsample, N is chosen so that each group spans about
+                              one pixel column, which draws approximately the same line as the
+                              full data.
+                              'lttb': Keep one of every N samples, chosen by the
+                              Largest-Triangle-Three-Buckets method to preserve the visual
+                              shape of the curve.
+            downsamplePyramid (bool) If True, 'peak' downsampling reads from a min/max pyramid
+                              that is built once when the data is set (and extended by
+                              appendData), so that zooming and panning cost scales with the
+                              number of displayed samples rather than the size of the data.
+                              This costs roughly 2/3 of the data size in extra memory.
+            autoDownsample    (bool) If True, resample the data before plotting to avoid plotting
+                              multiple line segments per pixel. This can improve performance when
+                              viewing very high-density data, but increases the initial overhead 
+                              and memory usage.
+            clipToView        (bool) If True, only plot data that is visible within the X range of
+                              the containing ViewBox. This can improve performance when plotting
+                              very large data sets where only a fraction of the data is visible
+                              at any time.
+            polyline          (bool) If True, the curve is drawn with QPainter.drawPolyline rather
+                              than through a QPainterPath when connect is 'all' or 'finite'. This
+                              is much faster for large data sets.
+                              See :func:`PlotCurveItem.setData <pyqtgraph.PlotCurveItem.setData>`.
+            bufferSize        (int or None) Maximum number of samples kept when data is added with
+                              :func:`appendData <pyqtgraph.PlotDataItem.appendData>`. Once the
+                              buffer is full, the oldest samples are discarded. None (default)
+                              keeps all samples.
+            identical         *deprecated*
+            ================= =====================================================================
         
         **Meta-info keyword arguments:**
         
@@ -129,6 +151,13 @@ class PlotDataItem(GraphicsObject):
         self.yData = None
         self.xDisp = None
         self.yDisp = None
+        self.xClean = None  ## data after fft / log transforms
+        self.yClean = None
+        self._xMonotonic = None  ## cached check for sorted xClean
+        self._pyramid = None
+        self._xBuffer = None  ## RingBuffers used by appendData
+        self._yBuffer = None
+        self._curveIsRaw = False  ## curve displays xData/yData unmodified
         #self.dataMask = None
         #self.curves = []
         #self.scatters = []
@@ -168,8 +197,11 @@ class PlotDataItem(GraphicsObject):
             'downsample': 1,
             'autoDownsample': False,
             'downsampleMethod': 'peak',
+            'downsamplePyramid': False,
             'autoDownsampleFactor': 5.,  # draw ~5 samples per pixel
             'clipToView': False,
+            'bufferSize': None,
+            'polyline': False,
             
             'data': None,
         }
@@ -296,7 +328,7 @@ class PlotDataItem(GraphicsObject):
         #self.scatter.setSymbolSize(symbolSize)
         self.updateItems()
 
-    def setDownsampling(self, ds=None, auto=None, method=None):
+    def setDownsampling(self, ds=None, auto=None, method=None, pyramid=None):
         """
         Set the downsampling mode of this item. Downsampling reduces the number
         of samples drawn to increase performance. 
@@ -312,6 +344,13 @@ class PlotDataItem(GraphicsObject):
                         'peak': Downsample by drawing a saw wave that follows the min
                         and max of the original data. This method produces the best
                         visual representation of the data but is slower.
+                        'm4': Keep the first, min, max and last of every N samples
+                        (see :func:`downsampleM4 <pyqtgraph.downsampleM4>`).
+                        'lttb': Largest-Triangle-Three-Buckets downsampling
+                        (see :func:`downsampleLTTB <pyqtgraph.downsampleLTTB>`).
+        pyramid         (bool) If True, 'peak' downsampling uses a precomputed min/max
+                        pyramid of the data (see *downsamplePyramid* in
+                        :func:`__init__() <pyqtgraph.PlotDataItem.__init__>`).
         ==============  =================================================================
         """
         changed = False
@@ -325,10 +364,17 @@ class PlotDataItem(GraphicsObject):
             changed = True
                 
         if method is not None:
+            if method not in ('subsample', 'mean', 'peak', 'm4', 'lttb'):
+                raise ValueError("method argument must be 'subsample', 'mean', 'peak', 'm4', or 'lttb'.")
             if self.opts['downsampleMethod'] != method:
                 changed = True
                 self.opts['downsampleMethod'] = method
         
+        if pyramid is not None and self.opts['downsamplePyramid'] != pyramid:
+            self.opts['downsamplePyramid'] = pyramid
+            self._pyramid = None
+            changed = True
+        
         if changed:
             self.xDisp = self.yDisp = None
             self.updateItems()
@@ -341,6 +387,38 @@ class PlotDataItem(GraphicsObject):
         self.updateItems()
         
         
+    def setBufferSize(self, size):
+        """
+        Set the maximum number of samples kept by :func:`appendData <pyqtgraph.PlotDataItem.appendData>`.
+        If *size* is None, no samples are discarded.
+        """
+        if self.opts['bufferSize'] == size:
+            return
+        self.opts['bufferSize'] = size
+        if self._yBuffer is None:
+            return
+        ## keep the absolute sample index so that appended x values and the
+        ## pyramid stay aligned with the samples already seen
+        start = self._yBuffer.start
+        self._xBuffer = RingBuffer(size, self._xBuffer.dtype, self.xData)
+        self._yBuffer = RingBuffer(size, self._yBuffer.dtype, self.yData)
+        self._xBuffer.start += start
+        self._yBuffer.start += start
+        self.xData = self._xBuffer.data()
+        self.yData = self._yBuffer.data()
+        if self.xClean is not None and not (self.opts['fftMode'] or any(self.opts['logMode'])):
+            ## samples were only dropped from the front; the cached data remains valid
+            self.xClean = self.xData
+            self.yClean = self.yData
+            if self._pyramid is not None:
+                self._pyramid.update(self.yClean, self._dataOffset())
+        else:
+            self.xClean = self.yClean = None
+        self.xDisp = self.yDisp = None
+        self.updateItems()
+        self.informViewBoundsChanged()
+        self.sigPlotChanged.emit(self)
+        
     def setData(self, *args, **kargs):
         """
         Clear any data displayed by this item and display new data.
@@ -452,6 +530,7 @@ class PlotDataItem(GraphicsObject):
         
         self.xData = x.view(np.ndarray)  ## one last check to make sure there are no MetaArrays getting by
         self.yData = y.view(np.ndarray)
+        self._xBuffer = self._yBuffer = None
         self.xClean = self.yClean = None
         self.xDisp = None
         self.yDisp = None
@@ -471,7 +550,7 @@ class PlotDataItem(GraphicsObject):
     def updateItems(self):
         
         curveArgs = {}
-        for k,v in [('pen','pen'), ('shadowPen','shadowPen'), ('fillLevel','fillLevel'), ('fillBrush', 'brush'), ('antialias', 'antialias'), ('connect', 'connect'), ('stepMode', 'stepMode')]:
+        for k,v in [('pen','pen'), ('shadowPen','shadowPen'), ('fillLevel','fillLevel'), ('fillBrush', 'brush'), ('antialias', 'antialias'), ('connect', 'connect'), ('stepMode', 'stepMode'), ('bufferSize', 'bufferSize'), ('polyline', 'polyline')]:
             curveArgs[v] = self.opts[k]
         
         scatterArgs = {}
@@ -485,8 +564,10 @@ class PlotDataItem(GraphicsObject):
         if curveArgs['pen'] is not None or (curveArgs['brush'] is not None and curveArgs['fillLevel'] is not None):
             self.curve.setData(x=x, y=y, **curveArgs)
             self.curve.show()
+            self._curveIsRaw = self._displayIsRaw() and not self.opts['stepMode']
         else:
             self.curve.hide()
+            self._curveIsRaw = False
         
         if scatterArgs['symbol'] is not None:
             self.scatter.setData(x=x, y=y, **scatterArgs)
@@ -510,11 +591,11 @@ class PlotDataItem(GraphicsObject):
                 #self.xClean = self.xData
                 #self.yClean = self.yData
             
-        if self.xDisp is None:
+        if self.xClean is None:
             x = self.xData
             y = self.yData
-            
-            
+
+
             #ds = self.opts['downsample']
             #if isinstance(ds, int) and ds > 1:
                 #x = x[::ds]
@@ -534,36 +615,71 @@ class PlotDataItem(GraphicsObject):
                     #y = y[self.dataMask]
                 #else:
                     #self.dataMask = None
-                    
+
+            ## cache transformed data so that view changes do not repeat the transforms
+            self.xClean = x
+            self.yClean = y
+            self._xMonotonic = None
+            self._pyramid = None
+
+        if self.xDisp is None:
+            x = self.xClean
+            y = self.yClean
+
             ds = self.opts['downsample']
             if not isinstance(ds, int):
                 ds = 1
-                
+
+            if self.opts['autoDownsample'] or self.opts['clipToView']:
+                visible = self._visibleIndexRange(x)
+
             if self.opts['autoDownsample']:
-                # this option presumes that x-values have uniform spacing
-                range = self.viewRect()
-                if range is not None:
-                    dx = float(x[-1]-x[0]) / (len(x)-1)
-                    x0 = (range.left()-x[0]) / dx
-                    x1 = (range.right()-x[0]) / dx
+                if visible is not None:
                     width = self.getViewBox().width()
+                    factor = self.opts['autoDownsampleFactor']
+                    if self.opts['downsampleMethod'] == 'm4':
+                        ## one group (4 samples) per pixel column is exact for line rendering
+                        factor = 1.
                     if width != 0.0:
-                        ds = int(max(1, int((x1-x0) / (width*self.opts['autoDownsampleFactor']))))
+                        ds = int(max(1, int((visible[1]-visible[0]) / (width*factor))))
                     ## downsampling is expensive; delay until after clipping.
-            
+
+            # index range of the data to display; slicing is deferred so that
+            # downsampling can make use of absolute indexes.
+            start = 0
+            stop = len(x)
             if self.opts['clipToView']:
                 view = self.getViewBox()
                 if view is None or not view.autoRangeEnabled()[0]:
-                    # this option presumes that x-values have uniform spacing
-                    range = self.viewRect()
-                    if range is not None and len(x) > 1:
-                        dx = float(x[-1]-x[0]) / (len(x)-1)
+                    if visible is not None and len(x) > 1:
                         # clip to visible region extended by downsampling value
-                        x0 = np.clip(int((range.left()-x[0])/dx)-1*ds , 0, len(x)-1)
-                        x1 = np.clip(int((range.right()-x[0])/dx)+2*ds , 0, len(x)-1)
-                        x = x[x0:x1]
-                        y = y[x0:x1]
-                    
+                        if self._xMonotonic:
+                            ## keep one sample beyond each edge so the line leaves the view
+                            start = max(0, visible[0] - ds)
+                            stop = min(len(x), visible[1] + ds)
+                        else:
+                            start = np.clip(int(visible[0])-1*ds , 0, len(x)-1)
+                            stop = np.clip(int(visible[1])+2*ds , 0, len(x)-1)
+
+            if ds > 1 and self.opts['downsampleMethod'] == 'peak' and self.opts['downsamplePyramid']:
+                if self._pyramid is None:
+                    self._pyramid = MinMaxPyramid(y, offset=self._dataOffset())
+                bins = self._pyramid.binMinMax(y, start, stop, ds)
+                if bins is not None:
+                    starts, mins, maxs = bins
+                    n = len(starts)
+                    x = np.repeat(x[starts], 2)
+                    y1 = np.empty((n,2), dtype=maxs.dtype)
+                    y1[:,0] = maxs
+                    y1[:,1] = mins
+                    y = y1.reshape(n*2)
+                    ds = 1
+                    start = 0
+                    stop = len(x)
+
+            x = x[start:stop]
+            y = y[start:stop]
+
             if ds > 1:
                 if self.opts['downsampleMethod'] == 'subsample':
                     x = x[::ds]
@@ -582,6 +698,10 @@ class PlotDataItem(GraphicsObject):
                     y1[:,0] = y2.max(axis=1)
                     y1[:,1] = y2.min(axis=1)
                     y = y1.reshape(n*2)
+                elif self.opts['downsampleMethod'] == 'm4':
+                    x, y = fn.downsampleM4(x, y, ds)
+                elif self.opts['downsampleMethod'] == 'lttb':
+                    x, y = fn.downsampleLTTB(x, y, ds)
                 
                     
             self.xDisp = x
@@ -590,6 +710,25 @@ class PlotDataItem(GraphicsObject):
         #print self.xDisp.shape, self.xDisp.min(), self.xDisp.max()
         return self.xDisp, self.yDisp
 
+    def _visibleIndexRange(self, x):
+        ## Return the (start, stop) indexes of the samples in *x* that fall within
+        ## the x range of the view, or None if the view range is unavailable.
+        ## For monotonic x the range is found by binary search; otherwise
+        ## x is assumed to be uniformly spaced and the (fractional) indexes
+        ## are only approximate.
+        range = self.viewRect()
+        if range is None or len(x) == 0:
+            return None
+        if self._xMonotonic is None:
+            self._xMonotonic = len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+        if self._xMonotonic:
+            return (int(np.searchsorted(x, range.left(), side='left')),
+                    int(np.searchsorted(x, range.right(), side='right')))
+        if len(x) < 2:
+            return None
+        dx = float(x[-1]-x[0]) / (len(x)-1)
+        return ((range.left()-x[0]) / dx, (range.right()-x[0]) / dx)
+
     def dataBounds(self, ax, frac=1.0, orthoRange=None):
         """
         Returns the range occupied by the data (along a specific axis) in this item.
@@ -644,13 +783,98 @@ class PlotDataItem(GraphicsObject):
         self.yData = None
         #self.xClean = None
         #self.yClean = None
+        self.xClean = None
+        self.yClean = None
         self.xDisp = None
         self.yDisp = None
+        self._pyramid = None
+        self._xBuffer = self._yBuffer = None
+        self._curveIsRaw = False
         self.curve.setData([])
         self.scatter.setData([])
-            
+
     def appendData(self, *args, **kargs):
-        pass
+        """
+        Append new samples to the data displayed by this item.
+
+        Accepts appendData(y), appendData(x, y), or the keyword arguments *x*
+        and *y*. If *x* is omitted, the new samples are given x values
+        continuing the sample index of the existing data.
+        
+        Samples are stored in a :class:`RingBuffer <pyqtgraph.util.ring_buffer.RingBuffer>`,
+        so appending does not copy the existing data. If the *bufferSize*
+        option is set, the oldest samples are discarded once the buffer is
+        full. Any cached min/max pyramid is extended rather than rebuilt, and
+        when no transform, clipping or downsampling is active the new samples
+        are forwarded to :func:`PlotCurveItem.appendData <pyqtgraph.PlotCurveItem.appendData>`.
+        """
+        y = kargs.get('y', None)
+        x = kargs.get('x', None)
+        if len(args) == 1:
+            y = args[0]
+        elif len(args) == 2:
+            x, y = args
+        if y is None:
+            return
+        if self.xData is None:
+            return self.setData(x=x, y=y)
+
+        y = np.asarray(y).view(np.ndarray)
+        if y.ndim == 0:
+            y = y.reshape(1)
+        if x is None:
+            end = self._dataOffset() + len(self.xData)
+            x = np.arange(end, end + len(y))
+        x = np.asarray(x).view(np.ndarray)
+        if x.ndim == 0:
+            x = x.reshape(1)
+        if x.shape != y.shape:
+            raise Exception("X and Y arrays must be the same shape--got %s and %s." % (x.shape, y.shape))
+
+        if self._yBuffer is None:
+            size = self.opts['bufferSize']
+            self._xBuffer = RingBuffer(size, np.promote_types(self.xData.dtype, x.dtype), self.xData)
+            self._yBuffer = RingBuffer(size, np.promote_types(self.yData.dtype, y.dtype), self.yData)
+        
+        transformed = self.opts['fftMode'] or any(self.opts['logMode'])
+        if self.xClean is not None and not transformed and self._xMonotonic and len(x) > 0 and len(self.xClean) > 0:
+            ## read the last sample before the buffer is overwritten
+            self._xMonotonic = bool(x[0] >= self.xClean[-1] and np.all(x[1:] >= x[:-1]))
+        self._xBuffer.push(x)
+        self._yBuffer.push(y)
+        self.xData = self._xBuffer.data()
+        self.yData = self._yBuffer.data()
+        if self.xClean is not None and not transformed:
+            ## no transforms; the cached data can be extended in place
+            self.xClean = self.xData
+            self.yClean = self.yData
+            if self._pyramid is not None:
+                self._pyramid.update(self.yClean, self._dataOffset())
+        else:
+            self.xClean = self.yClean = None
+        
+        if self._curveIsRaw and self.xClean is not None and self.opts['symbol'] is None:
+            ## displayed data is the raw data; let the curve extend its own buffer
+            self.curve.appendData(x, y)
+            self.xDisp = self.curve.xData
+            self.yDisp = self.curve.yData
+        else:
+            self.xDisp = self.yDisp = None
+            self.updateItems()
+        self.informViewBoundsChanged()
+        self.sigPlotChanged.emit(self)
+    
+    def _displayIsRaw(self):
+        ## True if getData() returns the data unmodified
+        ds = self.opts['downsample']
+        return not (self.opts['fftMode'] or any(self.opts['logMode']) or self.opts['clipToView'] 
+                    or self.opts['autoDownsample'] or (isinstance(ds, int) and ds > 1))
+    
+    def _dataOffset(self):
+        ## absolute sample index of xData[0]; nonzero once appendData has discarded samples
+        if self._yBuffer is None:
+            return 0
+        return self._yBuffer.start
     
     def curveClicked(self):
         self.sigClicked.emit(self)
@@ -259,6 +259,8 @@ class PlotItem(GraphicsWidget):
         c.autoDownsampleCheck.toggled.connect(self.updateDownsampling)
         c.subsampleRadio.toggled.connect(self.updateDownsampling)
         c.meanRadio.toggled.connect(self.updateDownsampling)
+        c.m4Radio.toggled.connect(self.updateDownsampling)
+        c.lttbRadio.toggled.connect(self.updateDownsampling)
         c.clipToViewCheck.toggled.connect(self.updateDownsampling)
 
         self.ctrl.avgParamList.itemClicked.connect(self.avgParamListClicked)
@@ -926,6 +928,10 @@ class PlotItem(GraphicsWidget):
                         'peak': Downsample by drawing a saw wave that follows the min
                         and max of the original data. This method produces the best
                         visual representation of the data but is slower.
+                        'm4': Keep the first, min, max and last of N samples. With
+                        *auto*, this draws approximately the same line as the full data.
+                        'lttb': Keep one of N samples chosen by the
+                        Largest-Triangle-Three-Buckets method.
         =============== =================================================================
         """
         if ds is not None:
@@ -949,8 +955,12 @@ class PlotItem(GraphicsWidget):
                 self.ctrl.meanRadio.setChecked(True)
             elif mode == 'peak':
                 self.ctrl.peakRadio.setChecked(True)
+            elif mode == 'm4':
+                self.ctrl.m4Radio.setChecked(True)
+            elif mode == 'lttb':
+                self.ctrl.lttbRadio.setChecked(True)
             else:
-                raise ValueError("mode argument must be 'subsample', 'mean', or 'peak'.")
+                raise ValueError("mode argument must be 'subsample', 'mean', 'peak', 'm4', or 'lttb'.")
             
     def updateDownsampling(self):
         ds, auto, method = self.downsampleMode()
@@ -974,6 +984,10 @@ class PlotItem(GraphicsWidget):
             method = 'mean'
         elif self.ctrl.peakRadio.isChecked():
             method = 'peak'
+        elif self.ctrl.m4Radio.isChecked():
+            method = 'm4'
+        elif self.ctrl.lttbRadio.isChecked():
+            method = 'lttb'
         
         return ds, auto, method
         
@@ -40,7 +40,7 @@ class Ui_Form(object):
         self.avgParamList.setObjectName(_fromUtf8("avgParamList"))
         self.gridLayout_5.addWidget(self.avgParamList, 0, 0, 1, 1)
         self.decimateGroup = QtGui.QFrame(Form)
-        self.decimateGroup.setGeometry(QtCore.QRect(10, 140, 191, 171))
+        self.decimateGroup.setGeometry(QtCore.QRect(10, 140, 191, 221))
         self.decimateGroup.setObjectName(_fromUtf8("decimateGroup"))
         self.gridLayout_4 = QtGui.QGridLayout(self.decimateGroup)
         self.gridLayout_4.setMargin(0)
@@ -71,6 +71,12 @@ class Ui_Form(object):
         self.subsampleRadio = QtGui.QRadioButton(self.decimateGroup)
         self.subsampleRadio.setObjectName(_fromUtf8("subsampleRadio"))
         self.gridLayout_4.addWidget(self.subsampleRadio, 2, 1, 1, 2)
+        self.m4Radio = QtGui.QRadioButton(self.decimateGroup)
+        self.m4Radio.setObjectName(_fromUtf8("m4Radio"))
+        self.gridLayout_4.addWidget(self.m4Radio, 4, 1, 1, 2)
+        self.lttbRadio = QtGui.QRadioButton(self.decimateGroup)
+        self.lttbRadio.setObjectName(_fromUtf8("lttbRadio"))
+        self.gridLayout_4.addWidget(self.lttbRadio, 5, 1, 1, 2)
         self.autoDownsampleCheck = QtGui.QCheckBox(self.decimateGroup)
         self.autoDownsampleCheck.setChecked(True)
         self.autoDownsampleCheck.setObjectName(_fromUtf8("autoDownsampleCheck"))
@@ -165,6 +171,10 @@ class Ui_Form(object):
         self.meanRadio.setText(_translate("Form", "Mean", None))
         self.subsampleRadio.setToolTip(_translate("Form", "Downsample by taking the first of N samples. This method is fastest and least accurate.", None))
         self.subsampleRadio.setText(_translate("Form", "Subsample", None))
+        self.m4Radio.setToolTip(_translate("Form", "Downsample by keeping the first, minimum, maximum and last of N samples. With Auto, this draws approximately the same line as the full data.", None))
+        self.m4Radio.setText(_translate("Form", "M4", None))
+        self.lttbRadio.setToolTip(_translate("Form", "Downsample using the Largest-Triangle-Three-Buckets method, which keeps one of N samples chosen to preserve the shape of the curve.", None))
+        self.lttbRadio.setText(_translate("Form", "LTTB", None))
         self.autoDownsampleCheck.setToolTip(_translate("Form", "Automatically downsample data based on the visible range. This assumes X values are uniformly spaced.", None))
         self.autoDownsampleCheck.setText(_translate("Form", "Auto", None))
         self.downsampleSpin.setToolTip(_translate("Form", "Downsample data before plotting. (plot every Nth sample)", None))
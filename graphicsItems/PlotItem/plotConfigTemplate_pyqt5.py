@@ -26,7 +26,7 @@ class Ui_Form(object):
         self.avgParamList.setObjectName("avgParamList")
         self.gridLayout_5.addWidget(self.avgParamList, 0, 0, 1, 1)
         self.decimateGroup = QtWidgets.QFrame(Form)
-        self.decimateGroup.setGeometry(QtCore.QRect(10, 140, 191, 171))
+        self.decimateGroup.setGeometry(QtCore.QRect(10, 140, 191, 221))
         self.decimateGroup.setObjectName("decimateGroup")
         self.gridLayout_4 = QtWidgets.QGridLayout(self.decimateGroup)
         self.gridLayout_4.setContentsMargins(0, 0, 0, 0)
@@ -57,6 +57,12 @@ class Ui_Form(object):
         self.subsampleRadio = QtWidgets.QRadioButton(self.decimateGroup)
         self.subsampleRadio.setObjectName("subsampleRadio")
         self.gridLayout_4.addWidget(self.subsampleRadio, 2, 1, 1, 2)
+        self.m4Radio = QtWidgets.QRadioButton(self.decimateGroup)
+        self.m4Radio.setObjectName("m4Radio")
+        self.gridLayout_4.addWidget(self.m4Radio, 4, 1, 1, 2)
+        self.lttbRadio = QtWidgets.QRadioButton(self.decimateGroup)
+        self.lttbRadio.setObjectName("lttbRadio")
+        self.gridLayout_4.addWidget(self.lttbRadio, 5, 1, 1, 2)
         self.autoDownsampleCheck = QtWidgets.QCheckBox(self.decimateGroup)
         self.autoDownsampleCheck.setChecked(True)
         self.autoDownsampleCheck.setObjectName("autoDownsampleCheck")
@@ -152,6 +158,10 @@ class Ui_Form(object):
         self.meanRadio.setText(_translate("Form", "Mean"))
         self.subsampleRadio.setToolTip(_translate("Form", "Downsample by taking the first of N samples. This method is fastest and least accurate."))
         self.subsampleRadio.setText(_translate("Form", "Subsample"))
+        self.m4Radio.setToolTip(_translate("Form", "Downsample by keeping the first, minimum, maximum and last of N samples. With Auto, this draws approximately the same line as the full data."))
+        self.m4Radio.setText(_translate("Form", "M4"))
+        self.lttbRadio.setToolTip(_translate("Form", "Downsample using the Largest-Triangle-Three-Buckets method, which keeps one of N samples chosen to preserve the shape of the curve."))
+        self.lttbRadio.setText(_translate("Form", "LTTB"))
         self.autoDownsampleCheck.setToolTip(_translate("Form", "Automatically downsample data based on the visible range. This assumes X values are uniformly spaced."))
         self.autoDownsampleCheck.setText(_translate("Form", "Auto"))
         self.downsampleSpin.setToolTip(_translate("Form", "Downsample data before plotting. (plot every Nth sample)"))
@@ -26,7 +26,7 @@ class Ui_Form(object):
         self.avgParamList.setObjectName("avgParamList")
         self.gridLayout_5.addWidget(self.avgParamList, 0, 0, 1, 1)
         self.decimateGroup = QtGui.QFrame(Form)
-        self.decimateGroup.setGeometry(QtCore.QRect(10, 140, 191, 171))
+        self.decimateGroup.setGeometry(QtCore.QRect(10, 140, 191, 221))
         self.decimateGroup.setObjectName("decimateGroup")
         self.gridLayout_4 = QtGui.QGridLayout(self.decimateGroup)
         self.gridLayout_4.setContentsMargins(0, 0, 0, 0)
@@ -57,6 +57,12 @@ class Ui_Form(object):
         self.subsampleRadio = QtGui.QRadioButton(self.decimateGroup)
         self.subsampleRadio.setObjectName("subsampleRadio")
         self.gridLayout_4.addWidget(self.subsampleRadio, 2, 1, 1, 2)
+        self.m4Radio = QtGui.QRadioButton(self.decimateGroup)
+        self.m4Radio.setObjectName("m4Radio")
+        self.gridLayout_4.addWidget(self.m4Radio, 4, 1, 1, 2)
+        self.lttbRadio = QtGui.QRadioButton(self.decimateGroup)
+        self.lttbRadio.setObjectName("lttbRadio")
+        self.gridLayout_4.addWidget(self.lttbRadio, 5, 1, 1, 2)
         self.autoDownsampleCheck = QtGui.QCheckBox(self.decimateGroup)
         self.autoDownsampleCheck.setChecked(True)
         self.autoDownsampleCheck.setObjectName("autoDownsampleCheck")
@@ -151,6 +157,10 @@ class Ui_Form(object):
         self.meanRadio.setText(QtGui.QApplication.translate("Form", "Mean", None, QtGui.QApplication.UnicodeUTF8))
         self.subsampleRadio.setToolTip(QtGui.QApplication.translate("Form", "Downsample by taking the first of N samples. This method is fastest and least accurate.", None, QtGui.QApplication.UnicodeUTF8))
         self.subsampleRadio.setText(QtGui.QApplication.translate("Form", "Subsample", None, QtGui.QApplication.UnicodeUTF8))
+        self.m4Radio.setToolTip(QtGui.QApplication.translate("Form", "Downsample by keeping the first, minimum, maximum and last of N samples. With Auto, this draws approximately the same line as the full data.", None, QtGui.QApplication.UnicodeUTF8))
+        self.m4Radio.setText(QtGui.QApplication.translate("Form", "M4", None, QtGui.QApplication.UnicodeUTF8))
+        self.lttbRadio.setToolTip(QtGui.QApplication.translate("Form", "Downsample using the Largest-Triangle-Three-Buckets method, which keeps one of N samples chosen to preserve the shape of the curve.", None, QtGui.QApplication.UnicodeUTF8))
+        self.lttbRadio.setText(QtGui.QApplication.translate("Form", "LTTB", None, QtGui.QApplication.UnicodeUTF8))
         self.autoDownsampleCheck.setToolTip(QtGui.QApplication.translate("Form", "Automatically downsample data based on the visible range. This assumes X values are uniformly spaced.", None, QtGui.QApplication.UnicodeUTF8))
         self.autoDownsampleCheck.setText(QtGui.QApplication.translate("Form", "Auto", None, QtGui.QApplication.UnicodeUTF8))
         self.downsampleSpin.setToolTip(QtGui.QApplication.translate("Form", "Downsample data before plotting. (plot every Nth sample)", None, QtGui.QApplication.UnicodeUTF8))
@@ -3,7 +3,7 @@ from ..Point import Point
 from .. import functions as fn
 from .GraphicsItem import GraphicsItem
 from .GraphicsObject import GraphicsObject
-from itertools import starmap, repeat
+from itertools import starmap, repeat, count
 try:
     from itertools import imap
 except ImportError:
@@ -14,6 +14,8 @@ from .. import getConfigOption
 from .. import debug as debug
 from ..pgcollections import OrderedDict
 from .. import debug
+from ..util.grid_index import GridIndex
+from ..colormap import ColorMap
 
 __all__ = ['ScatterPlotItem', 'SpotItem']
 
@@ -47,11 +49,7 @@ def drawSymbol(painter, symbol, size, pen, brush):
     painter.scale(size, size)
     painter.setPen(pen)
     painter.setBrush(brush)
-    if isinstance(symbol, basestring):
-        symbol = Symbols[symbol]
-    if np.isscalar(symbol):
-        symbol = list(Symbols.values())[symbol % len(Symbols)]
-    painter.drawPath(symbol)
+    painter.drawPath(_symbolPath(symbol))
 
     
 def renderSymbol(symbol, size, pen, brush, device=None):
@@ -81,121 +79,371 @@ def makeSymbolPixmap(size, pen, brush, symbol):
     img = renderSymbol(symbol, size, pen, brush)
     return QtGui.QPixmap(img)
     
+def _penKey(pen):
+    ## hashable value describing a pen, so that equal pens share one table entry
+    if pen.brush().style() not in (QtCore.Qt.SolidPattern, QtCore.Qt.NoBrush):
+        return ('id', id(pen))
+    style = pen.style()
+    dash = tuple(pen.dashPattern()) if style == QtCore.Qt.CustomDashLine else ()
+    return (pen.color().rgba(), pen.widthF(), int(style), pen.isCosmetic(), 
+            int(pen.capStyle()), int(pen.joinStyle()), dash)
+
+def _brushKey(brush):
+    if brush.style() not in (QtCore.Qt.SolidPattern, QtCore.Qt.NoBrush):
+        return ('id', id(brush))
+    return (brush.color().rgba(), int(brush.style()))
+
+def _symbolKey(symbol):
+    if np.isscalar(symbol):
+        return symbol
+    if isinstance(symbol, QtGui.QPainterPath):
+        ## custom symbols are compared by their elements
+        types, x, y = _pathElements(symbol)
+        return ('path', int(symbol.fillRule()), types.tobytes(), x.tobytes(), y.tobytes())
+    return ('id', id(symbol))
+
+def _isIdKey(key):
+    return isinstance(key, tuple) and len(key) > 0 and key[0] == 'id'
+
+_idKeySerial = count()  ## makes the keys of id-keyed style table entries unique
+
+def _uniqueRows(*columns):
+    """
+    Given equal-length 1D arrays, return (first, inverse) where *first* holds
+    the index of one row with each distinct combination of values and
+    *inverse* maps each row to its position in *first*.
+    """
+    ## Every column is replaced by its rank among the column's distinct values,
+    ## and the ranks are combined into a single integer code per row.
+    code = np.zeros(len(columns[0]), dtype=np.int64)
+    nCodes = 1
+    for col in columns:
+        nValues, inv = _ranks(col)
+        if nCodes * nValues > 2**62:
+            ## renumber existing codes to avoid overflow
+            nCodes, code = _ranks(code)
+        code = code * nValues + inv
+        nCodes *= nValues
+    nCodes, inv = _ranks(code)
+    first = np.empty(nCodes, dtype=int)
+    first[inv] = np.arange(len(inv))
+    return first, inv
+
+def _ranks(values):
+    ## return the number of distinct values and the rank of each value among them
+    if len(values) == 0:
+        return 1, np.zeros(0, dtype=np.int64)
+    lo, hi = values.min(), values.max()
+    if lo == hi:
+        return 1, np.zeros(len(values), dtype=np.int64)
+    if values.dtype.kind in 'iu' and hi - lo <= max(1024, len(values)):
+        ## small integer range (such as style table indices); avoid sorting
+        offset = values - lo
+        present = np.zeros(hi - lo + 1, dtype=bool)
+        present[offset] = True
+        rank = np.cumsum(present) - 1
+        return rank[-1] + 1, rank[offset]
+    unique, inv = np.unique(values, return_inverse=True)
+    return len(unique), inv.reshape(values.shape).astype(np.int64)
+
+def _symbolPath(symbol):
+    if isinstance(symbol, basestring):
+        return Symbols[symbol]
+    if np.isscalar(symbol):
+        return list(Symbols.values())[symbol % len(Symbols)]
+    return symbol
+
+def _pathElements(path):
+    """Return the element types and x, y coordinates of a QPainterPath as arrays."""
+    elements = [path.elementAt(i) for i in range(path.elementCount())]
+    types = np.array([int(e.type) for e in elements], dtype=np.int32)
+    x = np.array([e.x for e in elements], dtype=float)
+    y = np.array([e.y for e in elements], dtype=float)
+    return types, x, y
+
+
+class StyleTable(object):
+    """
+    Table of distinct style values (pens, brushes or symbols) used by a 
+    ScatterPlotItem. Each point stores only an integer index into the table,
+    so that per-point styles can be stored and processed as plain numpy arrays.
+    Values that compare equal share a single entry; index -1 stands for the 
+    item's default style.
+    
+    Values that cannot be compared by value (such as gradient brushes) are
+    keyed by their id(). The table keeps such objects alive so that their id
+    cannot be reused, and their entries in *keys* carry a serial number so 
+    that they never match an entry created for a different object later, 
+    for example in a SymbolAtlas that outlives the table's contents.
+    """
+    def __init__(self, keyFunc, mkFunc=None, valueType=None):
+        self.keyFunc = keyFunc
+        self.mkFunc = mkFunc          # converts other arguments to a style value, returning a copy
+        self.valueType = valueType    # values of this type are used as keys without conversion
+        self.clear()
+        
+    def clear(self):
+        self.values = []
+        self.keys = []
+        self.indexMap = {}
+        self.refs = []  ## objects whose id() is used as a key
+        
+    def __len__(self):
+        return len(self.values)
+    
+    def __getitem__(self, i):
+        return self.values[i]
+        
+    def index(self, value):
+        """Return the table index for *value*, adding it if necessary. 
+        None maps to -1 (use the default style)."""
+        if value is None:
+            return -1
+        if self.mkFunc is not None and not isinstance(value, self.valueType):
+            value = self.mkFunc(value)
+        key = self.keyFunc(value)
+        try:
+            return self.indexMap[key]
+        except KeyError:
+            i = len(self.values)
+            self.indexMap[key] = i
+            if _isIdKey(key):
+                self.refs.append(value)
+                key = key + (next(_idKeySerial),)
+            if self.mkFunc is not None:
+                value = self.mkFunc(value)  ## store a private copy
+            self.values.append(value)
+            self.keys.append(key)
+            return i
+    
+    def indices(self, values):
+        """Return an integer array of table indices for a sequence of values."""
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iufUS':
+            ## only look up each distinct value once
+            uniq, inv = np.unique(values, return_inverse=True)
+            ind = np.array([self.index(v) for v in uniq], dtype=int)
+            return ind[inv.reshape(values.shape)]
+        ind = np.empty(len(values), dtype=int)
+        seen = {}  ## id: (value, index); holding the value keeps its id unique
+        for i, v in enumerate(values):
+            s = seen.get(id(v))
+            if s is None:
+                s = seen[id(v)] = (v, self.index(v))
+            ind[i] = s[1]
+        return ind
+
+    
 class SymbolAtlas(object):
     """
     Used to efficiently construct a single QPixmap containing all rendered symbols
     for a ScatterPlotItem. This is required for fragment rendering.
     
+    Symbols are keyed by value (symbol, size, pen color/width/style and brush 
+    color), so that equal styles share one entry even if their QPen and QBrush 
+    objects were created separately. Each symbol is referred to by an integer 
+    index whose pixmap coordinates can be read from the *coords* array.
+    
+    Symbols are packed into horizontal shelves. A new symbol is rendered into 
+    free space without moving the existing ones; when there is no room left, the 
+    atlas doubles in size. Only the modified region of the atlas is copied to the 
+    QPixmap. Symbols that are no longer used can be evicted with collect(), after 
+    which their indices and atlas space are reused.
+    
     Use example:
         atlas = SymbolAtlas()
-        sc1 = atlas.getSymbolCoords('o', 5, QPen(..), QBrush(..))
-        sc2 = atlas.getSymbolCoords('t', 10, QPen(..), QBrush(..))
+        ind = atlas.getSymbolCoords(opts, symbols, pens, brushes)
         pm = atlas.getAtlas()
+        x, y, w, h = atlas.coords[ind[0]]
         
     """
     def __init__(self):
-        # symbol key : QRect(...) coordinates where symbol can be found in atlas.
-        # note that the coordinate list will always be the same list object as 
-        # long as the symbol is in the atlas, but the coordinates may
-        # change if the atlas is rebuilt.
-        # weak value; if all external refs to this list disappear, 
-        # the symbol will be forgotten.
-        self.symbolMap = weakref.WeakValueDictionary()
-        
-        self.atlasData = None # numpy array of atlas image
-        self.atlas = None     # atlas as QPixmap
+        # symbol key : index of symbol in self.symbolArgs and self.coords.
+        # note that the index and coordinates of a symbol never change until 
+        # it is evicted.
+        self.symbolMap = {}
+        self.symbolArgs = []     # (symbol, size, pen, brush) for each symbol; None for evicted symbols
+        self.coords = np.zeros((0, 4))  # (x, y, w, h) of each symbol; w == 0 means not yet rendered
+        self.freeIndices = []    # indices of evicted symbols
+        
+        self.atlasData = np.zeros((0, 0, 4), dtype=np.ubyte) # numpy array of atlas image
+        self.shelves = []        # [y, height, used width] of each shelf, from top to bottom
+        self.freeRects = []      # (x, y, w, h) of space released by evicted symbols
+        self.dirty = None        # (x0, y0, x1, y1) region of atlasData not yet copied to self.atlas
+        self.atlas = None        # atlas as QPixmap
         self.atlasValid = False
-        self.max_width=0
+        self.max_width = 0
+        self.collectSize = 256   # number of symbols at which the owner should call collect()
         
-    def getSymbolCoords(self, opts):
+    def __len__(self):
+        return len(self.symbolMap)
+        
+    def getSymbolCoords(self, opts, symbols, pens, brushes):
         """
-        Given a list of spot records, return an object representing the coordinates of that symbol within the atlas
+        Given an array of spot records with default styles already resolved 
+        (see ScatterPlotItem.getSpotOpts), where the symbol, pen and brush 
+        fields are indices into the *symbols*, *pens* and *brushes* style tables,
+        return an integer array giving the index of each spot's symbol in the atlas.
         """
-        sourceRect = np.empty(len(opts), dtype=object)
-        keyi = None
-        sourceRecti = None
-        for i, rec in enumerate(opts):
-            key = (rec[3], rec[2], id(rec[4]), id(rec[5]))   # TODO: use string indexes?
-            if key == keyi:
-                sourceRect[i] = sourceRecti
-            else:
-                try:
-                    sourceRect[i] = self.symbolMap[key]
-                except KeyError:
-                    newRectSrc = QtCore.QRectF()
-                    newRectSrc.pen = rec['pen']
-                    newRectSrc.brush = rec['brush']
-                    self.symbolMap[key] = newRectSrc
-                    self.atlasValid = False
-                    sourceRect[i] = newRectSrc
-                    keyi = key
-                    sourceRecti = newRectSrc
-        return sourceRect
+        if len(opts) == 0:
+            return np.empty(0, dtype=int)
+        
+        ## Find the distinct styles, then look up each of them only once.
+        first, inv = _uniqueRows(opts['symbol'], opts['size'], opts['pen'], opts['brush'])
+        
+        index = np.empty(len(first), dtype=int)
+        for i, rec in enumerate(opts[first]):
+            s, size, pen, brush = rec['symbol'], rec['size'], rec['pen'], rec['brush']
+            ## index -1 remains only when the default symbol is None
+            symKey, symbol = (symbols.keys[s], symbols[s]) if s >= 0 else (None, None)
+            key = (symKey, size, pens.keys[pen], brushes.keys[brush])
+            try:
+                index[i] = self.symbolMap[key]
+            except KeyError:
+                index[i] = self.addSymbol(key, (symbol, size, pens[pen], brushes[brush]))
+        return index[inv]
+        
+    def addSymbol(self, key, args):
+        ## register a new symbol; it will be rendered the next time the atlas is built
+        if len(self.freeIndices) > 0:
+            i = self.freeIndices.pop()
+            self.symbolArgs[i] = args
+        else:
+            i = len(self.symbolArgs)
+            self.symbolArgs.append(args)
+        self.symbolMap[key] = i
+        if i >= len(self.coords):
+            coords = np.zeros((max(16, 2*len(self.coords)), 4))
+            coords[:i] = self.coords[:i]
+            self.coords = coords
+        self.atlasValid = False
+        return i
+        
+    def needsCollect(self):
+        """Return True if enough symbols have been added since the last call to 
+        collect() that unused symbols should be evicted."""
+        return len(self.symbolMap) >= self.collectSize
+        
+    def collect(self, inUse):
+        """
+        Evict all symbols whose index does not appear in the array *inUse* 
+        (negative values are ignored). Their indices and atlas space will be 
+        reused by symbols added later.
+        """
+        inUse = np.asarray(inUse)
+        used = np.zeros(len(self.symbolArgs), dtype=bool)
+        used[inUse[inUse >= 0]] = True
+        for key, i in list(self.symbolMap.items()):
+            if used[i]:
+                continue
+            del self.symbolMap[key]
+            self.symbolArgs[i] = None
+            if self.coords[i, 2] > 0:
+                self.freeRects.append(tuple(self.coords[i].astype(int)))
+            self.coords[i] = 0
+            self.freeIndices.append(i)
+        
+        ## shelves with no remaining symbols can be filled again from the left
+        live = self.coords[:len(self.symbolArgs)]
+        live = live[live[:,2] > 0]
+        for shelf in self.shelves:
+            if not np.any(live[:,1] == shelf[0]):
+                shelf[2] = 0
+                self.freeRects = [r for r in self.freeRects if r[1] != shelf[0]]
+        while len(self.shelves) > 0 and self.shelves[-1][2] == 0:
+            self.shelves.pop()
+        self.max_width = live[:,2].max() if len(live) > 0 else 0
+        self.collectSize = max(256, 2 * len(self.symbolMap))
         
     def buildAtlas(self):
-        # get rendered array for all symbols, keep track of avg/max width
-        rendered = {}
-        avgWidth = 0.0
-        maxWidth = 0
-        images = []
-        for key, sourceRect in self.symbolMap.items():
-            if sourceRect.width() == 0:
-                img = renderSymbol(key[0], key[1], sourceRect.pen, sourceRect.brush)
-                images.append(img)  ## we only need this to prevent the images being garbage collected immediately
-                arr = fn.imageToArray(img, copy=False, transpose=False)
+        ## render and pack all symbols that have been added since the last build
+        new = [i for i, args in enumerate(self.symbolArgs) if args is not None and self.coords[i, 2] == 0]
+        rendered = []
+        for i in new:
+            symbol, size, pen, brush = self.symbolArgs[i]
+            img = renderSymbol(symbol, size, pen, brush)
+            ## keep img alive as long as the array that shares its memory
+            rendered.append((i, img, fn.imageToArray(img, copy=False, transpose=False)))
+        
+        ## pack the tallest symbols first
+        rendered.sort(key=lambda r: r[2].shape[0], reverse=True)
+        for i, img, arr in rendered:
+            h, w = arr.shape[:2]
+            x, y = self.allocate(w, h)
+            self.atlasData[y:y+h, x:x+w] = arr
+            self.coords[i] = (x, y, w, h)
+            self.max_width = max(self.max_width, w)
+            if self.dirty is None:
+                self.dirty = (x, y, x+w, y+h)
             else:
-                (y,x,h,w) = sourceRect.getRect()
-                arr = self.atlasData[x:x+w, y:y+w]
-            rendered[key] = arr
-            w = arr.shape[0]
-            avgWidth += w
-            maxWidth = max(maxWidth, w)
+                x0, y0, x1, y1 = self.dirty
+                self.dirty = (min(x0, x), min(y0, y), max(x1, x+w), max(y1, y+h))
+        self.atlasValid = True
+        
+    def allocate(self, w, h):
+        """Return the (x, y) position of a free w by h region of the atlas, 
+        enlarging the atlas if necessary."""
+        ## reuse the best fitting space left by an evicted symbol
+        best = None
+        for j, (fx, fy, fw, fh) in enumerate(self.freeRects):
+            if fw >= w and fh >= h and (best is None or fw*fh < self.freeRects[best][2] * self.freeRects[best][3]):
+                best = j
+        if best is not None:
+            fx, fy, fw, fh = self.freeRects.pop(best)
+            return fx, fy
+        
+        height, width = self.atlasData.shape[:2]
+        while True:
+            ## append to the lowest shelf that is tall enough without wasting too much space
+            best = None
+            for shelf in self.shelves:
+                sy, sh, sw = shelf
+                if h <= sh <= h * 1.5 + 2 and sw + w <= width and (best is None or sh < best[1]):
+                    best = shelf
+            if best is not None:
+                x = best[2]
+                best[2] += w
+                return x, best[0]
             
-        nSymbols = len(rendered)
-        if nSymbols > 0:
-            avgWidth /= nSymbols
-            width = max(maxWidth, avgWidth * (nSymbols**0.5))
-        else:
-            avgWidth = 0
-            width = 0
-        
-        # sort symbols by height
-        symbols = sorted(rendered.keys(), key=lambda x: rendered[x].shape[1], reverse=True)
-        
-        self.atlasRows = []
-
-        x = width
-        y = 0
-        rowheight = 0
-        for key in symbols:
-            arr = rendered[key]
-            w,h = arr.shape[:2]
-            if x+w > width:
-                y += rowheight
-                x = 0
-                rowheight = h
-                self.atlasRows.append([y, rowheight, 0])
-            self.symbolMap[key].setRect(y, x, h, w)
-            x += w
-            self.atlasRows[-1][2] = x
-        height = y + rowheight
-
-        self.atlasData = np.zeros((width, height, 4), dtype=np.ubyte)
-        for key in symbols:
-            y, x, h, w = self.symbolMap[key].getRect()
-            self.atlasData[x:x+w, y:y+h] = rendered[key]
+            ## open a new shelf below the last one
+            y = self.shelves[-1][0] + self.shelves[-1][1] if len(self.shelves) > 0 else 0
+            if y + h <= height and w <= width:
+                self.shelves.append([y, h, w])
+                return 0, y
+            
+            ## no room left; double the atlas width or height, keeping it roughly square
+            if w > width:
+                width = max(64, width * 2, w)
+            elif height <= width:
+                height = max(64, height * 2, y + h)
+            else:
+                width *= 2
+            self.resize(width, height)
+            
+    def resize(self, width, height):
+        data = np.zeros((height, width, 4), dtype=np.ubyte)
+        h, w = self.atlasData.shape[:2]
+        data[:h, :w] = self.atlasData
+        self.atlasData = data
         self.atlas = None
-        self.atlasValid = True
-        self.max_width = maxWidth
     
     def getAtlas(self):
         if not self.atlasValid:
             self.buildAtlas()
+        if self.atlasData.size == 0:
+            return QtGui.QPixmap(0,0)
         if self.atlas is None:
-            if len(self.atlasData) == 0:
-                return QtGui.QPixmap(0,0)
             img = fn.makeQImage(self.atlasData, copy=False, transpose=False)
             self.atlas = QtGui.QPixmap(img)
+        elif self.dirty is not None:
+            ## copy only the modified region into the existing pixmap
+            x0, y0, x1, y1 = self.dirty
+            img = fn.makeQImage(self.atlasData, copy=False, transpose=False)
+            p = QtGui.QPainter(self.atlas)
+            p.setCompositionMode(p.CompositionMode_Source)
+            rect = QtCore.QRectF(x0, y0, x1-x0, y1-y0)
+            p.drawImage(rect, img, rect)
+            p.end()
+        self.dirty = None
         return self.atlas
         
     
@@ -210,17 +458,34 @@ class ScatterPlotItem(GraphicsObject):
     The size, shape, pen, and fill brush may be set for each point individually 
     or for all points. 
     
+    Points are stored in numpy arrays and can be addressed by their index 
+    (their position in the order they were added): see pointIndicesAt(), 
+    pointIndicesInRect(), setPointStyle() and the *pointData* array, which 
+    holds the user data of each point. SpotItem objects, which give access to 
+    a single point, are only created when requested through points(), 
+    pointsAt() or pointsInRect().
+    
+    Positions, sizes and styles are held in the numeric record array 
+    *spotData*, where symbol, pen and brush are indices into tables of distinct
+    values (-1 for the default style). The *data* attribute, which used to hold
+    QPen, QBrush, user data and SpotItem objects directly, is still available 
+    in that layout but is now a read-only copy built on demand; code that 
+    modified points by writing to *data* must use the setter methods instead.
     
-    ========================  ===============================================
+    ================================  ===============================================
     **Signals:**
-    sigPlotChanged(self)      Emitted when the data being plotted has changed
-    sigClicked(self, points)  Emitted when the curve is clicked. Sends a list
-                              of all the points under the mouse pointer.
-    ========================  ===============================================
+    sigPlotChanged(self)              Emitted when the data being plotted has changed
+    sigClicked(self, points)          Emitted when the curve is clicked. Sends a list
+                                      of all the points under the mouse pointer.
+    sigIndicesClicked(self, indices)  Emitted when the curve is clicked, before 
+                                      sigClicked. Sends an array of the indices of
+                                      all the points under the mouse pointer.
+    ================================  ===============================================
     
     """
     #sigPointClicked = QtCore.Signal(object, object)
     sigClicked = QtCore.Signal(object, object)  ## self, points
+    sigIndicesClicked = QtCore.Signal(object, object)  ## self, indices
     sigPlotChanged = QtCore.Signal(object)
     def __init__(self, *args, **kargs):
         """
@@ -231,9 +496,23 @@ class ScatterPlotItem(GraphicsObject):
         
         self.picture = None   # QPicture used for rendering when pxmode==False
         self.fragmentAtlas = SymbolAtlas()
+        self._fragments = fn.PixmapFragmentBuffer()  ## reused across paints
         
-        self.data = np.empty(0, dtype=[('x', float), ('y', float), ('size', float), ('symbol', object), ('pen', object), ('brush', object), ('data', object), ('item', object), ('sourceRect', object), ('targetRect', object), ('width', float)])
+        ## Per-point styles are stored as indices into these tables (-1 means use the default style)
+        self._symbols = StyleTable(_symbolKey)
+        self._symbolPaths = {}  ## symbol table index: element arrays, see _symbolElements
+        self._pens = StyleTable(_penKey, fn.mkPen, QtGui.QPen)
+        self._brushes = StyleTable(_brushKey, fn.mkBrush, QtGui.QBrush)
+        
+        ## 'atlasIndex' is the index of each point's rendered symbol in self.fragmentAtlas (-1 if not yet known)
+        self.spotData = np.empty(0, dtype=[('x', float), ('y', float), ('size', float), ('symbol', int), ('pen', int), ('brush', int), ('atlasIndex', int), ('width', float)])
+        self.pointData = np.empty(0, dtype=object)  ## user data for each point
+        self._items = np.empty(0, dtype=object)     ## SpotItem for each point, created on demand
+        self._legacyData = None     ## cached result of the data property
         self.bounds = [None, None]  ## caches data bounds
+        self._spatialIndex = None   ## GridIndex of point positions, built on demand for hit testing
+        self._deviceCache = None    ## (linear transform, translation, device coordinates) from the last paint
+        self._maxHitSize = None     ## largest spot size, cached for hit testing
         self._maxSpotWidth = 0      ## maximum size of the scale-variant portion of all spots
         self._maxSpotPxWidth = 0    ## maximum size of the scale-invariant portion of all spots
         self.opts = {
@@ -241,6 +520,12 @@ class ScatterPlotItem(GraphicsObject):
             'useCache': True,  ## If useCache is False, symbols are re-drawn on every paint. 
             'antialias': getConfigOption('antialias'),
             'name': None,
+            'aggregateThreshold': None,  ## number of visible points above which points are aggregated (see setAggregation)
+            'aggregateMode': 'density',
+            'aggregateCellSize': 1,
+            'densityColorMap': None,
+            'colorMap': None,    ## used by setBrushValues
+            'colorLevels': 64,
         }
 
         self.setPen(fn.mkPen(getConfigOption('foreground')), update=False)
@@ -253,6 +538,45 @@ class ScatterPlotItem(GraphicsObject):
 
         #self.setCacheMode(self.DeviceCoordinateCache)
         
+    @property
+    def data(self):
+        """
+        Record array of all points in the layout used by earlier versions of
+        ScatterPlotItem, with the fields x, y, size, symbol, pen, brush, data, 
+        item, sourceRect, targetRect and width. Points without an explicit 
+        symbol, pen or brush hold None; items that have not been created yet 
+        and targetRect are None as well.
+        
+        Points are now stored in the numeric *spotData* and *pointData* arrays,
+        so this array is built from them when it is first accessed after a 
+        change. It is a read-only copy: writing to it does not modify the plot. 
+        Use the setter methods, setPointStyle() or SpotItem instead.
+        """
+        if self._legacyData is None:
+            self._legacyData = self._buildLegacyData()
+        return self._legacyData
+        
+    def _buildLegacyData(self):
+        spots = self.spotData
+        data = np.empty(len(spots), dtype=[('x', float), ('y', float), ('size', float), ('symbol', object), ('pen', object), ('brush', object), ('data', object), ('item', object), ('sourceRect', object), ('targetRect', object), ('width', float)])
+        for field in ('x', 'y', 'size', 'width'):
+            data[field] = spots[field]
+        for field, table in (('symbol', self._symbols), ('pen', self._pens), ('brush', self._brushes)):
+            ## the extra last entry is selected by index -1 (default style)
+            values = np.empty(len(table)+1, dtype=object)
+            for i, value in enumerate(table.values):
+                values[i] = value
+            data[field] = values[spots[field]]
+        data['data'] = self.pointData
+        data['item'] = self._items
+        if self.opts['pxMode']:
+            coords = self.fragmentAtlas.coords
+            rects = np.empty(len(coords)+1, dtype=object)
+            for i, (x, y, w, h) in enumerate(coords):
+                rects[i] = QtCore.QRectF(x, y, w, h)
+            data['sourceRect'] = rects[spots['atlasIndex']]
+        return data
+        
     def setData(self, *args, **kargs):
         """
         **Ordered Arguments:**
@@ -281,6 +605,10 @@ class ScatterPlotItem(GraphicsObject):
                                possible to 'install' custom shapes by setting ScatterPlotItem.Symbols[key] = shape.
         *pen*                  The pen (or list of pens) to use for drawing spot outlines.
         *brush*                The brush (or list of brushes) to use for filling spots.
+        *brushValues*          Array of scalar values used to select the brush for each spot from
+                               *colorMap* (see setBrushValues). Overrides *brush* for these spots.
+        *colorMap*             :class:`ColorMap <pyqtgraph.ColorMap>` used to color *brushValues*.
+        *colorLevels*          Number of distinct brush colors used for *brushValues* (default 64).
         *size*                 The size (or list of sizes) of spots. If *pxMode* is True, this value is in pixels. Otherwise,
                                it is in the item's local coordinate system.
         *data*                 a list of python objects used to uniquely identify each spot.
@@ -292,7 +620,7 @@ class ScatterPlotItem(GraphicsObject):
                                generating LegendItem entries and by some exporters.
         ====================== ===============================================================================================
         """
-        oldData = self.data  ## this causes cached pixmaps to be preserved while new data is registered.
+        oldData = self.spotData  ## this causes cached pixmaps to be preserved while new data is registered.
         self.clear()  ## clear out all old data
         self.addPoints(*args, **kargs)
 
@@ -341,16 +669,20 @@ class ScatterPlotItem(GraphicsObject):
             numPts = 0
         
         ## Extend record array
-        oldData = self.data
-        self.data = np.empty(len(oldData)+numPts, dtype=self.data.dtype)
-        ## note that np.empty initializes object fields to None and string fields to ''
-        
-        self.data[:len(oldData)] = oldData
-        #for i in range(len(oldData)):
-            #oldData[i]['item']._data = self.data[i]  ## Make sure items have proper reference to new array
+        oldData = self.spotData
+        self.spotData = np.empty(len(oldData)+numPts, dtype=self.spotData.dtype)
+        self.spotData[:len(oldData)] = oldData
+        ## note that np.empty initializes object arrays to None
+        self.pointData = np.concatenate([self.pointData, np.empty(numPts, dtype=object)])
+        self._items = np.concatenate([self._items, np.empty(numPts, dtype=object)])
             
-        newData = self.data[len(oldData):]
+        newData = self.spotData[len(oldData):]
+        newPointData = self.pointData[len(oldData):]
         newData['size'] = -1  ## indicates to use default size
+        newData['symbol'] = -1  ## -1 indicates to use the default style
+        newData['pen'] = -1
+        newData['brush'] = -1
+        newData['atlasIndex'] = -1
 
         if 'spots' in kargs:
             spots = kargs['spots']
@@ -366,10 +698,14 @@ class ScatterPlotItem(GraphicsObject):
                         newData[i]['x'] = x
                         newData[i]['y'] = y
                     elif k == 'pen':
-                        newData[i][k] = fn.mkPen(spot[k])
+                        newData[i][k] = self._pens.index(fn.mkPen(spot[k]))
                     elif k == 'brush':
-                        newData[i][k] = fn.mkBrush(spot[k])
-                    elif k in ['x', 'y', 'size', 'symbol', 'brush', 'data']:
+                        newData[i][k] = self._brushes.index(fn.mkBrush(spot[k]))
+                    elif k == 'symbol':
+                        newData[i][k] = self._symbols.index(spot[k])
+                    elif k == 'data':
+                        newPointData[i] = spot[k]
+                    elif k in ['x', 'y', 'size']:
                         newData[i][k] = spot[k]
                     else:
                         raise Exception("Unknown spot parameter: %s" % k)
@@ -388,12 +724,19 @@ class ScatterPlotItem(GraphicsObject):
                 setMethod = getattr(self, 'set' + k[0].upper() + k[1:])
                 setMethod(kargs[k], update=False, dataSet=newData, mask=kargs.get('mask', None))
 
+        if 'brushValues' in kargs:
+            self.setBrushValues(kargs['brushValues'], colorMap=kargs.get('colorMap', None), 
+                                levels=kargs.get('colorLevels', None), update=False, 
+                                dataSet=newData, mask=kargs.get('mask', None))
+
         if 'data' in kargs:
-            self.setPointData(kargs['data'], dataSet=newData)
+            self.setPointData(kargs['data'], dataSet=newPointData)
 
         self.prepareGeometryChange()
         self.informViewBoundsChanged()
         self.bounds = [None, None]
+        self._spatialIndex = None
+        self._deviceCache = None
         self.invalidate()
         self.updateSpots(newData)
         self.sigPlotChanged.emit(self)
@@ -404,7 +747,7 @@ class ScatterPlotItem(GraphicsObject):
         self.update()
         
     def getData(self):
-        return self.data['x'], self.data['y']    
+        return self.spotData['x'], self.spotData['y']    
         
     def setPoints(self, *args, **kargs):
         ##Deprecated; use setData
@@ -425,7 +768,7 @@ class ScatterPlotItem(GraphicsObject):
         Otherwise, the arguments are passed to pg.mkPen and used as the default pen for 
         all spots which do not have a pen explicitly set."""
         update = kargs.pop('update', True)
-        dataSet = kargs.pop('dataSet', self.data)
+        dataSet = kargs.pop('dataSet', self.spotData)
 
         if len(args) == 1 and (isinstance(args[0], np.ndarray) or isinstance(args[0], list)):
             pens = args[0]
@@ -433,11 +776,12 @@ class ScatterPlotItem(GraphicsObject):
                 pens = pens[kargs['mask']]
             if len(pens) != len(dataSet):
                 raise Exception("Number of pens does not match number of points (%d != %d)" % (len(pens), len(dataSet)))
-            dataSet['pen'] = pens
+            dataSet['pen'] = self._pens.indices(pens)
         else:
             self.opts['pen'] = fn.mkPen(*args, **kargs)
         
-        dataSet['sourceRect'] = None
+        dataSet['atlasIndex'] = -1
+        self._legacyData = None
         if update:
             self.updateSpots(dataSet)
         
@@ -447,7 +791,7 @@ class ScatterPlotItem(GraphicsObject):
         Otherwise, the arguments are passed to pg.mkBrush and used as the default brush for 
         all spots which do not have a brush explicitly set."""
         update = kargs.pop('update', True)
-        dataSet = kargs.pop('dataSet', self.data)
+        dataSet = kargs.pop('dataSet', self.spotData)
             
         if len(args) == 1 and (isinstance(args[0], np.ndarray) or isinstance(args[0], list)):
             brushes = args[0]
@@ -456,23 +800,86 @@ class ScatterPlotItem(GraphicsObject):
             if len(brushes) != len(dataSet):
                 raise Exception("Number of brushes does not match number of points (%d != %d)" % (len(brushes), len(dataSet)))
             #for i in xrange(len(brushes)):
-                #self.data[i]['brush'] = fn.mkBrush(brushes[i], **kargs)
-            dataSet['brush'] = brushes
+                #self.spotData[i]['brush'] = fn.mkBrush(brushes[i], **kargs)
+            dataSet['brush'] = self._brushes.indices(brushes)
         else:
             self.opts['brush'] = fn.mkBrush(*args, **kargs)
             #self._spotPixmap = None
         
-        dataSet['sourceRect'] = None
+        dataSet['atlasIndex'] = -1
+        self._legacyData = None
         if update:
             self.updateSpots(dataSet)
 
+    def setBrushValues(self, values, colorMap=None, levels=None, valueRange=None, update=True, dataSet=None, mask=None):
+        """
+        Set the brush of each spot by mapping an array of scalar *values* 
+        through a color map. 
+        
+        Values are quantized to a fixed number of levels, so that at most 
+        *levels* distinct brushes (and rendered symbols) are created no matter 
+        how many spots there are; the color map is only evaluated once per level 
+        that is in use. Spots with non-finite values use the default brush.
+        
+        ============== ===========================================================
+        **Arguments:**
+        values         1D array of scalar values, one per spot.
+        colorMap       :class:`ColorMap <pyqtgraph.ColorMap>` to use. The lowest
+                       and highest values are mapped to the first and last 
+                       color stops. If None, the color map from the previous 
+                       call is used.
+        levels         (int) Number of distinct colors. If None, the number from
+                       the previous call is used (initially 64).
+        valueRange     (min, max) values mapped to the ends of the color map.
+                       Values outside this range are clipped. By default, the 
+                       range of the finite values is used.
+        ============== ===========================================================
+        """
+        if dataSet is None:
+            dataSet = self.spotData
+        if colorMap is not None:
+            self.opts['colorMap'] = colorMap
+        if levels is not None:
+            self.opts['colorLevels'] = max(1, int(levels))
+        colorMap = self.opts['colorMap']
+        levels = self.opts['colorLevels']
+        if colorMap is None:
+            raise Exception("A color map is required to set brush values.")
+        
+        values = np.asarray(values, dtype=float)
+        if mask is not None:
+            values = values[mask]
+        if len(values) != len(dataSet):
+            raise Exception("Number of values does not match number of points (%d != %d)" % (len(values), len(dataSet)))
+        
+        finite = np.isfinite(values)
+        if valueRange is None:
+            valueRange = (values[finite].min(), values[finite].max()) if finite.any() else (0, 1)
+        vmin, vmax = valueRange
+        scale = (levels - 1) / float(vmax - vmin) if vmax != vmin else 0
+        quantized = np.clip((np.where(finite, values, vmin) - vmin) * scale + 0.5, 0, levels - 1).astype(int)
+        
+        ## build the brush palette from the levels that are in use
+        pos = colorMap.pos
+        used = np.nonzero(np.bincount(quantized[finite], minlength=levels))[0]
+        colors = colorMap.map(pos.min() + (pos.max() - pos.min()) * used / float(max(1, levels - 1)), mode='byte')
+        palette = np.empty(levels, dtype=int)
+        for level, color in zip(used, colors.tolist()):
+            palette[level] = self._brushes.index(QtGui.QBrush(QtGui.QColor(*color)))
+        
+        dataSet['brush'] = np.where(finite, palette[quantized], -1)
+        dataSet['atlasIndex'] = -1
+        self._legacyData = None
+        if update:
+            self.updateSpots(dataSet)
+        
     def setSymbol(self, symbol, update=True, dataSet=None, mask=None):
         """Set the symbol(s) used to draw each spot. 
         If a list or array is provided, then the symbol for each spot will be set separately.
         Otherwise, the argument will be used as the default symbol for 
         all spots which do not have a symbol explicitly set."""
         if dataSet is None:
-            dataSet = self.data
+            dataSet = self.spotData
             
         if isinstance(symbol, np.ndarray) or isinstance(symbol, list):
             symbols = symbol
@@ -480,12 +887,13 @@ class ScatterPlotItem(GraphicsObject):
                 symbols = symbols[mask]
             if len(symbols) != len(dataSet):
                 raise Exception("Number of symbols does not match number of points (%d != %d)" % (len(symbols), len(dataSet)))
-            dataSet['symbol'] = symbols
+            dataSet['symbol'] = self._symbols.indices(symbols)
         else:
             self.opts['symbol'] = symbol
             self._spotPixmap = None
         
-        dataSet['sourceRect'] = None
+        dataSet['atlasIndex'] = -1
+        self._legacyData = None
         if update:
             self.updateSpots(dataSet)
     
@@ -495,7 +903,7 @@ class ScatterPlotItem(GraphicsObject):
         Otherwise, the argument will be used as the default size for 
         all spots which do not have a size explicitly set."""
         if dataSet is None:
-            dataSet = self.data
+            dataSet = self.spotData
             
         if isinstance(size, np.ndarray) or isinstance(size, list):
             sizes = size
@@ -508,13 +916,18 @@ class ScatterPlotItem(GraphicsObject):
             self.opts['size'] = size
             self._spotPixmap = None
             
-        dataSet['sourceRect'] = None
+        dataSet['atlasIndex'] = -1
+        self._legacyData = None
         if update:
             self.updateSpots(dataSet)
         
     def setPointData(self, data, dataSet=None, mask=None):
+        """Set the user data associated with each point. 
+        If a list or array is provided, then the data for each spot will be set separately.
+        Otherwise, the same object is associated with all points."""
         if dataSet is None:
-            dataSet = self.data
+            dataSet = self.pointData
+        self._legacyData = None
             
         if isinstance(data, np.ndarray) or isinstance(data, list):
             if mask is not None:
@@ -524,96 +937,175 @@ class ScatterPlotItem(GraphicsObject):
         
         ## Bug: If data is a numpy record array, then items from that array must be copied to dataSet one at a time.
         ## (otherwise they are converted to tuples and thus lose their field names.
-        if isinstance(data, np.ndarray) and (data.dtype.fields is not None)and len(data.dtype.fields) > 1:
+        ## Lists are copied one at a time as well, so that sequence items are not broadcast.
+        if isinstance(data, list) or (isinstance(data, np.ndarray) and (data.dtype.fields is not None) and len(data.dtype.fields) > 1):
             for i, rec in enumerate(data):
-                dataSet['data'][i] = rec
+                dataSet[i] = rec
         else:
-            dataSet['data'] = data
+            dataSet[:] = data
+        
+    def setPointStyle(self, indices, symbol=None, size=None, pen=None, brush=None):
+        """
+        Set the style of the points selected by *indices* (an array of point 
+        indices or a boolean mask). Each style argument may be either a single 
+        value that is applied to all selected points, or a list or array with 
+        one value per selected point. Arguments that are None are left unchanged.
+        
+        This is equivalent to, but much faster than, calling the setter methods 
+        of each point's SpotItem.
+        """
+        inds = np.asarray(indices)
+        if inds.dtype == bool:
+            inds = np.argwhere(inds)[:,0]
+        for field, value, table in [('symbol', symbol, self._symbols), ('pen', pen, self._pens), ('brush', brush, self._brushes)]:
+            if value is None:
+                continue
+            if isinstance(value, np.ndarray) or isinstance(value, list):
+                if len(value) != len(inds):
+                    raise Exception("Number of %s values does not match number of points (%d != %d)" % (field, len(value), len(inds)))
+                self.spotData[field][inds] = table.indices(value)
+            else:
+                self.spotData[field][inds] = table.index(value)
+        if size is not None:
+            self.spotData['size'][inds] = size
+        self.spotData['atlasIndex'][inds] = -1
+        self.updateSpots()
+        self.invalidate()
+        
+    def setAggregation(self, threshold, mode='density', cellSize=1, colorMap=None):
+        """
+        Configure screen-space aggregation of dense scatter plots. When more 
+        than *threshold* points are visible, the points are binned into a grid
+        of device pixels and, instead of drawing every symbol, either
+        
+        * a density image of the number of points per cell is drawn 
+          (*mode* = 'density'), or 
+        * only the last (topmost) symbol in each cell is drawn (*mode* = 'symbols').
+        
+        Aggregation is only used in pxMode and is never used when exporting.
+        
+        ============== ===========================================================
+        **Arguments:**
+        threshold      (int or None) Minimum number of visible points at which
+                       aggregation is used. None disables aggregation (default).
+        mode           'density' or 'symbols'
+        cellSize       (int) Width of the grid cells in device pixels.
+        colorMap       :class:`ColorMap <pyqtgraph.ColorMap>` used to color the 
+                       density image, mapping 0 to 1 from empty cells to the 
+                       most populated one (on a logarithmic scale). By default, 
+                       the item's default brush color is faded in.
+        ============== ===========================================================
+        """
+        if mode not in ('density', 'symbols'):
+            raise ValueError("Aggregation mode must be 'density' or 'symbols' (got %r)" % mode)
+        self.opts['aggregateThreshold'] = threshold
+        self.opts['aggregateMode'] = mode
+        self.opts['aggregateCellSize'] = max(1, int(cellSize))
+        self.opts['densityColorMap'] = colorMap
+        self.update()
         
     def setPxMode(self, mode):
         if self.opts['pxMode'] == mode:
             return
             
         self.opts['pxMode'] = mode
+        self._legacyData = None
         self.invalidate()
         
     def updateSpots(self, dataSet=None):
         if dataSet is None:
-            dataSet = self.data
+            dataSet = self.spotData
 
+        self._maxHitSize = None
+        self._deviceCache = None  ## symbol widths may change
+        self._legacyData = None
         invalidate = False
         if self.opts['pxMode']:
-            mask = np.equal(dataSet['sourceRect'], None)
+            mask = dataSet['atlasIndex'] < 0
             if np.any(mask):
                 invalidate = True
                 opts = self.getSpotOpts(dataSet[mask])
-                sourceRect = self.fragmentAtlas.getSymbolCoords(opts)
-                dataSet['sourceRect'][mask] = sourceRect
+                dataSet['atlasIndex'][mask] = self.fragmentAtlas.getSymbolCoords(opts, self._symbols, self._pens, self._brushes)
+                if self.fragmentAtlas.needsCollect():
+                    ## evict symbols that are no longer used by any spot
+                    self.fragmentAtlas.collect(np.concatenate([self.spotData['atlasIndex'], dataSet['atlasIndex']]))
                 
             self.fragmentAtlas.getAtlas() # generate atlas so source widths are available.
             
-            dataSet['width'] = np.array(list(imap(QtCore.QRectF.width, dataSet['sourceRect'])))/2
-            dataSet['targetRect'] = None
+            dataSet['width'] = self.fragmentAtlas.coords[dataSet['atlasIndex'], 2] / 2
             self._maxSpotPxWidth = self.fragmentAtlas.max_width
         else:
+            ## the maxima are reset, so measure all spots rather than only dataSet
             self._maxSpotWidth = 0
             self._maxSpotPxWidth = 0
-            self.measureSpotSizes(dataSet)
+            self.measureSpotSizes(self.spotData)
 
         if invalidate:
             self.invalidate()
 
     def getSpotOpts(self, recs, scale=1.0):
+        """
+        Return the style of a single spot record as a tuple 
+        (symbol, size, pen, brush), with defaults filled in. 
+        
+        If *recs* is an array of records, return a copy in which the size is
+        resolved and the symbol, pen and brush fields are indices that refer
+        to an explicit entry in the item's style tables.
+        """
         if recs.ndim == 0:
             rec = recs
             symbol = rec['symbol']
-            if symbol is None:
-                symbol = self.opts['symbol']
+            symbol = self.opts['symbol'] if symbol < 0 else self._symbols[symbol]
             size = rec['size']
             if size < 0:
                 size = self.opts['size']
             pen = rec['pen']
-            if pen is None:
-                pen = self.opts['pen']
+            pen = self.opts['pen'] if pen < 0 else self._pens[pen]
             brush = rec['brush']
-            if brush is None:
-                brush = self.opts['brush']
+            brush = self.opts['brush'] if brush < 0 else self._brushes[brush]
             return (symbol, size*scale, fn.mkPen(pen), fn.mkBrush(brush))
         else:
             recs = recs.copy()
-            recs['symbol'][np.equal(recs['symbol'], None)] = self.opts['symbol']
-            recs['size'][np.equal(recs['size'], -1)] = self.opts['size']
+            recs['symbol'][recs['symbol'] < 0] = self._symbols.index(self.opts['symbol'])
+            recs['size'][recs['size'] < 0] = self.opts['size']
             recs['size'] *= scale
-            recs['pen'][np.equal(recs['pen'], None)] = fn.mkPen(self.opts['pen'])
-            recs['brush'][np.equal(recs['brush'], None)] = fn.mkBrush(self.opts['brush'])
+            recs['pen'][recs['pen'] < 0] = self._pens.index(self.opts['pen'])
+            recs['brush'][recs['brush'] < 0] = self._brushes.index(self.opts['brush'])
             return recs
             
             
         
     def measureSpotSizes(self, dataSet):
-        for rec in dataSet:
-            ## keep track of the maximum spot size and pixel size
-            symbol, size, pen, brush = self.getSpotOpts(rec)
-            width = 0
-            pxWidth = 0
+        ## keep track of the maximum spot size and pixel size
+        opts = self.getSpotOpts(dataSet)
+        if len(opts) > 0:
+            pens = self._pens.values
+            penWidth = np.array([pen.widthF() for pen in pens])[opts['pen']]
+            cosmetic = np.array([pen.isCosmetic() for pen in pens], dtype=bool)[opts['pen']]
             if self.opts['pxMode']:
-                pxWidth = size + pen.widthF()
+                width = np.zeros(1)
+                pxWidth = opts['size'] + penWidth
             else:
-                width = size
-                if pen.isCosmetic():
-                    pxWidth += pen.widthF()
-                else:
-                    width += pen.widthF()
-            self._maxSpotWidth = max(self._maxSpotWidth, width)
-            self._maxSpotPxWidth = max(self._maxSpotPxWidth, pxWidth)
+                width = opts['size'] + np.where(cosmetic, 0, penWidth)
+                pxWidth = np.where(cosmetic, penWidth, 0)
+            self._maxSpotWidth = max(self._maxSpotWidth, width.max())
+            self._maxSpotPxWidth = max(self._maxSpotPxWidth, pxWidth.max())
         self.bounds = [None, None]
     
     
     def clear(self):
         """Remove all spots from the scatter plot"""
         #self.clearItems()
-        self.data = np.empty(0, dtype=self.data.dtype)
+        self.spotData = np.empty(0, dtype=self.spotData.dtype)
+        self.pointData = np.empty(0, dtype=object)
+        self._items = np.empty(0, dtype=object)
+        self._legacyData = None
+        for table in (self._symbols, self._pens, self._brushes):
+            table.clear()
+        self._symbolPaths = {}
         self.bounds = [None, None]
+        self._spatialIndex = None
+        self._deviceCache = None
         self.invalidate()
 
     def dataBounds(self, ax, frac=1.0, orthoRange=None):
@@ -621,29 +1113,42 @@ class ScatterPlotItem(GraphicsObject):
             return self.bounds[ax]
         
         #self.prepareGeometryChange()
-        if self.data is None or len(self.data) == 0:
+        if self.spotData is None or len(self.spotData) == 0:
             return (None, None)
         
         if ax == 0:
-            d = self.data['x']
-            d2 = self.data['y']
+            d = self.spotData['x']
+            d2 = self.spotData['y']
         elif ax == 1:
-            d = self.data['y']
-            d2 = self.data['x']
+            d = self.spotData['y']
+            d2 = self.spotData['x']
         
         if orthoRange is not None:
             mask = (d2 >= orthoRange[0]) * (d2 <= orthoRange[1])
             d = d[mask]
             d2 = d2[mask]
             
+        if frac < 1.0:
+            ## estimate percentiles from a fixed-size random sample of the selected points
+            idx = fn.percentileSample(len(d))
+            if idx is not None:
+                d = d[idx]
+            
         if frac >= 1.0:
-            self.bounds[ax] = (np.nanmin(d) - self._maxSpotWidth*0.7072, np.nanmax(d) + self._maxSpotWidth*0.7072)
-            return self.bounds[ax]
+            if len(d) == 0:
+                return (None, None)
+            bounds = (np.nanmin(d) - self._maxSpotWidth*0.7072, np.nanmax(d) + self._maxSpotWidth*0.7072)
+            if orthoRange is None:
+                ## only the full-range bounds are cached; they do not depend on the view
+                self.bounds[ax] = bounds
+            return bounds
         elif frac <= 0.0:
             raise Exception("Value for parameter 'frac' must be > 0. (got %s)" % str(frac))
         else:
             mask = np.isfinite(d)
             d = d[mask]
+            if len(d) == 0:
+                return (None, None)
             return np.percentile(d, [50 * (1 - frac), 50 * (1 + frac)])
 
     def pixelPadding(self):
@@ -679,10 +1184,9 @@ class ScatterPlotItem(GraphicsObject):
         return QtCore.QRectF(xmn-px, ymn-py, (2*px)+xmx-xmn, (2*py)+ymx-ymn)
 
     def viewTransformChanged(self):
+        ## note that cached data bounds do not depend on the view and remain valid
         self.prepareGeometryChange()
         GraphicsObject.viewTransformChanged(self)
-        self.bounds = [None, None]
-        self.data['targetRect'] = None
 
     def setExportMode(self, *args, **kwds):
         GraphicsObject.setExportMode(self, *args, **kwds)
@@ -695,15 +1199,46 @@ class ScatterPlotItem(GraphicsObject):
         if tr is None:
             return None
 
-        #pts = np.empty((2,len(self.data['x'])))
-        #pts[0] = self.data['x']
-        #pts[1] = self.data['y']
+        #pts = np.empty((2,len(self.spotData['x'])))
+        #pts[0] = self.spotData['x']
+        #pts[1] = self.spotData['y']
         pts = fn.transformCoordinates(tr, pts)
-        pts -= self.data['width']
+        pts -= self.spotData['width']
         pts = np.clip(pts, -2**30, 2**30) ## prevent Qt segmentation fault.
         
         return pts
 
+    def _devicePoints(self):
+        ## Return the device coordinates of the top-left corner of each spot,
+        ## like mapPointsToDevice(), but reusing the result of the previous call.
+        ## If only the translation of the device transform has changed (as when
+        ## panning), the cached coordinates are shifted in place instead of being
+        ## mapped again. The returned array must not be modified or kept.
+        tr = self.deviceTransform()
+        if tr is None:
+            return None
+        linear = (tr.m11(), tr.m12(), tr.m21(), tr.m22(), tr.m13(), tr.m23(), tr.m33())
+        offset = (tr.dx(), tr.dy())
+        cache = self._deviceCache
+        ## ViewBox recomputes its scale on every pan, so allow for rounding noise.
+        ## The cached linear part is kept so that errors cannot accumulate.
+        if cache is not None and np.allclose(linear, cache[0], rtol=1e-9, atol=0):
+            linear = cache[0]
+            pts = cache[2]
+            if offset[0] != cache[1][0]:
+                pts[0] += offset[0] - cache[1][0]
+            if offset[1] != cache[1][1]:
+                pts[1] += offset[1] - cache[1][1]
+        else:
+            x = self.spotData['x']
+            y = self.spotData['y']
+            w = self.spotData['width']
+            pts = np.empty((2, len(x)))
+            pts[0] = x * linear[0] + y * linear[2] + (offset[0] - w)
+            pts[1] = x * linear[1] + y * linear[3] + (offset[1] - w)
+        self._deviceCache = (linear, offset, pts)
+        return pts
+
     def getViewMask(self, pts):
         # Return bool mask indicating all points that are within viewbox
         # pts is expressed in *device coordiantes*
@@ -711,14 +1246,45 @@ class ScatterPlotItem(GraphicsObject):
         if vb is None:
             return None
         viewBounds = vb.mapRectToDevice(vb.boundingRect())
-        w = self.data['width']
-        mask = ((pts[0] + w > viewBounds.left()) &
-                (pts[0] - w < viewBounds.right()) &
-                (pts[1] + w > viewBounds.top()) &
-                (pts[1] - w < viewBounds.bottom())) ## remove out of view points 
+        ## compare against the widest symbol rather than each spot's own width;
+        ## this avoids per-point arithmetic and only keeps a few extra spots near the edges
+        w = self._maxSpotPxWidth
+        mask = pts[0] > viewBounds.left() - w
+        mask &= pts[0] < viewBounds.right()
+        mask &= pts[1] > viewBounds.top() - w
+        mask &= pts[1] < viewBounds.bottom()  ## remove out of view points 
         return mask
         
         
+    def _deviceCells(self, pts, inds):
+        ## Bin the centers of the points *inds* into a grid of cells covering
+        ## the view box in device coordinates. Returns the flat cell index of 
+        ## each point, the grid shape (rows, cols) and the device rect of the grid.
+        vb = self.getViewBox()
+        viewBounds = vb.mapRectToDevice(vb.boundingRect())
+        cell = self.opts['aggregateCellSize']
+        cols = max(1, int(np.ceil(viewBounds.width() / cell)))
+        rows = max(1, int(np.ceil(viewBounds.height() / cell)))
+        w = self.spotData['width'][inds]
+        ix = np.clip(((pts[0,inds] + w - viewBounds.left()) / cell).astype(int), 0, cols-1)
+        iy = np.clip(((pts[1,inds] + w - viewBounds.top()) / cell).astype(int), 0, rows-1)
+        rect = QtCore.QRectF(viewBounds.left(), viewBounds.top(), cols*cell, rows*cell)
+        return iy * cols + ix, (rows, cols), rect
+        
+    def _paintDensity(self, p, cells, shape, rect):
+        ## Draw the number of points per cell as an image
+        counts = np.bincount(cells, minlength=shape[0]*shape[1]).reshape(shape)
+        density = np.log1p(counts)
+        cmap = self.opts['densityColorMap']
+        if cmap is None:
+            color = fn.mkBrush(self.opts['brush']).color()
+            rgb = [color.red(), color.green(), color.blue()]
+            cmap = ColorMap([0., 1.], [rgb + [0], rgb + [255]])
+        lut = cmap.getLookupTable(nPts=256, alpha=True)
+        argb, alpha = fn.makeARGB(density, lut=lut, levels=[0, max(density.max(), 1e-9)])
+        img = fn.makeQImage(argb, alpha=True, transpose=False)
+        p.drawImage(rect, img)
+        
     @debug.warnOnException  ## raising an exception here causes crash
     def paint(self, p, *args):
 
@@ -735,38 +1301,48 @@ class ScatterPlotItem(GraphicsObject):
         if self.opts['pxMode'] is True:
             p.resetTransform()
             
-            # Map point coordinates to device
-            pts = np.vstack([self.data['x'], self.data['y']])
-            pts = self.mapPointsToDevice(pts)
+            # Map point coordinates to device (only visible points are drawn, 
+            # so these need not be clipped as in mapPointsToDevice)
+            pts = self._devicePoints()
             if pts is None:
                 return
             
             # Cull points that are outside view
             viewMask = self.getViewMask(pts)
             #pts = pts[:,mask]
-            #data = self.data[mask]
+            #data = self.spotData[mask]
+            
+            # Aggregate points that share a device pixel grid cell
+            threshold = self.opts['aggregateThreshold']
+            if threshold is not None and viewMask is not None and self._exportOpts is False:
+                inds = np.argwhere(viewMask)[:,0]
+                if len(inds) > threshold:
+                    cells, shape, rect = self._deviceCells(pts, inds)
+                    if self.opts['aggregateMode'] == 'density':
+                        self._paintDensity(p, cells, shape, rect)
+                        return
+                    ## keep the last point in each cell, which would be drawn on top
+                    last = len(cells) - 1 - np.unique(cells[::-1], return_index=True)[1]
+                    viewMask = np.zeros(len(self.spotData), dtype=bool)
+                    viewMask[inds[last]] = True
             
             if self.opts['useCache'] and self._exportOpts is False:
                 # Draw symbols from pre-rendered atlas
                 atlas = self.fragmentAtlas.getAtlas()
                 
-                # Update targetRects if necessary
-                updateMask = viewMask & np.equal(self.data['targetRect'], None)
-                if np.any(updateMask):
-                    updatePts = pts[:,updateMask]
-                    width = self.data[updateMask]['width']*2
-                    self.data['targetRect'][updateMask] = list(imap(QtCore.QRectF, updatePts[0,:], updatePts[1,:], width, width))
-                
-                data = self.data[viewMask]
-                if USE_PYSIDE or USE_PYQT5:
-                    list(imap(p.drawPixmap, data['targetRect'], repeat(atlas), data['sourceRect']))
-                else:
-                    p.drawPixmapFragments(data['targetRect'].tolist(), data['sourceRect'].tolist(), atlas)
+                # Fill one pixmap fragment per visible point and draw them all at once
+                data = self.spotData[viewMask]
+                frags = self._fragments.get(len(data))
+                frags[:,0] = pts[0,viewMask] + data['width']  ## fragments are positioned by their center
+                frags[:,1] = pts[1,viewMask] + data['width']
+                frags[:,2:6] = self.fragmentAtlas.coords[data['atlasIndex']]
+                frags[:,6:] = (1, 1, 0, 1)  ## scaleX, scaleY, rotation, opacity
+                p.drawPixmapFragments(self._fragments.fragments(), atlas)
             else:
                 # render each symbol individually
                 p.setRenderHint(p.Antialiasing, aa)
 
-                data = self.data[viewMask]
+                data = self.spotData[viewMask]
                 pts = pts[:,viewMask]
                 for i, rec in enumerate(data):
                     p.resetTransform()
@@ -776,54 +1352,148 @@ class ScatterPlotItem(GraphicsObject):
             if self.picture is None:
                 self.picture = QtGui.QPicture()
                 p2 = QtGui.QPainter(self.picture)
-                for rec in self.data:
-                    if scale != 1.0:
-                        rec = rec.copy()
-                        rec['size'] *= scale
-                    p2.resetTransform()
-                    p2.translate(rec['x'], rec['y'])
-                    drawSymbol(p2, *self.getSpotOpts(rec, scale))
+                self._paintScaled(p2)
                 p2.end()
                 
             p.setRenderHint(p.Antialiasing, aa)
             self.picture.play(p)
         
+    def _paintScaled(self, p):
+        """
+        Draw all spots in item coordinates (used when pxMode is False).
+        
+        Spots are grouped by style, and each group is drawn with a few large 
+        QPainterPaths built from the element arrays of the symbol, offset and 
+        scaled for every spot. This avoids one drawPath call (and one painter 
+        state change) per spot. Spots are drawn in order of style rather than in 
+        the order they were added, and overlapping spots within one path are 
+        filled only once.
+        """
+        data = self.spotData
+        data = data[np.isfinite(data['x']) & np.isfinite(data['y'])]
+        opts = self.getSpotOpts(data)
+        opts = opts[(opts['symbol'] >= 0) & (opts['size'] > 0)]
+        if len(opts) == 0:
+            return
+        
+        ## drawSymbol scales the painter by the spot size, which also scales the 
+        ## width of non-cosmetic pens. Such spots are grouped by size as well.
+        cosmetic = np.array([pen.isCosmetic() for pen in self._pens.values], dtype=bool)
+        sizeKey = np.where(cosmetic[opts['pen']], 0, opts['size'])
+        first, inv = _uniqueRows(opts['symbol'], opts['pen'], opts['brush'], sizeKey)
+        order = np.argsort(inv, kind='mergesort')
+        bounds = np.searchsorted(inv[order], np.arange(len(first)+1))
+        
+        for i, rec in enumerate(opts[first]):
+            group = opts[order[bounds[i]:bounds[i+1]]]
+            types, ex, ey = self._symbolElements(rec['symbol'])
+            if len(types) == 0:
+                continue
+            pen = self._pens[rec['pen']]
+            if not pen.isCosmetic():
+                pen = QtGui.QPen(pen)
+                pen.setWidthF(pen.widthF() * rec['size'])
+            p.setPen(pen)
+            p.setBrush(self._brushes[rec['brush']])
+            
+            ## Very large paths are slow to rasterize, so each path holds a limited number of spots.
+            for start in range(0, len(group), 64):
+                chunk = group[start:start+64]
+                size = chunk['size'][:,None]
+                x = (chunk['x'][:,None] + size * ex).ravel()
+                y = (chunk['y'][:,None] + size * ey).ravel()
+                ## arrayToQPath stores connect[i] as the type of element i+1, and
+                ## the last entry as the fill rule (1 = WindingFill).
+                connect = np.empty(len(x), dtype=np.int32)
+                connect.reshape(len(chunk), len(types))[:] = types
+                connect[:-1] = connect[1:]
+                connect[-1] = 1
+                p.drawPath(fn.arrayToQPath(x, y, connect=connect))
+    
+    def _symbolElements(self, index):
+        ## element arrays of the symbol at *index* in the symbol table
+        try:
+            return self._symbolPaths[index]
+        except KeyError:
+            elements = _pathElements(_symbolPath(self._symbols[index]))
+            self._symbolPaths[index] = elements
+            return elements
+        
     def points(self):
-        for rec in self.data:
-            if rec['item'] is None:
-                rec['item'] = SpotItem(rec, self)
-        return self.data['item']
+        """Return an array of SpotItems, one for each point."""
+        return self._spotItems(slice(None))
+    
+    def _spotItems(self, indices):
+        ## return the SpotItems for the given points, creating only those that do not exist yet
+        items = self._items[indices]
+        missing = np.argwhere(np.equal(items, None))[:,0]
+        if len(missing) > 0:
+            inds = np.arange(len(self._items))[indices]
+            for i in missing:
+                items[i] = self._items[inds[i]] = SpotItem(inds[i], self)
+            self._legacyData = None
+        return items
         
-    def pointsAt(self, pos):
+    def spatialIndex(self):
+        """Return a :class:`GridIndex <pyqtgraph.util.grid_index.GridIndex>` of 
+        the point positions. The index is built on first use and discarded 
+        whenever points are added or removed."""
+        if self._spatialIndex is None:
+            self._spatialIndex = GridIndex(self.spotData['x'], self.spotData['y'])
+        return self._spatialIndex
+        
+    def pointIndicesAt(self, pos):
+        """Return the indices of all points whose symbol covers *pos* (in 
+        local coordinates), most recently added points first."""
+        if len(self.spotData) == 0:
+            return np.empty(0, dtype=int)
         x = pos.x()
         y = pos.y()
-        pw = self.pixelWidth()
-        ph = self.pixelHeight()
-        pts = []
-        for s in self.points():
-            sp = s.pos()
-            ss = s.size()
-            sx = sp.x()
-            sy = sp.y()
-            s2x = s2y = ss * 0.5
-            if self.opts['pxMode']:
-                s2x *= pw
-                s2y *= ph
-            if x > sx-s2x and x < sx+s2x and y > sy-s2y and y < sy+s2y:
-                pts.append(s)
-                #print "HIT:", x, y, sx, sy, s2x, s2y
-            #else:
-                #print "No hit:", (x, y), (sx, sy)
-                #print "       ", (sx-s2x, sy-s2y), (sx+s2x, sy+s2y)
-        #pts.sort(lambda a,b: cmp(b.zValue(), a.zValue()))
-        return pts[::-1]
+        if self._maxHitSize is None:
+            sizes = self.spotData['size']
+            self._maxHitSize = max(self.opts['size'], sizes.max()) if np.any(sizes < 0) else sizes.max()
+        sx = sy = 0.5
+        if self.opts['pxMode']:
+            sx *= self.pixelWidth()
+            sy *= self.pixelHeight()
+        
+        ## candidates lie within the largest spot size; then test each with its own size
+        s2x = self._maxHitSize * sx
+        s2y = self._maxHitSize * sy
+        inds = self.spatialIndex().query(x-s2x, x+s2x, y-s2y, y+s2y)
+        data = self.spotData[inds]
+        size = data['size']
+        size = np.where(size < 0, self.opts['size'], size)
+        s2x = size * sx
+        s2y = size * sy
+        mask = (x > data['x']-s2x) & (x < data['x']+s2x) & (y > data['y']-s2y) & (y < data['y']+s2y)
+        return inds[mask][::-1]
+        
+    def pointsAt(self, pos):
+        """Return a list of SpotItems for all points whose symbol covers *pos*
+        (in local coordinates), most recently added points first."""
+        return list(self._spotItems(self.pointIndicesAt(pos)))
+        
+    def pointIndicesInRect(self, rect):
+        """Return the sorted indices of all points whose position lies within
+        the QRectF *rect* (in local coordinates)."""
+        if len(self.spotData) == 0:
+            return np.empty(0, dtype=int)
+        rect = rect.normalized()
+        return self.spatialIndex().query(rect.left(), rect.right(), rect.top(), rect.bottom())
+        
+    def pointsInRect(self, rect):
+        """Return a list of SpotItems for all points whose position lies 
+        within the QRectF *rect* (in local coordinates)."""
+        return list(self._spotItems(self.pointIndicesInRect(rect)))
             
 
     def mouseClickEvent(self, ev):
         if ev.button() == QtCore.Qt.LeftButton:
-            pts = self.pointsAt(ev.pos())
-            if len(pts) > 0:
-                self.ptsClicked = pts
+            inds = self.pointIndicesAt(ev.pos())
+            if len(inds) > 0:
+                self.sigIndicesClicked.emit(self, inds)
+                self.ptsClicked = list(self._spotItems(inds))
                 self.sigClicked.emit(self, self.ptsClicked)
                 ev.accept()
             else:
@@ -838,30 +1508,48 @@ class SpotItem(object):
     Class referring to individual spots in a scatter plot.
     These can be retrieved by calling ScatterPlotItem.points() or 
     by connecting to the ScatterPlotItem's click signals.
+    
+    A SpotItem is a view of the point with a given index in the 
+    ScatterPlotItem's arrays; it holds no data of its own. SpotItems are 
+    created on demand and become invalid when the plot's data is replaced.
     """
 
-    def __init__(self, data, plot):
+    def __init__(self, index, plot):
         #GraphicsItem.__init__(self, register=False)
-        self._data = data
+        self._index = index
         self._plot = plot
         #self.setParentItem(plot)
         #self.setPos(QtCore.QPointF(data['x'], data['y']))
         #self.updateItem()
     
+    @property
+    def _rec(self):
+        ## record of this spot in the plot's spotData array
+        return self._plot.spotData[self._index]
+    
+    @property
+    def _data(self):
+        ## record of this spot in the plot's legacy data array (read-only; see ScatterPlotItem.data)
+        return self._plot.data[self._index]
+    
+    def index(self):
+        """Return the index of this spot in the ScatterPlotItem."""
+        return self._index
+    
     def data(self):
         """Return the user data associated with this spot."""
-        return self._data['data']
+        return self._plot.pointData[self._index]
     
     def size(self):
         """Return the size of this spot. 
         If the spot has no explicit size set, then return the ScatterPlotItem's default size instead."""
-        if self._data['size'] == -1:
+        if self._rec['size'] == -1:
             return self._plot.opts['size']
         else:
-            return self._data['size']
+            return self._rec['size']
     
     def pos(self):
-        return Point(self._data['x'], self._data['y'])
+        return Point(self._rec['x'], self._rec['y'])
         
     def viewPos(self):
         return self._plot.mapToView(self.pos())
@@ -870,16 +1558,18 @@ class SpotItem(object):
         """Set the size of this spot. 
         If the size is set to -1, then the ScatterPlotItem's default size 
         will be used instead."""
-        self._data['size'] = size
+        self._rec['size'] = size
         self.updateItem()
     
     def symbol(self):
         """Return the symbol of this spot. 
         If the spot has no explicit symbol set, then return the ScatterPlotItem's default symbol instead.
         """
-        symbol = self._data['symbol']
-        if symbol is None:
+        symbol = self._rec['symbol']
+        if symbol < 0:
             symbol = self._plot.opts['symbol']
+        else:
+            symbol = self._plot._symbols[symbol]
         try:
             n = int(symbol)
             symbol = list(Symbols.keys())[n % len(Symbols)]
@@ -889,51 +1579,56 @@ class SpotItem(object):
     
     def setSymbol(self, symbol):
         """Set the symbol for this spot.
-        If the symbol is set to '', then the ScatterPlotItem's default symbol will be used instead."""
-        self._data['symbol'] = symbol
+        If the symbol is set to None, then the ScatterPlotItem's default symbol will be used instead."""
+        self._rec['symbol'] = self._plot._symbols.index(symbol)
         self.updateItem()
 
     def pen(self):
-        pen = self._data['pen']
-        if pen is None:
+        pen = self._rec['pen']
+        if pen < 0:
             pen = self._plot.opts['pen']
+        else:
+            pen = self._plot._pens[pen]
         return fn.mkPen(pen)
     
     def setPen(self, *args, **kargs):
         """Set the outline pen for this spot"""
         pen = fn.mkPen(*args, **kargs)
-        self._data['pen'] = pen
+        self._rec['pen'] = self._plot._pens.index(pen)
         self.updateItem()
     
     def resetPen(self):
         """Remove the pen set for this spot; the scatter plot's default pen will be used instead."""
-        self._data['pen'] = None  ## Note this is NOT the same as calling setPen(None)
+        self._rec['pen'] = -1  ## Note this is NOT the same as calling setPen(None)
         self.updateItem()
     
     def brush(self):
-        brush = self._data['brush']
-        if brush is None:
+        brush = self._rec['brush']
+        if brush < 0:
             brush = self._plot.opts['brush']
+        else:
+            brush = self._plot._brushes[brush]
         return fn.mkBrush(brush)
     
     def setBrush(self, *args, **kargs):
         """Set the fill brush for this spot"""
         brush = fn.mkBrush(*args, **kargs)
-        self._data['brush'] = brush
+        self._rec['brush'] = self._plot._brushes.index(brush)
         self.updateItem()
     
     def resetBrush(self):
         """Remove the brush set for this spot; the scatter plot's default brush will be used instead."""
-        self._data['brush'] = None  ## Note this is NOT the same as calling setBrush(None)
+        self._rec['brush'] = -1  ## Note this is NOT the same as calling setBrush(None)
         self.updateItem()
     
     def setData(self, data):
         """Set the user-data associated with this spot"""
-        self._data['data'] = data
+        self._plot.pointData[self._index] = data
+        self._plot._legacyData = None
 
     def updateItem(self):
-        self._data['sourceRect'] = None
-        self._plot.updateSpots(self._data.reshape(1))
+        self._rec['atlasIndex'] = -1
+        self._plot.updateSpots(self._plot.spotData[self._index:self._index+1])
         self._plot.invalidate()
 
 #class PixmapSpotItem(SpotItem, QtGui.QGraphicsPixmapItem):
@@ -0,0 +1,140 @@
+import time
+import numpy as np
+import pyqtgraph as pg
+
+app = pg.mkQApp()
+
+
+def test_renderBuffer():
+    img = pg.ImageItem()
+    lut = np.random.randint(0, 256, size=(256, 3)).astype(np.ubyte)
+    data = np.random.randint(0, 1000, size=(40, 30)).astype(np.uint16)
+    img.setImage(data, levels=[0, 1000], lut=lut)
+    img.render()
+    buf = img._renderBuffer
+    expected = pg.makeARGB(data.T, lut=lut, levels=[0, 1000])[0]
+    assert np.all(pg.imageToArray(img.qimage, copy=True, transpose=False) == expected)
+    
+    # a new frame of the same shape is rendered into the same buffer
+    data = np.random.randint(0, 1000, size=(40, 30)).astype(np.uint16)
+    img.updateImage(data)
+    img.render()
+    assert img._renderBuffer is buf
+    expected = pg.makeARGB(data.T, lut=lut, levels=[0, 1000])[0]
+    assert np.all(pg.imageToArray(img.qimage, copy=True, transpose=False) == expected)
+    
+    img.updateImage(np.zeros((20, 10)))
+    img.render()
+    assert img._renderBuffer.shape == (10, 20, 4)
+    assert img.qimage.width() == 20 and img.qimage.height() == 10
+
+
+def test_tiles():
+    data = np.random.randint(0, 1000, size=(100, 70)).astype(np.uint16)
+    img = pg.ImageItem(data, levels=[0, 1000], tileSize=16)
+    
+    # without a view, all tiles are rendered at full resolution
+    qimg = pg.QtGui.QImage(100, 70, pg.QtGui.QImage.Format_ARGB32)
+    qimg.fill(0)
+    p = pg.QtGui.QPainter(qimg)
+    img.paint(p)
+    p.end()
+    assert len(img._tiles) == 7 * 5
+    expected = pg.makeARGB(data.T, levels=[0, 1000])[0]
+    assert np.all(pg.imageToArray(qimg, copy=True, transpose=False) == expected)
+    
+    # only tiles in the visible region are rendered
+    win = pg.GraphicsLayoutWidget()
+    win.resize(200, 200)
+    win.show()
+    view = win.addViewBox()
+    view.addItem(img)
+    view.setRange(pg.QtCore.QRectF(0, 0, 20, 20), padding=0)
+    img.setLevels([0, 500])
+    win.grab()
+    keys = [k for k in img._tiles.keys() if k[3] == (0., 500.)]
+    assert 0 < len(keys) <= 4
+    assert all(k[0] == 0 and k[1] < 2 and k[2] < 2 for k in keys)
+    
+    # zoomed out, tiles come from a downsampled level
+    view.setRange(pg.QtCore.QRectF(0, 0, 1000, 1000), padding=0)
+    win.grab()
+    assert any(k[0] > 0 for k in img._tiles.keys())
+    level1 = img._pyramidLevel(1)[0]
+    assert level1.shape == (50, 35) and level1.dtype == data.dtype
+    assert np.all(level1 == data.reshape(50, 2, 35, 2).mean(axis=(1, 3)).astype(np.uint16))
+    
+    # new image data invalidates rendered tiles
+    img.setImage(data[::-1])
+    assert len(img._tiles) == 0
+    win.close()
+
+
+def test_autoDownsample():
+    data = np.random.randint(0, 1000, size=(400, 300)).astype(np.uint16)
+    win = pg.GraphicsLayoutWidget()
+    win.resize(200, 200)
+    win.show()
+    view = win.addViewBox()
+    img = pg.ImageItem(data, levels=[0, 1000], autoDownsample=True)
+    view.addItem(img)
+    view.setRange(pg.QtCore.QRectF(0, 0, 400, 400), padding=0)
+    win.grab()
+    
+    # rendered from a pyramid level plus the remaining downsampling
+    level, xds, yds = img._lastDownsample
+    assert level >= 1 and len(img._pyramid) == level + 1
+    assert img.qimage.width() == 400 // xds
+    
+    # the image is only re-rendered if the view needs different downsampling
+    qimage = img.qimage
+    img.viewTransformChanged()
+    assert img.qimage is qimage
+    view.setRange(pg.QtCore.QRectF(0, 0, 100, 100), padding=0)
+    win.grab()
+    assert img.qimage is not qimage
+    assert img._lastDownsample[1] < xds
+    
+    img.setDownsampleMode('max')
+    assert img._pyramid is None
+    level2 = img._pyramidLevel(2)[0]
+    assert np.all(level2 == data.reshape(100, 4, 75, 4).max(axis=(1, 3)))
+    
+    # levels computed in a background thread; the item redraws when they are done
+    img.setDownsampleMode('mean', background=True)
+    ready = []
+    pyramidReady = img._pyramidReady
+    def spy(thread):
+        pyramidReady(thread)
+        ready.append((thread, img.qimage is None))
+    img._pyramidReady = spy
+    img.render()
+    image, level = img._pyramidLevel(3)
+    assert level <= 3
+    thread = img._pyramidThread
+    start = time.time()
+    while len(ready) == 0 and time.time() - start < 10:
+        app.processEvents()
+    del img._pyramidReady
+    assert ready == [(thread, True)]  # the rendered image was discarded
+    assert len(img._pyramid) == 9  # down to 1x1
+    
+    # signals from a replaced thread are ignored
+    img.render()
+    img._pyramidThread = None
+    img._pyramidReady(thread)
+    assert img.qimage is not None
+    img._pyramidThread = thread
+    assert np.all(img._pyramidLevel(1)[0] == data.reshape(200, 2, 150, 2).mean(axis=(1, 3)).astype(np.uint16))
+    
+    # new data aborts and discards the computed levels
+    img._pyramidLevel(3)
+    img.setImage(data[::-1])
+    assert img._pyramid is None and img._pyramidThread is None
+    win.close()
+
+
+if __name__ == '__main__':
+    test_renderBuffer()
+    test_tiles()
+    test_autoDownsample()
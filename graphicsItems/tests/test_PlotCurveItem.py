@@ -0,0 +1,169 @@
+import numpy as np
+import pyqtgraph as pg
+
+app = pg.mkQApp()
+
+
+def test_pathChunks():
+    c = pg.PlotCurveItem()
+    c.pathChunkSize = 100
+    c.setData(np.random.normal(size=350), bufferSize=400)
+    chunks = c._updatePathChunks()
+    assert [ch[:2] for ch in chunks] == [[0, 100], [100, 200], [200, 300], [300, 350]]
+    paths = [ch[2][0] for ch in chunks]
+
+    # complete chunks are reused after appending; partial and dropped chunks are rebuilt
+    c.appendData(np.random.normal(size=100))
+    chunks = c._updatePathChunks()
+    assert [ch[:2] for ch in chunks] == [[50, 100], [100, 200], [200, 300], [300, 400], [400, 450]]
+    assert chunks[1][2][0] is paths[1] and chunks[2][2][0] is paths[2]
+    assert chunks[0][2][0] is not paths[0]
+
+    # each chunk starts at the last sample of the previous one
+    y = c.yData
+    assert chunks[1][2][0].elementCount() == 101
+    assert chunks[1][2][0].elementAt(0).y == y[49]
+    assert chunks[1][2][0].elementAt(1).isLineTo()
+    assert chunks[0][3][1] == y[:50].min()
+
+
+
+def test_pathChunks_pairs():
+    # chunks keep pairing samples relative to xData[0] after an odd number of samples is dropped
+    c = pg.PlotCurveItem()
+    c.pathChunkSize = 100
+    c.setData(np.random.normal(size=298), connect='pairs', bufferSize=300)
+    c._updatePathChunks()
+    c.appendData(np.random.normal(size=3))
+    assert c._dataOffset() == 1
+    chunks = c._updatePathChunks()
+    ref = pg.arrayToQPath(c.xData, c.yData, connect='pairs')
+    refTypes = [ref.elementAt(i).type for i in range(ref.elementCount())]
+    for start, stop, shapes, rect in chunks:
+        i0 = start - 1 - c._dataOffset() if start > c._dataOffset() else 0
+        path = shapes[0]
+        types = [path.elementAt(i).type for i in range(path.elementCount())]
+        # the first element of a chunk is always a move
+        assert types[1:] == refTypes[i0+1:i0+len(types)]
+
+
+def test_pathChunking_disabled():
+    c = pg.PlotCurveItem(np.random.normal(size=350))
+    c.pathChunkSize = 100
+    assert c._drawInChunks()
+    c.pathChunking = False
+    assert not c._drawInChunks()
+    
+    # polyline mode still draws from chunks, with a single chunk
+    c.setData(np.random.normal(size=350), polyline=True)
+    assert c._drawInChunks()
+    assert [ch[:2] for ch in c._updatePathChunks()] == [[0, 350]]
+
+
+def test_visibleChunks_shadowPen():
+    # chunks just outside the view are drawn if the shadow pen reaches into it
+    plt = pg.plot()
+    plt.resize(400, 200)
+    y = np.zeros(400)
+    y[290:] = 5
+    c = pg.PlotCurveItem(np.arange(400.), y, pen=pg.mkPen('w', width=1))
+    c.pathChunkSize = 100
+    plt.addItem(c)
+    plt.setRange(xRange=(0, 400), yRange=(-1, 4.8), padding=0)
+    app.processEvents()
+    assert len(c._visibleChunks()) == 3
+    c.setShadowPen(pg.mkPen('r', width=40))
+    assert len(c._visibleChunks()) == 4
+    plt.close()
+
+
+def test_polyline():
+    y = np.sin(np.linspace(0, 20, 1000))
+    y[[100, 101, 102, 500, 998]] = np.nan
+    c = pg.PlotCurveItem(y, connect='finite', polyline=True)
+    polys = c._updatePathChunks()[0][2]
+    assert [len(p) for p in polys] == [100, 397, 497]
+    assert polys[1][0].x() == 103 and polys[1][0].y() == y[103]
+
+    # chunks are rebuilt as paths when polyline mode is switched off
+    c.setData(y, connect='finite', polyline=False)
+    shapes = c._updatePathChunks()[0][2]
+    assert len(shapes) == 1 and isinstance(shapes[0], pg.QtGui.QPainterPath)
+
+
+
+def test_finiteMask():
+    y = np.arange(10.)
+    y[[3, 4]] = np.nan
+    y[7] = np.inf
+    c = pg.PlotCurveItem(y, connect='finite')
+    assert c.dataBounds(1) == (0., 9.)
+    assert c.dataBounds(1, orthoRange=(3, 8)) == (5., 8.)
+
+    # only consecutive finite samples are joined, and no NaN reaches Qt
+    path = c.getPath()
+    types = [path.elementAt(i).type for i in range(path.elementCount())]
+    assert types == [0, 1, 1, 0, 1, 0, 1]
+    assert np.isfinite(path.boundingRect().width())
+    
+    # paths only cover the finite data
+    c2 = pg.PlotCurveItem(np.arange(10.) + 10, y + 10, connect='finite')
+    for path in [c2.getPath(), c2._updatePathChunks()[0][2][0]]:
+        assert path.boundingRect() == pg.QtCore.QRectF(10, 10, 9, 9)
+    c2.setData(np.arange(10.) + 10, np.where(y > 5, y, np.nan) + 10, connect='finite')
+    assert c2.getPath().boundingRect() == pg.QtCore.QRectF(16, 16, 3, 3)
+
+    # mask and bounds are extended by appendData
+    c.appendData(np.array([np.nan, -5.]))
+    assert c._finiteMask.tolist() == np.isfinite(c.yData).tolist()
+    assert c.dataBounds(1) == (-5., 9.)
+
+
+
+def test_indexedBounds():
+    np.random.seed(4)
+    for sortedX in [True, False]:
+        c = pg.PlotCurveItem()
+        c.boundsIndexMinSize = 1000
+        c.boundsBlockSize = 64
+        x = np.cumsum(np.random.random(3000)) if sortedX else np.random.normal(size=3000)
+        c.setData(x, np.random.normal(size=3000), bufferSize=5000)
+        for i in range(4):
+            if i > 0:
+                n = 1500
+                xn = c.xData[-1] + np.cumsum(np.random.random(n)) if sortedX else np.random.normal(size=n)
+                c.appendData(xn, np.random.normal(size=n))
+            x, y = c.getData()
+            for ax, d, d2 in [(0, x, y), (1, y, x)]:
+                assert c.dataBounds(ax) == (d.min(), d.max())
+                for lo, hi in [np.percentile(d2, [10, 40]), np.percentile(d2, [0, 99]), (1e9, 2e9)]:
+                    m = (d2 >= lo) & (d2 <= hi)
+                    expect = (d[m].min(), d[m].max()) if m.any() else (None, None)
+                    assert c.dataBounds(ax, orthoRange=(lo, hi)) == expect
+        assert c._boundsPyramids[1] is not None
+
+
+def test_percentileBounds_orthoRange():
+    # large enough that percentiles are estimated from a sample
+    np.random.seed(5)
+    n = 500000
+    y = np.random.random(n)
+    for x in [np.arange(n, dtype=float), np.random.permutation(n).astype(float)]:
+        c = pg.PlotCurveItem(x, y)
+        # narrow ranges are smaller than the sample and give exact percentiles
+        for lo, hi in [(1000, 1300), (1000, 1010)]:
+            sel = y[(x >= lo) & (x <= hi)]
+            assert np.allclose(c.dataBounds(1, 0.98, (lo, hi)), np.percentile(sel, [1, 99]))
+        # wide ranges are estimated to within the configured rank error
+        sel = np.sort(y[(x >= 1000) & (x <= 401000)])
+        b = c.dataBounds(1, 0.98, (1000, 401000))
+        ranks = np.searchsorted(sel, b) / float(len(sel))
+        assert np.all(abs(ranks - [0.01, 0.99]) < 0.006)
+
+
+if __name__ == '__main__':
+    test_pathChunks()
+    test_polyline()
+    test_finiteMask()
+    test_indexedBounds()
+    test_percentileBounds_orthoRange()
@@ -0,0 +1,97 @@
+import numpy as np
+import pyqtgraph as pg
+
+app = pg.mkQApp()
+
+
+def test_clipToView_irregular():
+    # x values with irregular (jittered) spacing
+    np.random.seed(0)
+    x = np.cumsum(np.random.uniform(0.1, 10.0, size=5000))
+    y = np.random.normal(size=5000)
+
+    w = pg.GraphicsLayoutWidget()
+    w.resize(400, 300)
+    w.show()
+    vb = w.addViewBox()
+    item = pg.PlotDataItem(x, y)
+    vb.addItem(item)
+    item.setClipToView(True)
+    app.processEvents()
+    vb.disableAutoRange()
+    vb.setXRange(x[1000], x[2000], padding=0)
+    app.processEvents()
+
+    xDisp, yDisp = item.getData()
+    # exactly one sample beyond each edge of the view is kept
+    assert xDisp[0] == x[999]
+    assert xDisp[-1] == x[2001]
+    assert np.all(yDisp == y[999:2002])
+
+
+def test_appendData():
+    item = pg.PlotDataItem(np.arange(10.), downsamplePyramid=True)
+    item.appendData(np.arange(10., 15.))
+    x, y = item.getData()
+    assert np.all(x == np.arange(15))
+    assert np.all(y == np.arange(15.))
+
+
+def test_appendData_bufferSize():
+    item = pg.PlotDataItem(np.arange(10.), bufferSize=20)
+    for i in range(5):
+        item.appendData(np.arange(10. + i*7, 17. + i*7))
+    x, y = item.getData()
+    assert np.all(x == np.arange(25, 45))
+    assert np.all(y == np.arange(25., 45.))
+    # curve was extended in place and has the same data
+    assert np.all(item.curve.xData == x)
+    assert item.curve.dataBounds(1) == (25., 44.)
+
+
+def test_appendData_hidden():
+    # the scatter is updated even when the item itself is hidden
+    item = pg.PlotDataItem(np.arange(10.), symbol='o')
+    item.hide()
+    item.appendData(np.arange(10., 15.))
+    item.show()
+    x, y = item.scatter.getData()
+    assert np.all(y == np.arange(15.))
+
+
+def test_setBufferSize():
+    item = pg.PlotDataItem(np.arange(10.), downsamplePyramid=True)
+    item.appendData(np.arange(10., 20.))
+    item.setBufferSize(5)
+    x, y = item.getData()
+    assert np.all(x == np.arange(15, 20))
+    # appended samples continue the sample index of the discarded data
+    item.appendData([100., 101.])
+    x, y = item.getData()
+    assert np.all(x == np.arange(17, 22))
+    assert np.all(y == [17., 18., 19., 100., 101.])
+    assert np.all(item.curve.xData == x)
+    
+    # the min/max pyramid keeps indexing the same absolute samples
+    item = pg.PlotDataItem(np.arange(40.), downsample=4, downsampleMethod='peak', downsamplePyramid=True)
+    item.appendData(np.arange(40., 60.))
+    assert item._pyramid is not None
+    item.setBufferSize(30)
+    item.appendData(np.arange(60., 64.))
+    assert item._pyramid.offset == item._dataOffset() == 34
+    assert item._pyramid.length == 64
+    x, y = item.getData()
+    # bins are aligned to absolute sample indexes
+    assert np.all(x[2:] % 4 == 0)
+    assert x[0] == 34 and y.min() == 34 and y.max() == 63
+
+
+def test_downsampleMethods():
+    plt = pg.PlotItem()
+    item = plt.plot(np.random.normal(size=1000))
+    for method in ['m4', 'lttb', 'peak']:
+        plt.setDownsampling(ds=10, mode=method)
+        assert item.opts['downsampleMethod'] == method
+        x, y = item.getData()
+        assert len(x) == {'m4': 400, 'lttb': 101, 'peak': 200}[method]
+
@@ -82,5 +82,250 @@ def test_init_spots():
     assert spots[1].data() == 'zzz'
     
 
+def test_styleTables():
+    pens = [pg.mkPen('r'), pg.mkPen('r'), None, 'g', 'g', pg.mkPen('g')]
+    symbols = np.array(['o', 't', 'o', 't', 'o', 't'])
+    s = pg.ScatterPlotItem(x=np.arange(6), y=np.arange(6), pen=pens, symbol=symbols)
+    
+    # per-point styles are stored as indices into tables of distinct values
+    assert s.spotData['pen'].dtype.kind == 'i'
+    assert len(s._pens) == 3  # red, green and the default pen
+    assert len(s._symbols) == 2
+    assert s.spotData['pen'][2] == -1
+    
+    spots = s.points()
+    assert spots[0].pen() == pg.mkPen('r')
+    assert spots[2].pen() == s.opts['pen']
+    assert spots[3].pen() == pg.mkPen('g')
+    assert spots[1].symbol() == 't'
+    
+    # equal styles share a single rendered symbol
+    assert len(set(s.spotData['atlasIndex'])) == 5
+    assert s.spotData['atlasIndex'][3] == s.spotData['atlasIndex'][5]
+    
+    spots[4].setSymbol('t')
+    assert s.spotData['atlasIndex'][4] == s.spotData['atlasIndex'][3]
+    
+    # atlas entries are keyed by value and survive replacing the data
+    nSymbols = len(s.fragmentAtlas.symbolArgs)
+    s.setData(x=np.arange(100), y=np.arange(100), symbol='t', 
+              pen=[pg.mkPen('g') for i in range(100)])
+    assert len(s.fragmentAtlas.symbolArgs) == nSymbols
+    assert np.all(s.spotData['atlasIndex'] == s.spotData['atlasIndex'][0])
+    
+
+def test_styleTableIdKeys():
+    from pyqtgraph.graphicsItems.ScatterPlotItem import StyleTable, _brushKey, _symbolKey
+    
+    def gradientBrush(i):
+        grad = pg.QtGui.QLinearGradient(0, 0, 1, 1)
+        grad.setColorAt(0, pg.mkColor(i, 0, 0))
+        grad.setColorAt(1, pg.mkColor(0, 0, 255))
+        return pg.QtGui.QBrush(grad)
+    
+    # temporary brushes keyed by id() never match an earlier, different brush
+    table = StyleTable(_brushKey, pg.mkBrush, pg.QtGui.QBrush)
+    keys = set()
+    for i in range(20):
+        ind = table.index(gradientBrush(i))
+        assert table[ind].gradient().stops()[0][1] == pg.mkColor(i, 0, 0)
+        keys.add(table.keys[ind])
+        table.clear()
+    # keys stay unique after the table is cleared, so the atlas cannot confuse them
+    assert len(keys) == 20
+    
+    # custom symbols are compared by value
+    path1 = pg.QtGui.QPainterPath()
+    path1.addRect(-0.5, -0.5, 1, 0.5)
+    path2 = pg.QtGui.QPainterPath(path1)
+    path3 = pg.QtGui.QPainterPath()
+    path3.addRect(-0.5, -0.5, 0.5, 1)
+    assert _symbolKey(path1) == _symbolKey(path2)
+    assert _symbolKey(path1) != _symbolKey(path3)
+    
+
+def test_legacyData():
+    # the data attribute keeps the record layout of earlier versions
+    s = pg.ScatterPlotItem(x=[0, 1, 2], y=[3, 4, 5], data=['a', 'b', 'c'])
+    s.setPen([pg.mkPen('r'), None, pg.mkPen('g')])
+    assert list(s.data['x']) == [0, 1, 2]
+    assert list(s.data['data']) == ['a', 'b', 'c']
+    assert s.data['pen'][0] == pg.mkPen('r')
+    assert s.data['pen'][1] is None
+    assert s.data['brush'][0] is None
+    assert isinstance(s.data['sourceRect'][0], pg.QtCore.QRectF)
+    assert s.data['item'][0] is None
+    
+    spots = s.points()
+    assert s.data['item'][1] is spots[1]
+    assert spots[2]._data['data'] == 'c'
+    spots[2].setData('z')
+    spots[2].setSize(12)
+    assert s.data['data'][2] == 'z'
+    assert s.data['size'][2] == 12
+    
+
+def test_dataBoundsOrthoRange():
+    # bounds restricted to an orthoRange are not cached as the full-range bounds
+    s = pg.ScatterPlotItem(x=np.arange(100.), y=np.arange(100.), size=0, pxMode=False)
+    assert s.dataBounds(1, orthoRange=(30, 40)) == (30., 40.)
+    assert s.dataBounds(1) == (0., 99.)
+    assert s.dataBounds(1, orthoRange=(30, 40)) == (30., 40.)
+    assert s.dataBounds(1) == (0., 99.)
+    assert s.boundingRect().top() == 0. and s.boundingRect().bottom() == 99.
+    
+
+def test_pointsAt():
+    s = pg.ScatterPlotItem(x=[0, 1, 1, 5], y=[0, 1, 1, 5], size=[1, 1, 2, 1], pxMode=False)
+    pos = pg.QtCore.QPointF(1.3, 1.3)
+    assert list(s.pointIndicesAt(pos)) == [2, 1]
+    assert [spot.size() for spot in s.pointsAt(pos)] == [2, 1]
+    
+    rect = pg.QtCore.QRectF(-1, -1, 3, 3)
+    assert list(s.pointIndicesInRect(rect)) == [0, 1, 2]
+    assert s.pointsInRect(pg.QtCore.QRectF(6, 6, -2, -2))[0].pos() == pg.Point(5, 5)
+    
+    # the index is rebuilt after adding points
+    s.addPoints(x=[1.2], y=[1.2])
+    assert list(s.pointIndicesAt(pos)) == [4, 2, 1]
+    
+
+def test_setPointStyle():
+    s = pg.ScatterPlotItem(x=np.arange(10), y=np.arange(10), data=np.arange(10)*2)
+    s.setPointStyle([1, 3], brush='r', size=[10, 20])
+    s.setPointStyle(np.arange(10) > 7, symbol=['t', 's'], pen=pg.mkPen(None))
+    
+    # SpotItems are only created when requested
+    assert np.all(np.equal(s._items, None))
+    spots = s.points()
+    assert spots[1].brush() == pg.mkBrush('r')
+    assert spots[2].brush() == s.opts['brush']
+    assert spots[3].size() == 20
+    assert spots[2].size() == s.opts['size']
+    assert spots[9].symbol() == 's'
+    assert spots[9].pen() == pg.mkPen(None)
+    assert spots[4].index() == 4
+    assert spots[4].data() == 8
+    assert np.all(s.pointData[[1, 3]] == [2, 6])
+    
+
+def test_aggregation():
+    s = pg.ScatterPlotItem(x=np.random.normal(100, 30, size=1000), y=np.random.normal(100, 30, size=1000))
+    plot.addItem(s)
+    app.processEvents()
+    for mode in ['density', 'symbols']:
+        s.setAggregation(100, mode, cellSize=2)
+        s.update()
+        app.processEvents()
+    s.setAggregation(None)
+    try:
+        s.setAggregation(100, 'hexagons')
+        raise AssertionError("invalid mode accepted")
+    except ValueError:
+        pass
+    plot.clear()
+    
+
+def test_scaledSpots():
+    # spots drawn in data coordinates must match spots drawn one at a time
+    pos = np.array([[10, 10], [30, 10], [50, 10], [10, 40], [30, 40], [50, 40]], dtype=float)
+    s = pg.ScatterPlotItem(pos=pos, size=[8, 10, 12, 8, 10, 12], pxMode=False, antialias=False, 
+                           symbol=['o', 's', 't', 'd', '+', 'x'], 
+                           brush=['r', 'r', 'g', 'g', 'b', 'b'], pen=pg.mkPen('w', width=0.2, cosmetic=False))
+    assert s._maxSpotWidth == 12.2
+    
+    def render(draw):
+        img = pg.QtGui.QImage(64, 64, pg.QtGui.QImage.Format_ARGB32)
+        img.fill(0)
+        p = pg.QtGui.QPainter(img)
+        draw(p)
+        p.end()
+        return pg.imageToArray(img)
+    
+    def drawEach(p):
+        for i, rec in enumerate(s.spotData):
+            p.resetTransform()
+            p.translate(rec['x'], rec['y'])
+            pg.graphicsItems.ScatterPlotItem.drawSymbol(p, *s.getSpotOpts(rec))
+        
+    assert np.all(render(s.paint) == render(drawEach))
+    
+
+def test_symbolAtlas():
+    # colors change every frame; unused symbols must be evicted and their space reused
+    s = pg.ScatterPlotItem(x=np.arange(500), y=np.zeros(500), pxMode=True)
+    atlas = s.fragmentAtlas
+    for frame in range(20):
+        brushes = [pg.mkBrush(frame * 10, i, 0) for i in range(50)]
+        s.setBrush([brushes[i % 50] for i in range(500)])
+        pixmap = atlas.getAtlas()
+    assert len(atlas) < 2 * atlas.collectSize
+    assert atlas.atlasData.shape[0] * atlas.atlasData.shape[1] <= 128 * 128
+    
+    used = np.unique(s.spotData['atlasIndex'])
+    assert len(used) == 50
+    cover = np.zeros(atlas.atlasData.shape[:2], dtype=int)
+    for i in used:
+        x, y, w, h = atlas.coords[i].astype(int)
+        cover[y:y+h, x:x+w] += 1
+        img = pg.graphicsItems.ScatterPlotItem.renderSymbol(*atlas.symbolArgs[i])
+        assert np.all(atlas.atlasData[y:y+h, x:x+w] == pg.imageToArray(img, copy=True, transpose=False))
+    assert cover.max() == 1
+    
+    # the pixmap is updated in place
+    img = pixmap.toImage().convertToFormat(pg.QtGui.QImage.Format_ARGB32)
+    opaque = atlas.atlasData[..., 3] == 255
+    assert np.all(pg.imageToArray(img, copy=True, transpose=False)[opaque] == atlas.atlasData[opaque])
+    
+
+def test_brushValues():
+    cmap = pg.ColorMap([0, 1], [(0, 0, 255, 255), (255, 0, 0, 255)])
+    values = np.linspace(0, 10, 1000)
+    values[5] = np.nan
+    s = pg.ScatterPlotItem(x=values, y=values, brushValues=values, colorMap=cmap, colorLevels=8)
+    brushes = s.spotData['brush']
+    assert brushes[5] == -1
+    assert len(np.unique(brushes[brushes >= 0])) == 8
+    assert s._brushes[brushes[0]].color().getRgb() == (0, 0, 255, 255)
+    assert s._brushes[brushes[-1]].color().getRgb() == (255, 0, 0, 255)
+    
+    # recoloring reuses the color map and palette; values are clipped to valueRange
+    nBrushes = len(s._brushes)
+    s.setBrushValues(-values, valueRange=(-5, 0))
+    assert len(s._brushes) == nBrushes
+    assert s._brushes[s.spotData['brush'][0]].color().getRgb() == (255, 0, 0, 255)
+    assert s._brushes[s.spotData['brush'][-1]].color().getRgb() == (0, 0, 255, 255)
+    assert len(s.fragmentAtlas) <= 10
+    
+
+def test_devicePointsCache():
+    x = np.random.uniform(0, 300, size=100)
+    y = np.random.uniform(0, 300, size=100)
+    s = pg.ScatterPlotItem(x=x, y=y)
+    plot.addItem(s)
+    app.processEvents()
+    for offset in [0, 10, -25.5, 30]:
+        # panning only shifts the cached device coordinates
+        plot.setXRange(offset, 300 + offset, padding=0)
+        plot.setYRange(offset / 2., 300 + offset / 2., padding=0)
+        app.processEvents()
+        pts = s._devicePoints()
+        assert np.allclose(pts, s.mapPointsToDevice(np.vstack([x, y])))
+    plot.clear()
+
+
+def test_percentileBounds_orthoRange():
+    np.random.seed(5)
+    n = 200000
+    x = np.random.permutation(n).astype(float)
+    y = np.random.random(n)
+    s = pg.ScatterPlotItem(x=x, y=y)
+    # the orthogonal range is selected before percentiles are estimated
+    for lo, hi in [(1000, 1300), (1000, 1010)]:
+        sel = y[(x >= lo) & (x <= hi)]
+        assert np.allclose(s.dataBounds(1, 0.98, (lo, hi)), np.percentile(sel, [1, 99]))
+    assert s.dataBounds(1, 0.98, (-10, -1)) == (None, None)
+    
+
 if __name__ == '__main__':
     test_scatterplotitem()
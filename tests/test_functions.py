@@ -112,5 +112,155 @@ def test_subArray():
     
     
     
+def test_arrayToQPath():
+    app = pg.mkQApp()
+    x = np.arange(6.)
+    y = x**2
+    buf = pg.PathBuffer()
+    for connect, types in [('all', [0,1,1,1,1,1]), 
+                           ('pairs', [0,1,0,1,0,1]), 
+                           (np.array([1,0,1,1,0,1]), [0,1,0,1,1,0])]:
+        path = pg.arrayToQPath(x, y, connect=connect, buffer=buf)
+        assert path.elementCount() == 6
+        for i in range(6):
+            el = path.elementAt(i)
+            assert el.type == types[i]
+            assert (el.x, el.y) == (x[i], y[i])
+    
+    
+def test_percentileSample():
+    assert pg.percentileSample(1000, 0.005) is None
+    assert pg.percentileSample(10**6, 0) is None
+    data = np.random.exponential(size=10**6)
+    idx = pg.percentileSample(len(data), 0.005)
+    assert len(idx) < len(data) // 5
+    assert np.all(idx == pg.percentileSample(len(data), 0.005))
+    est = np.percentile(data[idx], [2, 50, 98])
+    # rank of each estimate is within the requested error
+    ranks = np.searchsorted(np.sort(data), est) / float(len(data))
+    assert np.all(abs(ranks - [0.02, 0.5, 0.98]) < 0.005)
+    
+    
+def test_downsampleM4():
+    x = np.arange(1003.)
+    y = np.random.normal(size=1003)
+    xd, yd = pg.downsampleM4(x, y, 10)
+    assert len(xd) == 4 * 101
+    assert np.all(np.diff(xd) >= 0)
+    for i in range(101):
+        seg = y[i*10:(i+1)*10]
+        assert yd[i*4] == seg[0] and yd[i*4+3] == seg[-1]
+        assert set(yd[i*4+1:i*4+3]) == set([seg.min(), seg.max()])
+
+
+def test_downsampleLTTB():
+    x = np.arange(1000.)
+    y = np.zeros(1000)
+    y[[55, 333, 777]] = [5, -3, 8]
+    xd, yd = pg.downsampleLTTB(x, y, 10)
+    assert len(xd) == 101
+    assert xd[0] == 0 and xd[-1] == 999
+    assert np.all(np.diff(xd) > 0)
+    # isolated spikes are always selected
+    assert set([55, 333, 777]) <= set(xd)
+    
+    
+def test_PixmapFragmentBuffer():
+    buf = pg.PixmapFragmentBuffer()
+    for n in [3, 2, 40]:
+        arr = buf.get(n)
+        assert arr.shape == (n, 10)
+        arr[:] = np.arange(n*10).reshape(n, 10)
+        frags = buf.fragments()
+        assert len(frags) == n
+        assert frags[n-1].x == (n-1) * 10
+        assert frags[n-1].sourceTop == (n-1) * 10 + 3
+        assert frags[n-1].opacity == (n-1) * 10 + 9
+
+
+def test_makeARGB():
+    def reference(data, lut, levels):
+        # rescale, truncate and clip as described in the makeARGB documentation
+        if levels is not None:
+            scale = len(lut) if lut is not None else 255.
+            data = ((data.astype(float) - levels[0]) * (scale / (levels[1] - levels[0]))).astype(int)
+        if lut is None:
+            gray = np.clip(data, 0, 255).astype(np.ubyte)
+            return np.dstack([gray, gray, gray, np.full(gray.shape, 255, dtype=np.ubyte)])
+        colors = lut[np.clip(data, 0, len(lut)-1).astype(int)]
+        if lut.ndim == 1:
+            colors = np.dstack([colors, colors, colors])
+        if colors.shape[2] == 3:
+            colors = np.dstack([colors, np.full(colors.shape[:2], 255, dtype=np.ubyte)])
+        return colors[..., [2, 1, 0, 3]]
+        
+    lut1 = np.random.randint(0, 256, size=200).astype(np.ubyte)
+    lut3 = np.random.randint(0, 256, size=(300, 3)).astype(np.ubyte)
+    lut4 = np.random.randint(0, 256, size=(256, 4)).astype(np.ubyte)
+    images = [
+        np.random.randint(0, 256, size=(20, 30)).astype(np.ubyte),
+        np.random.randint(0, 2**16, size=(20, 30)).astype(np.uint16),
+        np.random.randint(-2**15, 2**15, size=(20, 30)).astype(np.int16),
+        np.random.randint(-200, 400, size=(30, 20)).astype(np.int16).T,
+        # floats on a coarse grid and levels spanning a power of two, so that float32 rescaling is exact
+        np.random.randint(-2000, 4000, size=(20, 30)) / 4.,
+        (np.random.randint(-2000, 4000, size=(20, 30)) / 4.).astype(np.float32),
+    ]
+    out = np.empty((20, 30, 4), dtype=np.ubyte)
+    for data in images:
+        for lut in [None, lut1, lut3, lut4]:
+            for levels in [None, (-128, 384), (0, 1024)]:
+                argb, alpha = pg.makeARGB(data, lut=lut, levels=levels, out=out)
+                assert argb is out
+                assert alpha == (lut is lut4)
+                assert np.all(argb == reference(data, lut, levels))
+    
+    # non-finite values are drawn with the first color of the lookup table
+    for dtype in [np.float32, np.float64]:
+        data = np.random.random((10, 10)).astype(dtype)
+        data[3, 4] = np.nan
+        data[5, 5] = np.inf
+        data[6, 6] = -np.inf
+        lut = np.random.randint(0, 256, size=(256, 3)).astype(np.ubyte)
+        argb, alpha = pg.makeARGB(data, lut=lut, levels=[0, 1])
+        for i, j in [(3, 4), (5, 5), (6, 6)]:
+            assert np.all(argb[i, j, :3] == lut[0, ::-1])
+        finite = np.isfinite(data)
+        assert np.all(argb[finite] == reference(data, lut, [0, 1])[finite])
+        
+        # without a lookup table, NaN is black and infinite values are clipped
+        for levels, scaled in [(None, data * 255), ([0, 1], data)]:
+            argb, alpha = pg.makeARGB(scaled, levels=levels)
+            assert np.all(argb[3, 4, :3] == 0)
+            assert np.all(argb[5, 5, :3] == 255)
+            assert np.all(argb[6, 6, :3] == 0)
+    
+    # multi-channel data is unaffected by the single-channel fast paths
+    rgb = np.random.randint(0, 256, size=(20, 30, 3)).astype(np.ubyte)
+    argb, alpha = pg.makeARGB(rgb, levels=[(0, 255)] * 3)
+    assert not alpha
+    assert np.all(argb[..., :3] == rgb[..., ::-1])
+    
+    with pytest.raises(Exception):
+        pg.makeARGB(images[0], out=np.empty((30, 20, 4), dtype=np.ubyte))
+
+
+def test_makeQImage_out():
+    argb = np.random.randint(0, 256, size=(30, 20, 4)).astype(np.ubyte)
+    img = pg.makeQImage(argb)
+    assert img.width() == 30 and img.height() == 20
+    argb2 = np.random.randint(0, 256, size=(30, 20, 4)).astype(np.ubyte)
+    assert pg.makeQImage(argb2, out=img) is img
+    assert np.all(pg.imageToArray(img) == argb2)
+    
+    # RGB data fills the alpha channel
+    rgb = pg.makeQImage(argb[..., :3])
+    assert pg.makeQImage(argb2[..., :3], out=rgb) is rgb
+    assert np.all(pg.imageToArray(rgb)[..., :3] == argb2[..., :3])
+    
+    with pytest.raises(Exception):
+        pg.makeQImage(argb[:10], out=img)
+
+
 if __name__ == '__main__':
     test_interpolateArray()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class GridIndex(object):
+    '''
+    Uniform grid spatial index for a fixed set of 2D points.
+
+    Points are bucketed into a grid of cells sized so that each cell holds
+    about *pointsPerCell* points on average, and stored sorted by cell so
+    that each column of cells is one contiguous run. A rectangle query then
+    only reads the cells it overlaps, which takes time proportional to the
+    number of columns spanned plus the number of points found, rather than
+    to the total number of points. Building the index costs one sort.
+
+    Points with non-finite coordinates are never returned.
+
+    Example::
+
+        index = GridIndex(x, y)
+        inds = index.query(x0, x1, y0, y1)   # indexes of points in the rectangle
+    '''
+
+    def __init__(self, x, y, pointsPerCell=4):
+        '''
+        ============== =========================================================
+        **Arguments:**
+        x, y           1D arrays of point coordinates.
+        pointsPerCell  (int) Average number of points per grid cell.
+        ============== =========================================================
+        '''
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        finite = np.isfinite(x) & np.isfinite(y)
+        inds = np.arange(len(x)) if finite.all() else np.argwhere(finite)[:,0]
+        self.size = len(x)
+        n = len(inds)
+        if n == 0:
+            self.order = inds
+            return
+        x = x[inds]
+        y = y[inds]
+        self.xmin, self.xmax = x.min(), x.max()
+        self.ymin, self.ymax = y.min(), y.max()
+        w = self.xmax - self.xmin
+        h = self.ymax - self.ymin
+
+        ## choose the grid shape so that cells are roughly square in data coordinates
+        nCells = max(1, n // pointsPerCell)
+        if w > 0 and h > 0:
+            nx = int(np.clip(np.round((nCells * w / h) ** 0.5), 1, nCells))
+            ny = max(1, nCells // nx)
+        elif w > 0:
+            nx, ny = nCells, 1
+        elif h > 0:
+            nx, ny = 1, nCells
+        else:
+            nx = ny = 1
+        self.shape = (nx, ny)
+        self.xscale = nx / w if w > 0 else 0.
+        self.yscale = ny / h if h > 0 else 0.
+
+        cx = self._cellIndex(x, self.xmin, self.xscale, nx)
+        cy = self._cellIndex(y, self.ymin, self.yscale, ny)
+        cell = cx * ny + cy
+        order = np.argsort(cell, kind='mergesort')  # stable; indexes stay ascending within a cell
+        self.order = inds[order]
+        self.x = x[order]
+        self.y = y[order]
+        ## points of cell i are self.order[self.cellStart[i]:self.cellStart[i+1]]
+        self.cellStart = np.searchsorted(cell[order], np.arange(nx * ny + 1))
+
+    def __len__(self):
+        return self.size
+
+    def query(self, x0, x1, y0, y1):
+        '''
+        Return a sorted array of the indexes of all points with
+        x0 <= x <= x1 and y0 <= y <= y1.
+        '''
+        if len(self.order) == 0 or x1 < self.xmin or x0 > self.xmax or y1 < self.ymin or y0 > self.ymax:
+            return np.empty(0, dtype=int)
+        nx, ny = self.shape
+        ix0, ix1 = self._cellIndex(np.array([x0, x1]), self.xmin, self.xscale, nx)
+        iy0, iy1 = self._cellIndex(np.array([y0, y1]), self.ymin, self.yscale, ny)
+
+        ## each column of cells from iy0 to iy1 is one contiguous run of points
+        cols = np.arange(ix0, ix1+1) * ny
+        starts = self.cellStart[cols + iy0]
+        stops = self.cellStart[cols + iy1 + 1]
+        lens = stops - starts
+        total = lens.sum()
+        offsets = np.repeat(starts - np.cumsum(lens) + lens, lens)
+        sel = offsets + np.arange(total)
+
+        x = self.x[sel]
+        y = self.y[sel]
+        sel = sel[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)]
+        return np.sort(self.order[sel])
+
+    def _cellIndex(self, v, vmin, scale, n):
+        if scale == 0:
+            return np.zeros(v.shape, dtype=int)
+        ## clip before converting so that infinite query bounds are handled
+        return np.clip((v - vmin) * scale, 0, n-1).astype(int)
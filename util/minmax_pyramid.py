@@ -0,0 +1,267 @@
+import numpy as np
+
+
+class MinMaxPyramid(object):
+    '''
+    Multi-resolution table of block minimum / maximum values for a 1D array.
+
+    Level *i* of the pyramid stores the min and max of consecutive blocks of
+    ``factor**(i+1)`` samples. The table is built once and can be extended
+    incrementally when samples are appended, so that min/max queries over a
+    large index range only touch a number of table entries proportional to
+    the number of requested output bins rather than to the number of samples.
+
+    Blocks are aligned to absolute sample indexes. For streaming data where
+    old samples are discarded (see :class:`RingBuffer <pyqtgraph.util.ring_buffer.RingBuffer>`),
+    pass the absolute index of the first sample as *offset* to update();
+    blocks that refer to discarded samples are dropped from the table.
+
+    Example::
+
+        pyr = MinMaxPyramid(y)
+        starts, mins, maxs = pyr.binMinMax(y, 0, len(y), 1000)
+        y = np.append(y, newSamples)
+        pyr.update(y)   # only the new samples are processed
+    '''
+
+    def __init__(self, data=None, factor=4, offset=0):
+        '''
+        ============== =========================================================
+        **Arguments:**
+        data           (1D array or None) Initial data to index.
+        factor         (int) Number of blocks from level *i-1* combined into
+                       each block of level *i*. Level 0 combines *factor*
+                       samples.
+        offset         (int) Absolute index of the first sample in *data*.
+        ============== =========================================================
+        '''
+        assert factor >= 2
+        self.factor = factor
+        self.clear()
+        if data is not None:
+            self.update(data, offset)
+
+    def clear(self):
+        self.offset = 0      # absolute index of the first sample of the indexed data
+        self.length = 0      # absolute index of the end of the indexed data
+        self._mins = []      # per-level min storage (with spare capacity)
+        self._maxs = []      # per-level max storage (with spare capacity)
+        self._start = []     # per-level storage index of the first valid block
+        self._counts = []    # per-level number of valid blocks
+        self._first = []     # per-level absolute block index of the first valid block
+
+    def nLevels(self):
+        return len(self._counts)
+
+    def blockSize(self, level):
+        '''Return the number of samples summarized by each block of *level*.'''
+        return self.factor ** (level + 1)
+
+    def level(self, level):
+        '''Return (mins, maxs) arrays for all valid blocks in *level*.
+        The first returned block has absolute index firstBlock(*level*).'''
+        s = self._start[level]
+        e = s + self._counts[level]
+        return self._mins[level][s:e], self._maxs[level][s:e]
+
+    def firstBlock(self, level):
+        return self._first[level]
+
+    def update(self, data, offset=0):
+        '''
+        Extend the pyramid to cover all complete blocks in *data*, where
+        ``data[0]`` has absolute sample index *offset*.
+
+        Samples already processed are assumed not to have changed since the
+        last call; only newly appended samples are read. Blocks that begin
+        before *offset* are discarded.
+        '''
+        end = offset + len(data)
+        if offset < self.offset or end < self.length:
+            raise ValueError("Data may only be appended to or dropped from the front (got range %d-%d, indexed %d-%d); use clear() first." % (offset, end, self.offset, self.length))
+        self.offset = offset
+        self.length = end
+        f = self.factor
+        srcFirst = offset  # absolute index of first valid source element
+        srcEnd = end
+        lev = 0
+        while srcEnd - srcFirst >= f or lev < self.nLevels():
+            if lev == self.nLevels():
+                dtype = self._dtype(data)
+                self._mins.append(np.empty(0, dtype=dtype))
+                self._maxs.append(np.empty(0, dtype=dtype))
+                self._start.append(0)
+                self._counts.append(0)
+                self._first.append(0)
+
+            ## drop blocks that begin before the first valid source element
+            first = -(-srcFirst // f)
+            if self._first[lev] < first:
+                drop = min(first - self._first[lev], self._counts[lev])
+                self._start[lev] += drop
+                self._counts[lev] -= drop
+                self._first[lev] += drop
+                if self._counts[lev] == 0:
+                    self._first[lev] = first
+
+            ## compute new blocks from the source
+            done = self._first[lev] + self._counts[lev]
+            if done < first:
+                self._first[lev] = done = first
+            total = srcEnd // f
+            if total > done:
+                if lev == 0:
+                    seg = data[done*f-offset:total*f-offset].reshape(total-done, f)
+                    self._append(lev, seg.min(axis=1), seg.max(axis=1))
+                else:
+                    i0 = self._start[lev-1] + done*f - self._first[lev-1]
+                    i1 = i0 + (total-done) * f
+                    segMin = self._mins[lev-1][i0:i1].reshape(total-done, f)
+                    segMax = self._maxs[lev-1][i0:i1].reshape(total-done, f)
+                    self._append(lev, segMin.min(axis=1), segMax.max(axis=1))
+
+            srcFirst = self._first[lev]
+            srcEnd = srcFirst + self._counts[lev]
+            lev += 1
+
+    def binMinMax(self, data, start, stop, ds):
+        '''
+        Return the min and max of *data* in bins of approximately *ds* samples
+        covering the index range [*start*, *stop*) of *data*. *data* must be
+        the array most recently passed to update().
+
+        The bin width is rounded down to a multiple of the coarsest pyramid
+        block size not exceeding *ds*, and bins are aligned to multiples of
+        that width in absolute sample index; the partial bins at either end
+        are computed directly from *data*. Returns a tuple
+        (binStarts, mins, maxs), where binStarts are indexes into *data*, or
+        None if *ds* is too small for the pyramid to be of any use.
+        '''
+        lev = self.nLevels() - 1
+        while lev >= 0 and self.blockSize(lev) > ds:
+            lev -= 1
+        if lev < 0:
+            return None
+        b = self.blockSize(lev)
+        ds = (ds // b) * b
+        r = ds // b
+
+        off = self.offset
+        start = max(0, start) + off
+        stop = min(stop, len(data)) + off
+        first = self._first[lev]
+        covered = (first + self._counts[lev]) * b
+        k0 = max(-(-start // ds), -(-first // r))  # first full bin
+        k1 = min(stop, covered) // ds
+        if k1 < k0:
+            k1 = k0
+
+        starts = []
+        mins = []
+        maxs = []
+
+        # partial bin at the start
+        headStop = min(k0 * ds, stop)
+        if headStop > start:
+            seg = data[start-off:headStop-off]
+            starts.append(np.array([start]))
+            mins.append(seg.min(keepdims=True))
+            maxs.append(seg.max(keepdims=True))
+
+        # full bins read from the pyramid
+        if k1 > k0:
+            lmin, lmax = self.level(lev)
+            i0 = k0*r - first
+            i1 = k1*r - first
+            starts.append(np.arange(k0, k1) * ds)
+            mins.append(lmin[i0:i1].reshape(k1-k0, r).min(axis=1))
+            maxs.append(lmax[i0:i1].reshape(k1-k0, r).max(axis=1))
+
+        # remaining bins that are not (yet) covered by the pyramid
+        tail = max(k1 * ds, headStop)
+        while tail < stop:
+            end = min(tail + ds, stop)
+            seg = data[tail-off:end-off]
+            starts.append(np.array([tail]))
+            mins.append(seg.min(keepdims=True))
+            maxs.append(seg.max(keepdims=True))
+            tail = end
+
+        if len(starts) == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=data.dtype), np.empty(0, dtype=data.dtype)
+        return np.concatenate(starts) - off, np.concatenate(mins), np.concatenate(maxs)
+
+    def rangeMinMax(self, data, start, stop):
+        """
+        Return (min, max) of ``data[start:stop]``, or None if the range is
+        empty. *data* must be the array most recently passed to update().
+
+        The range is covered with the coarsest available blocks, so at most
+        about 2*factor values are read from each level and from *data*.
+        """
+        off = self.offset
+        lo = max(0, start) + off
+        hi = min(stop, len(data)) + off
+        if hi <= lo:
+            return None
+        f = self.factor
+        mins = []
+        maxs = []
+        
+        def take(lev, a, b):
+            ## collect min/max of units [a, b) of the given level (-1 is raw data)
+            if b <= a:
+                return
+            if lev < 0:
+                seg = data[a-off:b-off]
+                mins.append(seg.min())
+                maxs.append(seg.max())
+            else:
+                s = self._start[lev] - self._first[lev]
+                mins.append(self._mins[lev][s+a:s+b].min())
+                maxs.append(self._maxs[lev][s+a:s+b].max())
+        
+        lev = -1
+        while True:
+            if lev + 1 >= self.nLevels():
+                take(lev, lo, hi)
+                break
+            ## range of complete, available blocks in the next level
+            first = self._first[lev+1]
+            nlo = max(-(-lo // f), first)
+            nhi = min(hi // f, first + self._counts[lev+1])
+            if nhi <= nlo:
+                take(lev, lo, hi)
+                break
+            take(lev, lo, nlo * f)
+            take(lev, nhi * f, hi)
+            lo, hi = nlo, nhi
+            lev += 1
+        return min(mins), max(maxs)
+
+    def _dtype(self, data):
+        if data.dtype.kind in 'fiu':
+            return data.dtype
+        return np.dtype(float)
+
+    def _append(self, lev, mins, maxs):
+        ## append blocks to a level, compacting or growing its storage as needed
+        s = self._start[lev]
+        n = self._counts[lev]
+        need = n + len(mins)
+        cap = len(self._mins[lev])
+        if s + need > cap:
+            if need <= cap // 2:
+                ## enough room after discarding dropped blocks; shift left
+                for arrs in (self._mins, self._maxs):
+                    arrs[lev][:n] = arrs[lev][s:s+n].copy()
+            else:
+                cap = max(need, 2 * cap, 16)
+                for arrs in (self._mins, self._maxs):
+                    old = arrs[lev]
+                    arrs[lev] = np.empty(cap, dtype=old.dtype)
+                    arrs[lev][:n] = old[s:s+n]
+            self._start[lev] = s = 0
+        self._mins[lev][s+n:s+need] = mins
+        self._maxs[lev][s+n:s+need] = maxs
+        self._counts[lev] = need
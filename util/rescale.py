@@ -0,0 +1,143 @@
+"""
+Backends for :func:`rescaleData <pyqtgraph.functions.rescaleData>`, which computes::
+
+    ((data - offset) * scale).astype(dtype)
+
+Every backend avoids creating an image-sized temporary array. Intermediate 
+values have the precision of the data for floating point data (but at least 
+float32) and are float64 for integer data, so that all backends give the same 
+results as the plain numpy expression above.
+
+The available backends are listed in BACKENDS. The numpy backend is the
+default; the others are opt-in through the 'rescaleBackend' config option and
+import the package they need the first time they are used:
+
+=========== ===================================================================
+numpy       Pure numpy, processing the data in blocks of CHUNK_SIZE values.
+numexpr     Multithreaded evaluation; requires numexpr.
+numba       Compiled loop, cached on disk; requires numba.
+=========== ===================================================================
+
+Backends that cannot handle a particular input (for example non-contiguous
+arrays or float16 data) fall back to the numpy backend.
+"""
+from collections import OrderedDict
+import importlib
+import numpy as np
+
+
+CHUNK_SIZE = 2**15  ## number of values rescaled at a time by the numpy backend
+
+
+def workDtype(dtype):
+    """Return the dtype in which data of *dtype* is rescaled."""
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'fc':
+        return np.result_type(dtype.newbyteorder('='), np.float32)
+    return np.dtype(np.float64)
+
+
+def rescaleNumpy(data, scale, offset, dtype):
+    out = np.empty(data.shape, dtype=dtype)
+    if data.size == 0:
+        return out
+    if data.ndim == 0:
+        out[...] = (data - offset) * scale
+        return out
+    work = np.empty(min(data.size, CHUNK_SIZE), dtype=workDtype(data.dtype))
+    _rescaleBlocks(data, out, scale, offset, work)
+    return out
+
+
+def _rescaleBlocks(data, out, scale, offset, work):
+    ## rescale blocks of whole rows (along the first axis) that fit in *work*
+    rowSize = data[0].size
+    if rowSize > len(work):
+        for i in range(len(data)):
+            _rescaleBlocks(data[i], out[i], scale, offset, work)
+        return
+    rows = len(work) // rowSize
+    for start in range(0, len(data), rows):
+        block = data[start:start+rows]
+        w = work[:block.size].reshape(block.shape)
+        np.subtract(block, offset, out=w, dtype=w.dtype)  ## compute in the work dtype to avoid integer overflow
+        w *= scale
+        out[start:start+rows] = w
+
+
+_modules = {}
+
+def importBackend(name):
+    """Import and return the package needed by backend *name*, or None if it is
+    not installed."""
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except ImportError:
+            _modules[name] = None
+    return _modules[name]
+
+
+def availableBackends():
+    """Return the names of the backends whose packages can be imported."""
+    return [name for name in BACKENDS if name == 'numpy' or importBackend(name) is not None]
+
+
+def getBackend(name):
+    """Return the rescale function for backend *name*."""
+    if name not in availableBackends():
+        raise Exception("Rescale backend '%s' is not available (choose from %s)" % (name, availableBackends()))
+    return BACKENDS[name]
+
+
+def rescaleNumexpr(data, scale, offset, dtype):
+    ## numexpr only supports a few numeric types
+    supported = ('int32', 'int64', 'float32', 'float64')
+    wdt = workDtype(data.dtype)
+    if (not data.flags['C_CONTIGUOUS'] or not data.dtype.isnative or not dtype.isnative or
+            data.dtype.name not in supported or dtype.name not in supported):
+        return rescaleNumpy(data, scale, offset, dtype)
+    out = np.empty(data.shape, dtype=dtype)
+    local = {'data': data, 'offset': wdt.type(offset), 'scale': wdt.type(scale)}
+    importBackend('numexpr').evaluate('(data - offset) * scale', local_dict=local, out=out, casting='unsafe')
+    return out
+
+
+def _rescaleLoopPy(data, work, scale, offset):
+    for i in range(data.size):
+        work[i] = (data[i] - offset) * scale
+
+_rescaleLoop = None
+
+def rescaleNumba(data, scale, offset, dtype):
+    global _rescaleLoop
+    ## numba has no float16 support; bool and complex data are left to numpy as well
+    supported = ('int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'int64', 'uint64', 'float32', 'float64')
+    if not data.flags['C_CONTIGUOUS'] or not data.dtype.isnative or data.dtype.name not in supported:
+        return rescaleNumpy(data, scale, offset, dtype)
+    if _rescaleLoop is None:
+        _rescaleLoop = importBackend('numba').njit(cache=True, nogil=True)(_rescaleLoopPy)
+    out = np.empty(data.shape, dtype=dtype)
+    if data.size == 0:
+        return out
+    ## the loop writes to a work-dtype block that numpy then casts to the output 
+    ## dtype, so out-of-range values are converted exactly as by rescaleNumpy
+    wdt = workDtype(data.dtype)
+    work = np.empty(min(data.size, CHUNK_SIZE), dtype=wdt)
+    flatData = data.reshape(data.size)
+    flatOut = out.reshape(out.size)
+    for start in range(0, data.size, CHUNK_SIZE):
+        block = flatData[start:start+CHUNK_SIZE]
+        w = work[:block.size]
+        _rescaleLoop(block, w, wdt.type(scale), wdt.type(offset))
+        flatOut[start:start+CHUNK_SIZE] = w
+    return out
+
+
+BACKENDS = OrderedDict([
+    ('numpy', rescaleNumpy),
+    ('numexpr', rescaleNumexpr),
+    ('numba', rescaleNumba),
+])
+
+defaultBackend = 'numpy'
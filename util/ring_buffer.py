@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class RingBuffer(object):
+    '''
+    First-in first-out buffer of numpy values that always exposes its
+    contents as a single contiguous array, without reallocating or shifting
+    data as new values are pushed.
+
+    If *maxLength* is given, the buffer keeps only the most recent
+    *maxLength* values. Every value is written twice, at positions *i* and
+    *i+maxLength* of an array of length 2*maxLength, so that the most recent
+    values are always available as one contiguous slice regardless of where
+    the write position has wrapped to. Pushing *n* values costs O(n).
+
+    If *maxLength* is None, no values are ever discarded and the storage grows
+    geometrically, so that appending is amortized O(n) as well.
+
+    Example::
+
+        buf = RingBuffer(10000)
+        buf.push(newSamples)
+        curve.setData(buf.data())
+    '''
+
+    def __init__(self, maxLength=None, dtype=float, data=None):
+        '''
+        ============== =========================================================
+        **Arguments:**
+        maxLength      (int or None) Maximum number of values kept.
+        dtype          The numpy dtype of the stored values.
+        data           Optional initial values to push.
+        ============== =========================================================
+        '''
+        self.maxLength = maxLength
+        self.dtype = np.dtype(dtype)
+        if maxLength is None:
+            self._buf = np.empty(16, dtype=self.dtype)
+        else:
+            self._buf = np.empty(2 * maxLength, dtype=self.dtype)
+        self.clear()
+        if data is not None:
+            self.push(data)
+
+    def clear(self):
+        self._head = 0     # storage index of the oldest value
+        self._len = 0      # number of values currently stored
+        self.start = 0     # number of values discarded so far (absolute index of data()[0])
+
+    def __len__(self):
+        return self._len
+
+    def data(self):
+        '''Return a view of the stored values, oldest first. The view is
+        only valid until the next call to push().'''
+        return self._buf[self._head:self._head+self._len]
+
+    def push(self, values):
+        '''Append *values* to the buffer, discarding the oldest values if the
+        buffer is full. Returns the number of values discarded.'''
+        values = np.asarray(values)
+        if values.ndim == 0:
+            values = values.reshape(1)
+        n = len(values)
+        if self.maxLength is None:
+            need = self._len + n
+            if need > len(self._buf):
+                buf = np.empty(max(need, 2 * len(self._buf)), dtype=self.dtype)
+                buf[:self._len] = self._buf[:self._len]
+                self._buf = buf
+            self._buf[self._len:need] = values
+            self._len = need
+            return 0
+
+        cap = self.maxLength
+        skipped = 0
+        if n > cap:
+            ## only the last maxLength values survive; discard everything else
+            skipped = self._len + n - cap
+            self.start += skipped
+            self._head = self._len = 0
+            values = values[n-cap:]
+            n = cap
+        k = n
+        # write position of the first new value, and the length of the
+        # run that fits before the write position wraps around
+        w = (self._head + self._len) % cap
+        n1 = min(k, cap - w)
+        buf = self._buf
+        buf[w:w+n1] = values[:n1]
+        buf[w+cap:w+cap+n1] = values[:n1]
+        if k > n1:
+            buf[:k-n1] = values[n1:]
+            buf[cap:cap+k-n1] = values[n1:]
+
+        total = self._len + n
+        dropped = max(0, total - cap)
+        self._len = min(total, cap)
+        self._head = (self._head + dropped) % cap
+        self.start += dropped
+        return dropped + skipped
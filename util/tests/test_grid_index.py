@@ -0,0 +1,28 @@
+import numpy as np
+from pyqtgraph.util.grid_index import GridIndex
+
+
+def test_grid_index():
+    np.random.seed(0)
+    x = np.random.normal(size=10000)
+    y = np.random.normal(scale=100, size=10000) + 1000
+    x[::97] = np.nan
+    y[5] = np.inf
+    finite = np.isfinite(x) & np.isfinite(y)
+    index = GridIndex(x, y)
+    for x0, x1, y0, y1 in [(-0.5, 0.2, 950, 1020), (-10, 10, -1e5, 1e5), (0, 0.01, 1000, 1000.5),
+                           (5, 6, 0, 2000), (-1, 1, 1500, 1600), (-np.inf, 0, 1000, np.inf)]:
+        inds = index.query(x0, x1, y0, y1)
+        ref = np.argwhere(finite & (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))[:,0]
+        assert np.all(inds == ref)
+
+    # degenerate layouts
+    index = GridIndex(np.zeros(10), np.arange(10))
+    assert np.all(index.query(-1, 1, 2.5, 5) == [3, 4, 5])
+    index = GridIndex(np.ones(10), np.ones(10))
+    assert len(index.query(0, 2, 0, 2)) == 10
+    assert len(GridIndex([], []).query(0, 1, 0, 1)) == 0
+
+
+if __name__ == '__main__':
+    test_grid_index()
@@ -0,0 +1,89 @@
+import numpy as np
+from pyqtgraph.util.minmax_pyramid import MinMaxPyramid
+
+
+def checkBins(pyr, data, start, stop, ds):
+    starts, mins, maxs = pyr.binMinMax(data, start, stop, ds)
+    assert starts[0] == start
+    ends = np.append(starts[1:], stop)
+    assert np.all(ends > starts)
+    for s, e, mn, mx in zip(starts, ends, mins, maxs):
+        assert mn == data[s:e].min()
+        assert mx == data[s:e].max()
+    return starts
+
+
+def test_minmax_pyramid():
+    np.random.seed(0)
+    data = np.random.normal(size=10000)
+    pyr = MinMaxPyramid(data)
+    assert pyr.nLevels() == 6
+    for lev in range(pyr.nLevels()):
+        b = pyr.blockSize(lev)
+        mins, maxs = pyr.level(lev)
+        n = len(data) // b
+        assert len(mins) == n
+        assert np.all(mins == data[:n*b].reshape(n, b).min(axis=1))
+        assert np.all(maxs == data[:n*b].reshape(n, b).max(axis=1))
+
+    starts = checkBins(pyr, data, 0, len(data), 100)
+    # bin width is rounded down to a multiple of the level block size (64)
+    assert starts[1] - starts[0] == 64
+    checkBins(pyr, data, 1234, 8765, 37)
+    checkBins(pyr, data, 5, 9, 16)
+    assert pyr.binMinMax(data, 0, len(data), 3) is None
+
+
+def test_minmax_pyramid_update():
+    np.random.seed(1)
+    data = np.random.normal(size=1001)
+    pyr = MinMaxPyramid(data[:13])
+    for n in [14, 100, 101, 513, 1001]:
+        pyr.update(data[:n])
+        ref = MinMaxPyramid(data[:n])
+        assert pyr.nLevels() == ref.nLevels()
+        for lev in range(ref.nLevels()):
+            assert np.all(pyr.level(lev)[0] == ref.level(lev)[0])
+            assert np.all(pyr.level(lev)[1] == ref.level(lev)[1])
+        checkBins(pyr, data[:n], 3, n, 20)
+
+
+def test_minmax_pyramid_drop():
+    # simulate a ring buffer of 300 samples receiving data in chunks
+    np.random.seed(2)
+    data = np.random.normal(size=3000)
+    pyr = MinMaxPyramid()
+    for end in range(37, len(data), 137):
+        start = max(0, end - 300)
+        window = data[start:end]
+        pyr.update(window, offset=start)
+        for lev in range(pyr.nLevels()):
+            b = pyr.blockSize(lev)
+            first = pyr.firstBlock(lev)
+            mins, maxs = pyr.level(lev)
+            assert first * b >= start
+            for i in range(len(mins)):
+                seg = data[(first+i)*b:(first+i+1)*b]
+                assert mins[i] == seg.min() and maxs[i] == seg.max()
+        checkBins(pyr, window, 0, len(window), 20)
+
+
+
+def test_minmax_pyramid_range():
+    np.random.seed(3)
+    data = np.random.normal(size=5000)
+    for factor in [4, 16]:
+        pyr = MinMaxPyramid(data[1000:], factor=factor, offset=1000)
+        window = data[1000:]
+        for start, stop in [(0, 4000), (3, 3997), (17, 18), (250, 2900), (3999, 4000)]:
+            mn, mx = pyr.rangeMinMax(window, start, stop)
+            assert mn == window[start:stop].min()
+            assert mx == window[start:stop].max()
+        assert pyr.rangeMinMax(window, 10, 10) is None
+
+
+if __name__ == '__main__':
+    test_minmax_pyramid()
+    test_minmax_pyramid_update()
+    test_minmax_pyramid_drop()
+    test_minmax_pyramid_range()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import pyqtgraph as pg
+from pyqtgraph.util import rescale
+
+
+def reference(data, scale, offset, dtype):
+    # the plain numpy implementation previously used by rescaleData
+    if data.dtype.kind in 'iub':
+        d2 = data.astype(float)
+        d2 -= offset
+    else:
+        d2 = data - offset
+    d2 *= scale
+    return d2.astype(dtype)
+
+
+def makeData():
+    np.random.seed(0)
+    yield np.random.randint(0, 256, size=(300, 200)).astype(np.ubyte)
+    yield np.random.randint(0, 2**16, size=(50, 40)).astype(np.uint16)
+    yield np.random.randint(-2**15, 2**15, size=(50, 40)).astype(np.int16).T
+    yield np.random.randint(-2**31, 2**31, size=1000).astype(np.int32)
+    yield np.random.normal(size=(3, 70000))   # rows longer than one block
+    yield np.random.normal(size=(40, 50, 3)).astype(np.float32)[::2, ::-1]
+    yield np.random.normal(size=(20, 30)).astype('>f8')
+    yield np.random.randint(-100, 100, size=(20, 30)).astype('>i2')
+    yield np.array(3.5)
+    yield np.empty((0, 10))
+
+
+@pytest.mark.parametrize('backend', list(rescale.BACKENDS.keys()))
+def test_rescale_parity(backend):
+    if backend not in rescale.availableBackends():
+        pytest.skip("%s is not installed" % backend)
+    func = rescale.BACKENDS[backend]
+    for data in makeData():
+        for dtype in [data.dtype, np.float32, np.float64, int]:
+            for scale, offset in [(1.0, 0.0), (0.37, -12.5), (255. / 1000, 100.)]:
+                out = func(data, scale, offset, np.dtype(dtype))
+                ref = reference(data, scale, offset, dtype)
+                assert out.shape == ref.shape
+                assert out.dtype == ref.dtype
+                assert np.all(out == ref)
+
+
+@pytest.mark.parametrize('backend', list(rescale.BACKENDS.keys()))
+def test_rescale_fallback(backend):
+    # inputs a backend cannot handle give the same result as the numpy backend
+    if backend not in rescale.availableBackends():
+        pytest.skip("%s is not installed" % backend)
+    data = np.random.normal(size=(20, 30)).astype(np.float16)
+    for dtype in [np.ubyte, np.float32]:
+        out = rescale.BACKENDS[backend](data, 0.37, -12.5, np.dtype(dtype))
+        assert np.all(out == rescale.rescaleNumpy(data, 0.37, -12.5, np.dtype(dtype)))
+
+
+def test_rescaleData():
+    data = np.random.normal(size=(100, 100))
+    ref = reference(data, 2.0, 1.0, np.int32)
+    try:
+        for backend in rescale.availableBackends():
+            pg.setConfigOption('rescaleBackend', backend)
+            assert np.all(pg.rescaleData(data, 2.0, 1.0, dtype=np.int32) == ref)
+        pg.setConfigOption('rescaleBackend', 'no such backend')
+        with pytest.raises(Exception):
+            pg.rescaleData(data, 2.0, 1.0)
+        assert rescale.defaultBackend == 'numpy'
+    finally:
+        pg.setConfigOption('rescaleBackend', None)
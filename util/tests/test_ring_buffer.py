@@ -0,0 +1,32 @@
+import numpy as np
+from pyqtgraph.util.ring_buffer import RingBuffer
+
+
+def test_ring_buffer():
+    buf = RingBuffer(10, dtype=int)
+    ref = np.empty(0, dtype=int)
+    n = 0
+    for size in [3, 4, 5, 1, 9, 10, 23, 0, 2]:
+        vals = np.arange(n, n+size)
+        n += size
+        dropped = buf.push(vals)
+        ref = np.append(ref, vals)
+        assert dropped == max(0, len(ref) - 10)
+        ref = ref[-10:]
+        assert np.all(buf.data() == ref)
+        assert buf.start == n - len(ref)
+        assert len(buf) == len(ref)
+
+
+def test_ring_buffer_growable():
+    buf = RingBuffer(data=[1., 2.])
+    for i in range(100):
+        assert buf.push(np.arange(i)) == 0
+    assert len(buf) == 2 + 99*100//2
+    assert buf.data()[-1] == 98
+    assert buf.start == 0
+
+
+if __name__ == '__main__':
+    test_ring_buffer()
+    test_ring_buffer_growable()